@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+WG Asset Index
+One scandir of the images directory per run, kept in memory as a set of
+filenames and a (image ID, language, variant) map, and updated as downloads
+land, so reconciling and verifying are set lookups instead of a stat call
+per game, language and variant
+"""
+
+import os
+from threading import Lock
+
+from wg_assets import IMAGES_DIR, PUBLIC_IMAGE_PREFIX, image_filename, parse_image_filename
+
+
+class AssetIndex:
+    def __init__(self, images_dir=IMAGES_DIR):
+        self.images_dir = images_dir
+        self.lock = Lock()
+        self.names = set()
+
+        # (image ID as str, language, variant) -> filename
+        self.images = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the directory listing"""
+        names = set()
+        if self.images_dir.exists():
+            with os.scandir(self.images_dir) as entries:
+                names = {entry.name for entry in entries if not entry.name.startswith('.') and entry.is_file()}
+
+        images = {}
+        for name in names:
+            parts = parse_image_filename(name)
+            if parts:
+                lang, img_id, variant = parts
+                images[(img_id, lang, variant)] = name
+
+        with self.lock:
+            self.names = names
+            self.images = images
+
+    def add(self, path):
+        """Record a file that just landed in the images directory"""
+        name = os.path.basename(path)
+        parts = parse_image_filename(name)
+        with self.lock:
+            self.names.add(name)
+            if parts:
+                lang, img_id, variant = parts
+                self.images[(img_id, lang, variant)] = name
+
+    def discard(self, path):
+        """Forget a file that was removed"""
+        name = os.path.basename(path)
+        parts = parse_image_filename(name)
+        with self.lock:
+            self.names.discard(name)
+            if parts:
+                lang, img_id, variant = parts
+                self.images.pop((img_id, lang, variant), None)
+
+    def has(self, img_id, lang, variant='main'):
+        """Check whether an image ID's file in a language is on disk"""
+        return (str(img_id), lang, variant) in self.images
+
+    def has_name(self, name):
+        """Check whether a filename is on disk"""
+        return name in self.names
+
+    def has_public(self, public_path):
+        """Check whether a /assets/images/games/... path resolves to a file on disk"""
+        return bool(public_path) and public_path.replace(PUBLIC_IMAGE_PREFIX, '') in self.names
+
+    def best(self, img_id, languages, variant='main'):
+        """Filename of an image ID in the first preferred language that has it, or None"""
+        for lang in languages:
+            if (str(img_id), lang, variant) in self.images:
+                return image_filename(lang, img_id, variant)
+        return None
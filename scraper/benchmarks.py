@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+WG Scraper Benchmarks
+Micro-benchmarks over fixture pages. The pages in fixtures/ are synthetic,
+built to mirror WG's listing markup, not captured from the live site; the
+baseline is the scraper as it was before single-parse extraction, loaded
+from git
+"""
+
+import contextlib
+import io
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from html_parser import BACKENDS, HAS_LXML, parse_html
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# The commit whose extraction path the benchmark measures against
+BASELINE_REF = 'cd1fbcf'
+
+
+def load_fixture_pages(fixtures_dir=FIXTURES_DIR):
+    """Read every saved .html page in a directory"""
+    return [path.read_bytes() for path in sorted(fixtures_dir.glob('*.html'))]
+
+
+def load_baseline_scraper(ref=BASELINE_REF):
+    """EnhancedWGScraper as it was at a commit, read with git show, or None outside a checkout"""
+    try:
+        source = subprocess.run(['git', 'show', f'{ref}:scraper/enhanced_wg_scraper.py'],
+                                cwd=Path(__file__).parent, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    module = types.ModuleType(f'enhanced_wg_scraper_{ref}')
+    exec(compile(source, f'{ref}:scraper/enhanced_wg_scraper.py', 'exec'), module.__dict__)
+
+    # Its __init__ opens a session and creates directories, none of which extraction uses
+    scraper = module.EnhancedWGScraper.__new__(module.EnhancedWGScraper)
+    scraper.base_url = "https://wg.com"
+    return scraper
+
+
+def bench_parsers(pages, repeat=5):
+    """Time detection + extraction per mode, return seconds per page for each"""
+    from enhanced_wg_scraper import EnhancedWGScraper
+    
+    scraper = EnhancedWGScraper()
+    timings = {}
+    
+    def run(label, extract):
+        # Extraction prints what it finds; printing is not what is being measured
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for content in pages:
+                    extract(content)
+            timings[label] = (time.perf_counter() - start) / (repeat * len(pages))
+    
+    # The baseline parsed every page twice with html.parser: once to detect, once to extract
+    baseline = load_baseline_scraper()
+    if baseline is not None:
+        def extract_baseline(content):
+            baseline.has_game_content(BeautifulSoup(content, 'html.parser'))
+            baseline.extract_comprehensive_game_data(content, 'en')
+        run(f'baseline ({BASELINE_REF})', extract_baseline)
+    
+    for backend in BACKENDS:
+        if backend == 'lxml' and not HAS_LXML:
+            continue
+        def extract_once(content, backend=backend):
+            soup = parse_html(content, backend)
+            scraper.has_game_content(soup)
+            scraper.extract_comprehensive_game_data(soup, 'en')
+        run(f'{backend}, parsed once', extract_once)
+    
+    scraper.close()
+    return timings
+
+
+def main(fixtures_dir=None):
+    if fixtures_dir is None:
+        fixtures_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURES_DIR
+    pages = load_fixture_pages(fixtures_dir) if fixtures_dir.exists() else []
+    
+    print("⏱️  WG Parser Benchmark")
+    print("=" * 40)
+    
+    if not pages:
+        print(f"❌ No .html fixture pages found in {fixtures_dir}")
+        return
+    
+    print(f"📄 {len(pages)} pages from {fixtures_dir}")
+    timings = bench_parsers(pages)
+    if f'baseline ({BASELINE_REF})' not in timings:
+        print(f"⚠️  Baseline {BASELINE_REF} not readable from git, comparing the current modes only")
+    baseline = next(iter(timings.values()))
+    for label, seconds in timings.items():
+        print(f"  {label:28s} {seconds * 1000:8.2f} ms/page  ({baseline / seconds:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+WG Blob Store
+Content-addressed image storage; public filenames are links into the store
+"""
+
+import hashlib
+import os
+import shutil
+from threading import Lock, get_ident
+
+from wg_assets import ASSETS_DIR, IMAGES_DIR
+
+# Same filesystem as the images directory so names can be hardlinks
+BLOB_DIR = ASSETS_DIR / ".blobs"
+
+
+def sha256_file(path, chunk_size=1 << 16):
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        self.incoming_dir = root / ".incoming"
+        self.lock = Lock()
+        self._inodes = None
+
+    def blob_path(self, digest):
+        """Get the store path for a digest"""
+        return self.root / digest[:2] / digest
+
+    def has(self, digest):
+        """Check whether a digest is already stored"""
+        return self.blob_path(digest).exists()
+
+    def put_bytes(self, data):
+        """Store bytes once, return their digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.blob_path(digest)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(f".{digest}.{os.getpid()}.{get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path)
+            self._remember(blob_path, digest)
+        return digest
+
+    def put_temp(self, tmp_path, digest):
+        """Move a verified temp file into the store under its digest"""
+        blob_path = self.blob_path(digest)
+        if blob_path.exists():
+            os.remove(tmp_path)
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, blob_path)
+            self._remember(blob_path, digest)
+        return digest
+
+    def link(self, digest, dest):
+        """Expose a stored blob under a public name, replacing it atomically
+
+        The name is a hardlink, or a copy across filesystems; never a symlink,
+        since the store is not committed and a clone would get dangling links
+        """
+        blob_path = self.blob_path(digest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        # Nothing to do when the name already is this blob
+        if not dest.is_symlink() and self.digest_for(dest) == digest:
+            return dest
+
+        tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.{get_ident()}.link")
+        if tmp_path.exists() or tmp_path.is_symlink():
+            os.remove(tmp_path)
+        try:
+            os.link(blob_path, tmp_path)
+        except OSError:
+            shutil.copyfile(blob_path, tmp_path)
+        os.replace(tmp_path, dest)
+        return dest
+
+    def store(self, data, dest):
+        """Store bytes and expose them at dest, return the digest"""
+        digest = self.put_bytes(data)
+        self.link(digest, dest)
+        return digest
+
+    def adopt(self, path):
+        """Turn a plain file into a link to its blob, return the digest"""
+        digest = self.digest_for(path)
+        if digest is not None and not path.is_symlink():
+            return digest
+
+        # Symlinks left by older runs are replaced with hardlinks too
+        digest = digest or sha256_file(path)
+        blob_path = self.blob_path(digest)
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, blob_path)
+            except OSError:
+                shutil.copyfile(path, blob_path)
+            self._remember(blob_path, digest)
+        self.link(digest, path)
+        return digest
+
+    def _remember(self, blob_path, digest):
+        if self._inodes is not None:
+            st = blob_path.stat()
+            with self.lock:
+                self._inodes[(st.st_dev, st.st_ino)] = digest
+
+    def _inode_index(self):
+        """Map (device, inode) of every blob to its digest, built once"""
+        with self.lock:
+            if self._inodes is None:
+                self._inodes = {}
+                if self.root.exists():
+                    for shard in os.scandir(self.root):
+                        if not shard.is_dir() or shard.name.startswith('.'):
+                            continue
+                        for entry in os.scandir(shard.path):
+                            if entry.name.startswith('.'):
+                                continue
+                            st = entry.stat()
+                            self._inodes[(st.st_dev, st.st_ino)] = entry.name
+            return self._inodes
+
+    def digest_for(self, path):
+        """Get the digest of a linked public file without hashing it, or None"""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return self._inode_index().get((st.st_dev, st.st_ino))
+
+    def digest_of(self, path):
+        """Get the digest of any file, hashing it only when it is not a link"""
+        return self.digest_for(path) or sha256_file(path)
+
+    def adopt_all(self, directory):
+        """Move every file in a directory into the store, return (files, bytes saved)"""
+        seen = set()
+        saved = 0
+        files = 0
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            size = entry.stat().st_size
+            digest = self.adopt(directory / entry.name)
+            if digest in seen:
+                saved += size
+            seen.add(digest)
+            files += 1
+        return files, saved
+
+
+def main():
+    print("🗄️  WG Blob Store")
+    print("=" * 40)
+    
+    store = BlobStore()
+    files, saved = store.adopt_all(IMAGES_DIR)
+    
+    print(f"📁 Linked {files} files in {IMAGES_DIR} into {store.root}")
+    print(f"💾 Duplicate bytes no longer stored twice: {saved}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+WG Catalog Columns
+Compact columnar snapshot of games.json for bulk readers; columns are
+loaded lazily straight out of an mmap instead of parsing the whole JSON
+
+Layout: 8-byte magic, u32 header length, JSON header describing each
+column's kind and byte ranges, then 8-byte aligned little-endian arrays.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'WGCOLS1\0'
+
+# (column name, kind) for every column the snapshot carries
+COLUMNS = [
+    ('id', 'str'),
+    ('name', 'map'),
+    ('description', 'map'),
+    ('category', 'interned'),
+    ('platform', 'interned_list'),
+    ('size', 'str'),
+    ('provider', 'interned'),
+    ('rating', 'f32'),
+    ('players', 'interned'),
+    ('status', 'interned'),
+    ('features', 'interned_list'),
+    ('language', 'interned'),
+    ('launchUrl', 'str'),
+    ('images.main', 'str'),
+    ('images.icon', 'str'),
+    ('images.local_main', 'str'),
+    ('images.local_icon', 'str'),
+    ('images.sha256.local_main', 'str'),
+    ('images.sha256.local_icon', 'str'),
+    ('images.language_neutral', 'bool'),
+    ('images.derivatives', 'json'),
+    ('imageMetadata.id', 'str'),
+    ('imageMetadata.language', 'interned'),
+]
+
+# Code reserved for a missing value in interned columns
+MISSING = 0xFFFF
+
+# Byte stored for a missing value in bool columns
+MISSING_BOOL = 2
+
+
+def _field(game, path):
+    value = game
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def json_text(value):
+    """Canonical JSON text of a value, as json columns store it"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _le_bytes(values):
+    """Serialize an array as little-endian bytes"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Writer:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data):
+        """Append an 8-byte aligned block, return its (offset, length)"""
+        pad = -self.size % 8
+        if pad:
+            self.chunks.append(b'\0' * pad)
+            self.size += pad
+        offset = self.size
+        self.chunks.append(data)
+        self.size += len(data)
+        return [offset, len(data)]
+
+    def strings(self, values):
+        """Write a string column as a u32 offset table plus UTF-8 data"""
+        offsets = array('I', [0])
+        data = bytearray()
+        present = array('B')
+        for value in values:
+            present.append(value is not None)
+            if value is not None:
+                data += str(value).encode('utf-8')
+            offsets.append(len(data))
+        return {
+            'offsets': self.add(_le_bytes(offsets)),
+            'data': self.add(bytes(data)),
+            'present': self.add(present.tobytes()),
+        }
+
+    def dictionary(self, values):
+        """Intern values into a dictionary column, return (spec, value -> code)"""
+        table = sorted({value for value in values if value is not None}, key=str)
+        if len(table) >= MISSING:
+            raise ValueError("too many distinct values to intern")
+        return self.strings(table), {value: code for code, value in enumerate(table)}
+
+
+def encode_columns(games):
+    """Build the columnar snapshot of a catalog as bytes"""
+    writer = _Writer()
+    header = {'count': len(games), 'columns': {}}
+
+    for name, kind in COLUMNS:
+        values = [_field(game, name) for game in games]
+
+        if kind == 'str':
+            spec = writer.strings(values)
+
+        elif kind == 'json':
+            # Canonical text, so equal values compare equal as strings
+            spec = writer.strings([json_text(v) if v is not None else None for v in values])
+
+        elif kind == 'f32':
+            numbers = array('f', [float(v) if isinstance(v, (int, float)) else math.nan for v in values])
+            spec = {'values': writer.add(_le_bytes(numbers))}
+
+        elif kind == 'bool':
+            column = array('B', [int(v) if isinstance(v, bool) else MISSING_BOOL for v in values])
+            spec = {'values': writer.add(column.tobytes())}
+
+        elif kind == 'interned':
+            spec, codes = writer.dictionary(values)
+            column = array('H', [codes[v] if v is not None else MISSING for v in values])
+            spec = {'dict': spec, 'codes': writer.add(_le_bytes(column))}
+
+        elif kind == 'interned_list':
+            lists = [v if isinstance(v, list) else [] for v in values]
+            spec, codes = writer.dictionary([item for items in lists for item in items])
+            offsets = array('I', [0])
+            column = array('H')
+            for items in lists:
+                column.extend(codes[item] for item in items)
+                offsets.append(len(column))
+            spec = {'dict': spec, 'offsets': writer.add(_le_bytes(offsets)), 'codes': writer.add(_le_bytes(column))}
+
+        elif kind == 'map':
+            # Plain strings (untranslated names) are stored under the '' key
+            maps = [v if isinstance(v, dict) else ({'': v} if v is not None else {}) for v in values]
+            spec, codes = writer.dictionary([key for m in maps for key in m])
+            offsets = array('I', [0])
+            keys = array('H')
+            entries = []
+            for m in maps:
+                for key, text in m.items():
+                    keys.append(codes[key])
+                    entries.append(text)
+                offsets.append(len(keys))
+            spec = {
+                'keys': spec,
+                'offsets': writer.add(_le_bytes(offsets)),
+                'key_codes': writer.add(_le_bytes(keys)),
+                'values': writer.strings(entries),
+            }
+
+        spec['kind'] = kind
+        header['columns'][name] = spec
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    base = len(prefix) + (-len(prefix) % 8)
+    prefix += b'\0' * (base - len(prefix))
+    return b''.join([prefix] + writer.chunks)
+
+
+def write_columns(games, path):
+    """Write the columnar snapshot of a catalog atomically"""
+    data = encode_columns(games)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class StrColumn:
+    def __init__(self, buf, spec):
+        self.offsets = CatalogColumns.view(buf, spec['offsets'], 'I')
+        self.data = buf[spec['data'][0]:sum(spec['data'])]
+        self.present = buf[spec['present'][0]:sum(spec['present'])]
+
+    def __len__(self):
+        return len(self.present)
+
+    def __getitem__(self, i):
+        if not self.present[i]:
+            return None
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def tolist(self):
+        """Decode the whole column at once, much faster than indexing row by row"""
+        data = bytes(self.data)
+        offsets = self.offsets.tolist()
+        text = data.decode('utf-8')
+        if len(text) == len(data):
+            # Pure ASCII: byte offsets are character offsets, so slice the decoded text
+            values = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        else:
+            values = [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        return [value if flag else None for value, flag in zip(values, bytes(self.present))]
+
+
+class JsonColumn(StrColumn):
+    """Nested values such as the derivatives map; indexing decodes, tolist() keeps the canonical text"""
+
+    def __getitem__(self, i):
+        text = super().__getitem__(i)
+        return None if text is None else json.loads(text)
+
+
+class BoolColumn:
+    def __init__(self, buf, spec):
+        self.values = buf[spec['values'][0]:sum(spec['values'])]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        return None if value == MISSING_BOOL else bool(value)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def tolist(self):
+        """Decode the whole column at once"""
+        return [None if value == MISSING_BOOL else bool(value) for value in bytes(self.values)]
+
+
+class F32Column:
+    def __init__(self, buf, spec):
+        self.values = CatalogColumns.view(buf, spec['values'], 'f')
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        return None if math.isnan(value) else round(value, 4)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class InternedColumn:
+    def __init__(self, buf, spec):
+        self.dict = list(StrColumn(buf, spec['dict']))
+        self.codes = CatalogColumns.view(buf, spec['codes'], 'H')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return None if code == MISSING else self.dict[code]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class InternedListColumn:
+    def __init__(self, buf, spec):
+        self.dict = list(StrColumn(buf, spec['dict']))
+        self.offsets = CatalogColumns.view(buf, spec['offsets'], 'I')
+        self.codes = CatalogColumns.view(buf, spec['codes'], 'H')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return [self.dict[code] for code in self.codes[self.offsets[i]:self.offsets[i + 1]]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class MapColumn:
+    def __init__(self, buf, spec):
+        self.keys = list(StrColumn(buf, spec['keys']))
+        self.offsets = CatalogColumns.view(buf, spec['offsets'], 'I')
+        self.key_codes = CatalogColumns.view(buf, spec['key_codes'], 'H')
+        self.values = StrColumn(buf, spec['values'])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        entries = {self.keys[self.key_codes[j]]: self.values[j] for j in range(start, end)}
+        if list(entries) == ['']:
+            return entries['']
+        return entries or None
+
+    def get(self, i, lang):
+        """Get one language's text for a row without building the whole map"""
+        for j in range(self.offsets[i], self.offsets[i + 1]):
+            if self.keys[self.key_codes[j]] == lang:
+                return self.values[j]
+        return None
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+COLUMN_TYPES = {
+    'str': StrColumn,
+    'json': JsonColumn,
+    'f32': F32Column,
+    'bool': BoolColumn,
+    'interned': InternedColumn,
+    'interned_list': InternedListColumn,
+    'map': MapColumn,
+}
+
+
+class CatalogColumns:
+    def __init__(self, path, data=None):
+        """Map a snapshot file, or read one already in memory when data is given"""
+        self.path = path
+        self.mmap = None
+        if data is None:
+            with open(path, 'rb') as f:
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mmap if data is None else data)
+
+        if bytes(self.buf[:8]) != MAGIC:
+            raise ValueError(f"{path or 'data'} is not a catalog column snapshot")
+        header_len = struct.unpack_from('<I', self.buf, 8)[0]
+        self.header = json.loads(bytes(self.buf[12:12 + header_len]))
+        base = 12 + header_len
+        self.data = self.buf[base + (-base % 8):]
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.header['count']
+
+    @staticmethod
+    def view(buf, block, typecode):
+        """View a little-endian block of the snapshot as typed values"""
+        offset, length = block
+        raw = buf[offset:offset + length]
+        if sys.byteorder == 'little':
+            return raw.cast(typecode)
+        values = array(typecode, bytes(raw))
+        values.byteswap()
+        return values
+
+    def names(self):
+        """List the column names in the snapshot"""
+        return list(self.header['columns'])
+
+    def column(self, name):
+        """Load a single column, decoding nothing until values are read"""
+        if name not in self._columns:
+            spec = self.header['columns'][name]
+            self._columns[name] = COLUMN_TYPES[spec['kind']](self.data, spec)
+        return self._columns[name]
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def row(self, i, names=None):
+        """Rebuild one game as a flat {column: value} dict"""
+        return {name: self.column(name)[i] for name in (names or self.names())}
+
+    def close(self):
+        """Release the mapping, or leave it to the last column still in use"""
+        self._columns = {}
+        self.data = self.buf = None
+        if self.mmap is None:
+            return
+        try:
+            self.mmap.close()
+        except BufferError:
+            pass
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+WG Catalog Reconcile
+Joins the catalog's imageMetadata.id column against the asset index in one
+pass: each distinct image ID is ranked over the language preference once,
+gathered back to its games, and compared with what the catalog already
+holds, so only games whose images actually changed get a patch. A main
+image with derivatives brings its responsive widths along, and its 128px
+icon replaces the upstream one
+
+Uses numpy when it is installed, working on the snapshot's raw column
+bytes without decoding a string per game; otherwise an equivalent dict
+join over decoded columns.
+"""
+
+import json
+from pathlib import Path
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from catalog_columns import COLUMNS, json_text
+from image_derivatives import derivatives_map, derived_files
+from wg_assets import LANGUAGES, PUBLIC_IMAGE_PREFIX
+
+COLUMN_KINDS = dict(COLUMNS)
+
+
+def _strings(column):
+    """A string column's values, '' where missing; fixed-width bytes built without a loop under numpy"""
+    if not HAS_NUMPY:
+        return [value or '' for value in column.tolist()]
+
+    offsets = np.asarray(column.offsets, dtype=np.int64)
+    data = np.frombuffer(column.data, dtype=np.uint8)
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if len(lengths) else 0
+    if not width:
+        return np.zeros(len(lengths), dtype='S1')
+
+    # A width-byte window at each offset, tails past the value zeroed, viewed as fixed-width strings
+    windows = np.lib.stride_tricks.sliding_window_view(np.concatenate([data, np.zeros(width, np.uint8)]), width)
+    chars = windows[offsets[:-1]]
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return chars.view(f'S{width}').ravel()
+
+
+def _encoded(values):
+    """Per-distinct-ID strings in the form _strings() returns"""
+    if not HAS_NUMPY:
+        return values
+    return np.array([value.encode('utf-8') for value in values] or [b''])[:len(values)]
+
+
+def _flags(values):
+    return np.array(values, dtype=bool) if HAS_NUMPY else values
+
+
+def _distinct(values):
+    """Distinct values (as str) and, per game, the index of its value among them"""
+    if HAS_NUMPY:
+        if values.dtype.itemsize <= 8:
+            # Short values such as image IDs sort far faster as 64-bit integers
+            distinct, inverse = np.unique(values.astype('S8').view(np.uint64), return_inverse=True)
+            distinct = distinct.view('S8')
+        else:
+            distinct, inverse = np.unique(values, return_inverse=True)
+        return [value.decode('utf-8') for value in distinct.tolist()], inverse
+    index = {}
+    inverse = [index.setdefault(value, len(index)) for value in values]
+    return list(index), inverse
+
+
+def _best(distinct, languages, asset_index, variant):
+    """Filename of each distinct ID's file in its first preferred language, None where there is none"""
+    if not HAS_NUMPY:
+        return [asset_index.best(img_id, languages, variant) for img_id in distinct]
+
+    rank = {lang: j for j, lang in enumerate(languages)}
+    position = {img_id: k for k, img_id in enumerate(distinct)}
+    files = [(position[img_id], rank[lang], name) for (img_id, lang, file_variant), name in asset_index.images.items()
+             if file_variant == variant and lang in rank and img_id in position]
+    if not files:
+        return [None] * len(distinct)
+
+    # (distinct ID x language) matrix of indexes into names, len(files) where absent;
+    # argmax over presence finds the first preferred language that has a file
+    rows, ranks, names = zip(*files)
+    matrix = np.full((len(distinct), len(languages)), len(files))
+    matrix[list(rows), list(ranks)] = np.arange(len(files))
+    first = (matrix < len(files)).argmax(axis=1)
+    names = list(names) + [None]
+    return [names[k] for k in matrix[np.arange(len(distinct)), first].tolist()]
+
+
+def _gather(values, inverse):
+    """Spread per-distinct values back out to one per game"""
+    if HAS_NUMPY:
+        return values[inverse]
+    return [values[k] for k in inverse]
+
+
+def _kept_rows(active, applies):
+    """Games that keep their current value for a field: not reconciled, or without a file for it"""
+    if HAS_NUMPY:
+        return np.flatnonzero(~(active & applies)).tolist()
+    return [i for i, (use, has) in enumerate(zip(active, applies)) if not (use and has)]
+
+
+def _file_digest(public_path, asset_index, blob_store, derived=()):
+    """Digest of a /assets/images/games/... file, '' when it is not on disk
+
+    derived holds the names of files in derived/, which the asset index does not list
+    """
+    name = public_path.replace(PUBLIC_IMAGE_PREFIX, '')
+    if not (asset_index.has_public(public_path) or name in derived):
+        return ''
+    return blob_store.digest_of(asset_index.images_dir / name)
+
+
+def _changed_rows(desired, current, applies):
+    """Rows where a field applies and its desired value differs from the catalog's"""
+    if HAS_NUMPY:
+        return np.flatnonzero(applies & (desired != current)).tolist()
+    return [i for i, (want, have, use) in enumerate(zip(desired, current, applies)) if use and want != have]
+
+
+def _plain(value):
+    """Turn a joined value back into what games.json stores, None for an empty string"""
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    if HAS_NUMPY and isinstance(value, np.bool_):
+        return bool(value)
+    return None if value == '' else value
+
+
+def reconcile_columns(columns, asset_index, languages=LANGUAGES, blob_store=None, phash_index=None):
+    """Patches pointing each game at its best local images, for the games that change only"""
+    distinct, inverse = _distinct(_strings(columns['imageMetadata.id']))
+    known = _gather(_flags([img_id != '' for img_id in distinct]), inverse)
+
+    best = {variant: _best(distinct, languages, asset_index, variant) for variant in ('main', 'icon')}
+
+    # A main image whose languages dedupe linked to one blob is the same file in every locale
+    neutral = [False] * len(distinct)
+    if phash_index is not None:
+        position = {img_id: k for k, img_id in enumerate(distinct)}
+        for img_id, variant in phash_index.images:
+            if variant == 'main' and img_id in position:
+                neutral[position[img_id]] = phash_index.shared(img_id, 'main')
+
+    # Derivatives of each distinct main image; its real 128px icon wins over the upstream icon
+    derived = derived_files(asset_index.images_dir)
+    derived_names = {name for files in derived.values() for name in files.values()}
+    widths = []
+    for k, name in enumerate(best['main']):
+        icon, sizes = derivatives_map(derived.get(Path(name).stem, {}) if name else {})
+        if icon:
+            best['icon'][k] = icon
+        widths.append(json_text({fmt: {width: PUBLIC_IMAGE_PREFIX + path for width, path in paths.items()}
+                                 for fmt, paths in sizes.items()}) if sizes else '')
+
+    has = {variant: _gather(_flags([name is not None for name in best[variant]]), inverse) for variant in best}
+    if HAS_NUMPY:
+        active = known & (has['main'] | has['icon'])
+    else:
+        active = [use and (main or icon) for use, main, icon in zip(known, has['main'], has['icon'])]
+
+    # path -> (desired, current, applies) for every field reconcile owns
+    fields = {}
+    for variant in ('main', 'icon'):
+        paths = _encoded([PUBLIC_IMAGE_PREFIX + name if name else '' for name in best[variant]])
+        fields[f'images.local_{variant}'] = (_gather(paths, inverse), _strings(columns[f'images.local_{variant}']),
+                                             has[variant])
+    fields['images.derivatives'] = (_gather(_encoded(widths), inverse), _strings(columns['images.derivatives']),
+                                    has['main'])
+
+    if blob_store is not None:
+        # Every game's local images get a digest, reconciled by image ID or not
+        every = _gather(_flags([True] * len(distinct)), inverse)
+        for variant in ('main', 'icon'):
+            _, current, applies = fields[f'images.local_{variant}']
+
+            # Digest each distinct file once, not once per game pointing at it
+            digests = [_file_digest(PUBLIC_IMAGE_PREFIX + name, asset_index, blob_store, derived_names) if name else ''
+                       for name in best[variant]]
+            digest_index = inverse.copy() if HAS_NUMPY else list(inverse)
+
+            # Games that keep their current path have it digested, once per path
+            extra = {}
+            for i in _kept_rows(active, applies):
+                path = _plain(current[i])
+                if path:
+                    if path not in extra:
+                        extra[path] = len(digests)
+                        digests.append(_file_digest(path, asset_index, blob_store, derived_names))
+                    digest_index[i] = extra[path]
+            fields[f'images.sha256.local_{variant}'] = (_gather(_encoded(digests), digest_index),
+                                                        _strings(columns[f'images.sha256.local_{variant}']), every)
+
+    if phash_index is not None:
+        current = columns['images.language_neutral']
+        current = np.frombuffer(current.values, dtype=np.uint8) if HAS_NUMPY else current.tolist()
+        fields['images.language_neutral'] = (_gather(_flags(neutral), inverse), current, active)
+
+    changes = {}
+    for path, (desired, current, applies) in fields.items():
+        for i in _changed_rows(desired, current, applies):
+            patch = changes.setdefault(i, {'id': columns['id'][i], 'set': {}})
+            value = _plain(desired[i])
+            if value is not None and COLUMN_KINDS[path] == 'json':
+                value = json.loads(value)
+            if value is None:
+                patch.setdefault('unset', []).append(path)
+            else:
+                patch['set'][path] = value
+
+    return [changes[i] for i in sorted(changes)]
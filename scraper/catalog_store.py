@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+WG Catalog Store
+Single owner of games.json: per-game patches go to an append-only journal
+and are compacted into games.json under a file lock with an atomic rename,
+alongside a columnar snapshot (games.cols) for bulk readers. Compaction
+rewrites the whole file, so it waits for a publish or a large journal
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; runs there are not locked
+    fcntl = None
+
+from catalog_columns import COLUMNS, CatalogColumns, encode_columns, write_columns
+from wg_assets import GAMES_JSON
+
+# Journal size past which writers fold it into games.json themselves; smaller
+# journals wait for an explicit publish (wgscrape publish)
+COMPACT_THRESHOLD = 1 << 20
+
+
+def apply_patch(game, changes, removals=()):
+    """Apply dotted-path changes (e.g. 'images.local_main') to a game in place"""
+    for path, value in changes.items():
+        target = game
+        *parents, field = path.split('.')
+        for parent in parents:
+            if not isinstance(target.get(parent), dict):
+                target[parent] = {}
+            target = target[parent]
+        target[field] = value
+
+    for path in removals:
+        target = game
+        *parents, field = path.split('.')
+        for parent in parents:
+            target = target.get(parent)
+            if not isinstance(target, dict):
+                break
+        else:
+            target.pop(field, None)
+    return game
+
+
+class CatalogStore:
+    def __init__(self, path=GAMES_JSON):
+        self.path = path
+        self.journal_path = path.with_name(path.name + '.journal')
+        self.lock_path = path.with_name(path.name + '.lock')
+        self.columns_path = path.with_suffix('.cols')
+
+    @contextmanager
+    def locked(self, exclusive=True):
+        """Hold the catalog lock while reading or writing"""
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_journal(self):
+        """Read journal patches, ignoring a torn last line from a crashed writer"""
+        if not self.journal_path.exists():
+            return []
+        patches = []
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    patches.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return patches
+
+    def _load_unlocked(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            games = json.load(f)
+
+        patches = self._read_journal()
+        if patches:
+            by_id = {game['id']: game for game in games}
+            for patch in patches:
+                game = by_id.get(patch['id'])
+                if game is None:
+                    game = by_id[patch['id']] = {'id': patch['id']}
+                    games.append(game)
+                apply_patch(game, patch.get('set', {}), patch.get('unset', ()))
+        return games
+
+    def load(self):
+        """Load the catalog with every pending patch applied"""
+        with self.locked(exclusive=False):
+            return self._load_unlocked()
+
+    def append_patches(self, patches):
+        """Append {'id', 'set', 'unset'} patches to the journal without rewriting games.json"""
+        if not patches:
+            return 0
+        lines = []
+        for patch in patches:
+            entry = {'id': patch['id'], 'set': patch.get('set', {}), 'ts': time.time()}
+            if patch.get('unset'):
+                entry['unset'] = list(patch['unset'])
+            lines.append(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        with self.locked():
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        return len(lines)
+
+    def patch(self, game_id, changes, removals=()):
+        """Append a single game's patch to the journal"""
+        return self.append_patches([{'id': game_id, 'set': changes, 'unset': removals}])
+
+    def _write_unlocked(self, games):
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(games, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        write_columns(games, self.columns_path)
+        if self.journal_path.exists():
+            os.remove(self.journal_path)
+
+    def compact(self):
+        """Fold the journal into games.json, return how many patches were applied"""
+        with self.locked():
+            pending = len(self._read_journal())
+            if pending:
+                self._write_unlocked(self._load_unlocked())
+            return pending
+
+    def journal_size(self):
+        """Bytes of patches waiting in the journal"""
+        try:
+            return self.journal_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def maybe_compact(self, threshold=COMPACT_THRESHOLD):
+        """Compact only once the journal has outgrown threshold bytes, return how many patches were applied"""
+        if self.journal_size() <= threshold:
+            return 0
+        return self.compact()
+
+    def pending(self):
+        """Count the patches waiting to be published"""
+        with self.locked(exclusive=False):
+            return len(self._read_journal())
+
+    def _columns_unlocked(self):
+        if self.journal_path.exists() or not self.columns_path.exists():
+            return None
+        if self.columns_path.stat().st_mtime < self.path.stat().st_mtime:
+            return None
+        columns = CatalogColumns(self.columns_path)
+
+        # A snapshot written before a column was added is rebuilt like a stale one
+        if any(name not in columns.header['columns'] for name, _ in COLUMNS):
+            columns.close()
+            return None
+        return columns
+
+    def columns(self):
+        """Open the columnar snapshot if it matches games.json, otherwise None"""
+        with self.locked(exclusive=False):
+            return self._columns_unlocked()
+
+    def read_columns(self):
+        """Columnar view of the catalog with pending patches applied, writing nothing
+
+        The games.cols snapshot is used while it is current; otherwise a
+        snapshot is built in memory from games.json with the journal
+        replayed, so readers never compact or rewrite anything on disk
+        """
+        with self.locked(exclusive=False):
+            columns = self._columns_unlocked()
+            if columns is None:
+                columns = CatalogColumns(None, encode_columns(self._load_unlocked()))
+        return columns
+
+    def publish(self):
+        """Fold the journal into games.json and bring games.cols up to date, return how many patches were applied"""
+        with self.locked():
+            pending = len(self._read_journal())
+            if pending:
+                self._write_unlocked(self._load_unlocked())
+            else:
+                columns = self._columns_unlocked()
+                if columns is None:
+                    write_columns(self._load_unlocked(), self.columns_path)
+                else:
+                    columns.close()
+            return pending
+
+    def replace_all(self, games):
+        """Replace the whole catalog, dropping any pending patches"""
+        with self.locked():
+            self._write_unlocked(games)
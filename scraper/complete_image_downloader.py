@@ -4,68 +4,30 @@ Complete WG Image Downloader
 Downloads all images with all languages and ensures complete coverage
 """
 
-import json
-import requests
-import time
+import argparse
 from pathlib import Path
 import os
 
-def load_games_data():
-    """Load games data from JSON file"""
-    json_path = Path(__file__).parent.parent / "public" / "assets" / "games.json"
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from asset_index import AssetIndex
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from fetch_engine import FetchEngine
+from id_sweeper import IdSweeper, catalog_image_ids
+from image_pipeline import reconcile_patches, verify_catalog
+from phash_index import PerceptualIndex
+from probe_index import ProbeIndex
+from validator_store import ValidatorStore
+from wg_assets import LANGUAGES, image_url, image_filename
 
-def save_games_data(games_data):
-    """Save games data back to JSON file"""
-    json_path = Path(__file__).parent.parent / "public" / "assets" / "games.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(games_data, f, indent=2, ensure_ascii=False)
+def get_all_image_ids(engine, images_dir):
+    """Discover image IDs by sweeping the ID space, seeded with the IDs the catalog knows"""
+    sweeper = IdSweeper(engine, ProbeIndex(), LANGUAGES, images_dir=images_dir)
+    ids = sweeper.sweep(catalog_image_ids(CatalogStore()))
+    print(f"🔎 Swept the ID space with {sweeper.probes} probes, found {len(ids)} image IDs")
+    return ids
 
-def download_image_safe(url, local_path):
-    """Safely download an image with timeout and error handling"""
-    try:
-        # Check if file already exists
-        if local_path.exists():
-            return True
-            
-        response = requests.get(url, timeout=8)
-        if response.status_code == 200:
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            return True
-        return False
-    except Exception as e:
-        return False
-
-def get_all_image_ids():
-    """Get comprehensive list of all possible image IDs"""
-    # From web search results and existing files
-    base_ids = [
-        # Known working IDs
-        1001, 1002, 1003, 1004, 1005,
-        2001, 2002, 2003, 2004, 2005,
-        3001, 3002, 3003, 3004, 3005,
-        4001, 4002, 4004,  # 4003 might not exist
-        5001, 5002, 5003, 5004, 5005, 5006, 5007, 5008, 5009, 5010,
-        3035,  # From web search
-    ]
-    
-    # Add more ranges systematically
-    for start in range(1000, 6000, 1000):
-        for i in range(1, 11):
-            base_ids.append(start + i)
-    
-    # Add some specific ranges that might exist
-    for start in range(6000, 20000, 1000):
-        for i in range(1, 6):  # Only first 5 to avoid too many
-            base_ids.append(start + i)
-    
-    return sorted(set(base_ids))
-
-def download_all_images():
-    """Download all images with all languages"""
+def download_all_images(max_in_flight=32, refresh=False, assets=None):
+    """Download all images with all languages, revalidating existing ones when refreshing"""
     print("🚀 Complete WG Image Downloader")
     print("=" * 50)
     
@@ -73,73 +35,75 @@ def download_all_images():
     images_dir.mkdir(parents=True, exist_ok=True)
     
     # All languages to try
-    languages = ['zh', 'en', 'th', 'vi', 'ja', 'ko', 'es', 'fr', 'de', 'pt', 'ru', 'ar']
+    languages = LANGUAGES
+    
+    # One listing of the directory, kept current by the engine as files land
+    if assets is None:
+        assets = AssetIndex(images_dir)
+    
+    validators = ValidatorStore()
+    engine = FetchEngine(max_in_flight=max_in_flight, timeout=8, blob_store=BlobStore(), validators=validators,
+                         asset_index=assets)
     
     # Get all image IDs
-    all_ids = get_all_image_ids()
+    all_ids = get_all_image_ids(engine, images_dir)
     
     print(f"📋 Processing {len(all_ids)} image IDs")
     print(f"🌐 Languages: {', '.join(languages)}")
     print(f"📁 Target directory: {images_dir}")
+    if refresh:
+        print("🔄 Refresh mode: revalidating existing images with conditional requests")
     print()
     
     downloaded_count = 0
     failed_count = 0
     skipped_count = 0
     
-    for i, img_id in enumerate(all_ids, 1):
-        print(f"[{i:3d}/{len(all_ids)}] ID: {img_id:5d} - ", end="")
-        
-        id_downloaded = 0
-        id_failed = 0
-        id_skipped = 0
-        
+    # Queue every missing image, remembering which ID it belongs to
+    jobs = []
+    job_ids = []
+    skipped_by_id = {img_id: 0 for img_id in all_ids}
+    
+    for img_id in all_ids:
         for lang in languages:
-            # Main image
-            main_url = f"https://wg.com/oss-proxy/official-website/apigame/{lang}/img/{img_id}.webp"
-            main_filename = f"wg_game_{img_id}_{lang}.webp"
-            main_path = images_dir / main_filename
-            
-            if main_path.exists():
-                id_skipped += 1
-            elif download_image_safe(main_url, main_path):
-                id_downloaded += 1
-                downloaded_count += 1
-            else:
-                id_failed += 1
-                failed_count += 1
-            
-            # Icon image
-            icon_url = f"https://wg.com/oss-proxy/official-website/apigame/{lang}/img/{img_id}_icon.webp"
-            icon_filename = f"wg_game_{img_id}_{lang}_icon.webp"
-            icon_path = images_dir / icon_filename
-            
-            if icon_path.exists():
-                id_skipped += 1
-            elif download_image_safe(icon_url, icon_path):
-                id_downloaded += 1
-                downloaded_count += 1
-            else:
-                id_failed += 1
-                failed_count += 1
+            for variant in ('main', 'icon'):
+                local_path = images_dir / image_filename(lang, img_id, variant)
+                if assets.has(img_id, lang, variant) and not (refresh and validators.get(local_path)):
+                    skipped_by_id[img_id] += 1
+                else:
+                    jobs.append((image_url(lang, img_id, variant), local_path))
+                    job_ids.append(img_id)
+    
+    with engine:
+        results = engine.download_many(jobs, refresh=refresh)
+    
+    downloaded_by_id = {img_id: 0 for img_id in all_ids}
+    failed_by_id = {img_id: 0 for img_id in all_ids}
+    for img_id, result in zip(job_ids, results):
+        if result['not_modified']:
+            skipped_by_id[img_id] += 1
+        elif result['ok']:
+            downloaded_by_id[img_id] += 1
+        else:
+            failed_by_id[img_id] += 1
+    
+    for i, img_id in enumerate(all_ids, 1):
+        id_downloaded = downloaded_by_id[img_id]
+        id_failed = failed_by_id[img_id]
+        id_skipped = skipped_by_id[img_id]
         
+        downloaded_count += id_downloaded
+        failed_count += id_failed
         skipped_count += id_skipped
         
-        # Show progress for this ID
+        # Show results for this ID
+        print(f"[{i:3d}/{len(all_ids)}] ID: {img_id:5d} - ", end="")
         if id_downloaded > 0:
             print(f"✅ Downloaded: {id_downloaded}, Skipped: {id_skipped}, Failed: {id_failed}")
         elif id_skipped > 0:
             print(f"⏭️  Skipped: {id_skipped}, Failed: {id_failed}")
         else:
             print(f"❌ Failed: {id_failed}")
-        
-        # Small delay to be respectful
-        time.sleep(0.1)
-        
-        # Progress update every 50 IDs
-        if i % 50 == 0:
-            print(f"\n📊 Progress: Downloaded: {downloaded_count}, Skipped: {skipped_count}, Failed: {failed_count}")
-            print()
     
     print()
     print("🎉 Download phase complete!")
@@ -149,111 +113,71 @@ def download_all_images():
     
     return downloaded_count
 
-def update_json_with_all_images():
+def update_json_with_all_images(assets=None):
     """Update JSON with all available images, prioritizing by language preference"""
     print("\n🔄 Updating JSON with all available images...")
     
-    games_data = load_games_data()
+    catalog = CatalogStore()
     images_dir = Path(__file__).parent.parent / "public" / "assets" / "images" / "games"
+    blob_store = BlobStore()
     
-    # Language preference order
-    language_preference = ['zh', 'en', 'th', 'vi', 'ja', 'ko', 'es', 'fr', 'de', 'pt', 'ru', 'ar']
+    # Images dedupe has linked across languages are flagged language neutral
+    phash = PerceptualIndex(blob_store)
+    phash_index = phash if phash.available and phash.files else None
     
-    updated_count = 0
-    
-    for game in games_data:
-        game_id = game['id']
-        base_id = game.get('imageMetadata', {}).get('id') if game.get('imageMetadata') else None
-        
-        if not base_id:
-            continue
-        
-        # Find best available images by language preference
-        best_main = None
-        best_icon = None
-        
-        for lang in language_preference:
-            main_filename = f"wg_game_{base_id}_{lang}.webp"
-            icon_filename = f"wg_game_{base_id}_{lang}_icon.webp"
-            
-            main_path = images_dir / main_filename
-            icon_path = images_dir / icon_filename
-            
-            if main_path.exists() and not best_main:
-                best_main = f"/assets/images/games/{main_filename}"
-            if icon_path.exists() and not best_icon:
-                best_icon = f"/assets/images/games/{icon_filename}"
-        
-        # Update game data
-        if best_main or best_icon:
-            if 'images' not in game:
-                game['images'] = {}
-            
-            if best_main:
-                game['images']['local_main'] = best_main
-            if best_icon:
-                game['images']['local_icon'] = best_icon
-            
-            updated_count += 1
+    # Pick the best image per game by language preference, patching only games that change
+    patches = reconcile_patches(catalog, LANGUAGES, images_dir, blob_store, phash_index, assets)
+    updated_count = len(patches)
     
-    # Save updated data
-    save_games_data(games_data)
+    # Journal the changed games; games.json is rewritten on publish or once the journal is large
+    catalog.append_patches(patches)
+    catalog.maybe_compact()
     
-    print(f"✅ Updated {updated_count} games in JSON")
+    print(f"✅ Updated {updated_count} games (run `python wgscrape.py publish` to write games.json)")
     return updated_count
 
-def verify_completeness():
-    """Verify that all games have images"""
+def verify_completeness(assets=None):
+    """Verify that all games have images and that every image file is sound"""
     print("\n🔍 Verifying completeness...")
     
-    games_data = load_games_data()
-    images_dir = Path(__file__).parent.parent / "public" / "assets" / "images" / "games"
-    
-    games_with_images = 0
-    games_without_images = 0
-    
-    for game in games_data:
-        has_main = False
-        has_icon = False
-        
-        if 'images' in game:
-            main_path = game['images'].get('local_main', '')
-            icon_path = game['images'].get('local_icon', '')
-            
-            if main_path:
-                main_file = images_dir / main_path.replace('/assets/images/games/', '')
-                has_main = main_file.exists()
-            
-            if icon_path:
-                icon_file = images_dir / icon_path.replace('/assets/images/games/', '')
-                has_icon = icon_file.exists()
-        
-        if has_main or has_icon:
-            games_with_images += 1
-        else:
-            games_without_images += 1
-            print(f"❌ {game['id']}: No images found")
+    result = verify_catalog(asset_index=assets, check_files=True)
+    for game_id in result['missing']:
+        print(f"❌ {game_id}: No images found")
+    for entry in result['broken']:
+        print(f"💥 {entry['name']}: {entry['problem']}")
+    games_with_images = result['with_images']
+    games_without_images = len(result['missing'])
     
     print(f"\n📊 Verification Results:")
     print(f"✅ Games with images: {games_with_images}")
     print(f"❌ Games without images: {games_without_images}")
-    print(f"📈 Coverage: {(games_with_images/len(games_data)*100):.1f}%")
+    print(f"💥 Broken image files: {len(result['broken'])} of {result['checked']}")
+    print(f"🗑️  Orphaned image files: {len(result['orphans'])}")
+    print(f"📈 Coverage: {(games_with_images/result['total']*100):.1f}%")
     
-    return games_without_images == 0
+    return games_without_images == 0 and not result['broken']
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Download all WG images and update games.json")
+    parser.add_argument('--refresh', action='store_true',
+                        help="revalidate existing images with conditional requests instead of skipping them")
+    args = parser.parse_args()
+    
     print("🎯 Complete WG Image Download and Update")
     print("=" * 60)
     
+    # Every step reads the same directory listing
+    assets = AssetIndex()
+    
     # Step 1: Download all images
-    downloaded = download_all_images()
+    downloaded = download_all_images(refresh=args.refresh, assets=assets)
     
     # Step 2: Update JSON with new images
-    updated = update_json_with_all_images()
+    updated = update_json_with_all_images(assets)
     
     # Step 3: Verify completeness
-    is_complete = verify_completeness()
+    is_complete = verify_completeness(assets)
     
     print("\n" + "=" * 60)
     print("🎉 COMPLETE!")
@@ -4,42 +4,54 @@ Comprehensive WG Image Downloader
 Analyzes and downloads all available images from wg.com with different languages and IDs
 """
 
-import json
+import collections
+import itertools
 import os
-import requests
-import time
 from pathlib import Path
 from urllib.parse import urlparse
 import concurrent.futures
 from threading import Lock
 
+from catalog_store import CatalogStore
+from fetch_engine import save_response
+from http_client import make_session
+from probe_index import ProbeIndex
+from retry_policy import DEFAULT_POLICY
+
 class WGImageDownloader:
-    def __init__(self):
+    def __init__(self, probe_window=8):
         self.base_url = "https://wg.com/oss-proxy/official-website/apigame"
         self.languages = ['zh', 'en', 'th', 'vi', 'ja', 'ko', 'es', 'fr', 'de', 'pt', 'ru', 'ar']
         self.images_dir = Path(__file__).parent.parent / "public" / "assets" / "images" / "games"
-        self.json_path = Path(__file__).parent.parent / "public" / "assets" / "games.json"
+        self.catalog = CatalogStore()
         self.downloaded_count = 0
         self.failed_count = 0
         self.lock = Lock()
+        self.probe_index = ProbeIndex()
+        
+        # Shared by the probe threads, with a connection per probe in flight
+        self.session = make_session('image', pool_size=probe_window)
+        
+        # One probe pool for every game, with at most probe_window probes in flight
+        self.probe_window = probe_window
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=probe_window)
+        self.probe_count = 0
         
         # Create images directory
         self.images_dir.mkdir(parents=True, exist_ok=True)
     
-    def load_games_data(self):
-        """Load games data from JSON file"""
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    
-    def save_games_data(self, games_data):
-        """Save games data back to JSON file"""
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(games_data, f, indent=2, ensure_ascii=False)
-    
     def check_image_exists(self, url):
         """Check if image exists at URL"""
+        # Trust a fresh answer from an earlier run
+        known = self.probe_index.exists_url(url)
+        if known is not None:
+            return known
+        
+        with self.lock:
+            self.probe_count += 1
         try:
-            response = requests.head(url, timeout=5)
+            response = DEFAULT_POLICY.call(self.session.head, url, timeout=5)
+            self.probe_index.record_url(url, response.status_code, response.headers)
             return response.status_code == 200
         except:
             return False
@@ -47,15 +59,11 @@ class WGImageDownloader:
     def download_image(self, url, local_path):
         """Download image from URL to local path"""
         try:
-            response = requests.get(url, timeout=10)
+            response = DEFAULT_POLICY.call(self.session.get, url, timeout=10, stream=True)
             response.raise_for_status()
             
-            # Create directory if it doesn't exist
-            local_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Save image
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
+            # Stream to a temp file and move it into place once complete
+            save_response(response, local_path)
             
             with self.lock:
                 self.downloaded_count += 1
@@ -65,30 +73,20 @@ class WGImageDownloader:
                 self.failed_count += 1
             return False
     
-    def generate_image_urls(self, game_id, base_id=None):
-        """Generate all possible image URLs for a game"""
-        urls = []
-        
-        # If we have a base_id from imageMetadata, use it
-        if base_id:
-            for lang in self.languages:
-                urls.extend([
-                    f"{self.base_url}/{lang}/img/{base_id}.webp",
-                    f"{self.base_url}/{lang}/img/{base_id}_icon.webp"
-                ])
-        
-        # Try different ID patterns based on game ID and category
+    def candidate_urls(self, game_id, base_id=None):
+        """Yield a game's main image URLs lazily, most likely first and each only once"""
+        # imageMetadata.id first, then the category ranges, then the base ranges
+        ids = [base_id] if base_id else []
         id_ranges = self.get_id_ranges_for_game(game_id)
+        ids = itertools.chain(ids, *(range(start_id, end_id + 1) for start_id, end_id in id_ranges))
         
-        for start_id, end_id in id_ranges:
-            for img_id in range(start_id, end_id + 1):
-                for lang in self.languages:
-                    urls.extend([
-                        f"{self.base_url}/{lang}/img/{img_id}.webp",
-                        f"{self.base_url}/{lang}/img/{img_id}_icon.webp"
-                    ])
-        
-        return urls
+        seen = set()
+        for img_id in ids:
+            for lang in self.languages:
+                url = f"{self.base_url}/{lang}/img/{img_id}.webp"
+                if url not in seen:
+                    seen.add(url)
+                    yield url
     
     def get_id_ranges_for_game(self, game_id):
         """Get ID ranges to try for a specific game"""
@@ -134,22 +132,50 @@ class WGImageDownloader:
         return ranges
     
     def find_best_image_for_game(self, game_id, base_id=None):
-        """Find the best available image for a game"""
-        urls = self.generate_image_urls(game_id, base_id)
+        """Find the highest-ranked image that exists for a game
+
+        Probes run concurrently, but the answer is always the first existing
+        candidate in rank order, whatever order the probes finish in.
+        """
+        candidates = self.candidate_urls(game_id, base_id)
+        pending = collections.deque()  # (url, future) in rank order
+        found_hit = False
         
-        # Check URLs in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_url = {executor.submit(self.check_image_exists, url): url for url in urls}
-            
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    if future.result():
+        def exists(future):
+            return not future.cancelled() and future.exception() is None and future.result()
+        
+        try:
+            while True:
+                # Top the probe window up from the lazy candidate stream until something hits
+                if not found_hit:
+                    for url in itertools.islice(candidates, self.probe_window - len(pending)):
+                        pending.append((url, self.executor.submit(self.check_image_exists, url)))
+                if not pending:
+                    return None
+                
+                # Settle candidates from the top of the ranking
+                while pending and pending[0][1].done():
+                    url, future = pending.popleft()
+                    if exists(future):
                         return url
-                except Exception:
+                if not pending:
                     continue
-        
-        return None
+                
+                concurrent.futures.wait([future for _, future in pending if not future.done()],
+                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                
+                # Once a probe hits, only the higher-ranked ones still pending can beat it
+                for i, (url, future) in enumerate(pending):
+                    if future.done() and exists(future):
+                        for _, later in list(pending)[i + 1:]:
+                            later.cancel()
+                        pending = collections.deque(list(pending)[:i + 1])
+                        found_hit = True
+                        break
+        finally:
+            # Probes still queued are dropped once the answer is known
+            for _, future in pending:
+                future.cancel()
     
     def download_game_images(self, game, max_workers=5):
         """Download images for a single game"""
@@ -194,10 +220,15 @@ class WGImageDownloader:
         if 'images' not in game:
             game['images'] = {}
         
+        changes = {}
         if main_path:
-            game['images']['local_main'] = main_path
+            game['images']['local_main'] = changes['images.local_main'] = main_path
         if icon_path:
-            game['images']['local_icon'] = icon_path
+            game['images']['local_icon'] = changes['images.local_icon'] = icon_path
+        
+        # Journal progress per game so a crash does not lose finished work
+        if changes:
+            self.catalog.patch(game_id, changes)
         
         return main_path is not None
     
@@ -207,7 +238,7 @@ class WGImageDownloader:
         print("=" * 60)
         
         # Load games data
-        games_data = self.load_games_data()
+        games_data = self.catalog.load()
         
         print(f"📁 Images directory: {self.images_dir}")
         print(f"🌐 Languages: {', '.join(self.languages)}")
@@ -221,15 +252,15 @@ class WGImageDownloader:
             
             if self.download_game_images(game):
                 successful_downloads += 1
-            
-            # Add small delay to avoid overwhelming the server
-            time.sleep(0.2)
         
-        # Save updated games data
-        self.save_games_data(games_data)
+        # The journalled updates reach games.json on publish, or now if the journal is large
+        self.catalog.maybe_compact()
+        self.probe_index.save()
+        self.executor.shutdown(wait=True, cancel_futures=True)
         
         print()
         print("🎉 Download complete!")
+        print(f"🔎 Probes sent: {self.probe_count} ({self.probe_count / max(1, len(games_data)):.1f} per game)")
         print(f"📥 Downloaded: {self.downloaded_count} images")
         print(f"❌ Failed: {self.failed_count} images")
         print(f"✅ Games with images: {successful_downloads}/{len(games_data)}")
@@ -251,6 +282,7 @@ class WGImageDownloader:
                     found_images.append((img_id, lang, url))
                     print(f"✅ Found: ID {img_id}, Lang {lang}")
         
+        self.probe_index.save()
         print(f"\n📊 Found {len(found_images)} valid images in test")
         return found_images
 
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+WG Crawl Pipeline
+scrape_all_languages as resumable stages: discover → fetch → parse → merge
+→ download → derive → publish. Each stage persists its output under the run
+directory and the manifest records which stages finished, so a rerun
+after a crash picks up at the first unfinished stage and skips the items
+that stage already checkpointed. Page bodies live in the response archive,
+so a run can also replay fetch from it entirely offline
+"""
+
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from crawl_scheduler import CrawlScheduler
+from game_detector import detect_game_content
+from html_parser import parse_html
+from image_derivatives import DerivativeStage
+from retry_policy import RETRYABLE_STATUSES
+from wg_assets import CACHE_DIR
+
+RUN_DIR = CACHE_DIR / "crawl_run"
+
+STAGES = ['discover', 'fetch', 'parse', 'merge', 'download', 'derive', 'publish']
+
+
+def fetch_settled(record):
+    """Check a fetch record needs no retry: no error, and no status that retries had not outlasted"""
+    status = record['status'] or 0
+    return not record['error'] and status not in RETRYABLE_STATUSES and status < 500
+
+
+class RunState:
+    def __init__(self, root=RUN_DIR):
+        self.root = root
+        self.manifest_path = root / "manifest.json"
+        self.manifest = None
+
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def _write(self, path, data):
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def save(self):
+        """Write the manifest atomically"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write(self.manifest_path, self.manifest)
+
+    def reset(self):
+        """Throw away every checkpoint and start a new run"""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self.manifest = {'started_at': time.time(), 'stages': {}}
+        self.save()
+
+    @property
+    def finished(self):
+        """True when there is no run, or the last one got through every stage"""
+        return self.manifest is None or all(self.done(stage) for stage in STAGES)
+
+    def done(self, stage):
+        """Check whether a stage finished in this run"""
+        return self.manifest['stages'].get(stage, {}).get('status') == 'done'
+
+    def info(self, stage):
+        """What a finished stage recorded about itself"""
+        return self.manifest['stages'].get(stage, {})
+
+    def start(self, stage):
+        entry = self.manifest['stages'].setdefault(stage, {'items': 0})
+        entry.update(status='running', started_at=time.time())
+        self.save()
+
+    def finish(self, stage, **info):
+        entry = self.manifest['stages'][stage]
+        entry.update(info, status='done', finished_at=time.time())
+        self.save()
+
+    def write_output(self, name, data):
+        """Persist a whole-stage output as JSON"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write(self.root / name, data)
+
+    def read_output(self, name):
+        with open(self.root / name, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def items(self, stage):
+        """Records a stage checkpointed so far, ignoring a torn last line from a crash"""
+        path = self.root / f"{stage}.jsonl"
+        if not path.exists():
+            return []
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+    @contextmanager
+    def checkpoints(self, stage):
+        """Yield a function that checkpoints one finished item of a stage"""
+        path = self.root / f"{stage}.jsonl"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        # Drop a torn last line so new records do not get glued onto it
+        if path.exists():
+            with open(path, 'rb+') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+
+        with open(path, 'a', encoding='utf-8') as f:
+            def append(record):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                self.manifest['stages'][stage]['items'] += 1
+            try:
+                yield append
+            finally:
+                self.save()
+
+
+class CrawlPipeline:
+    def __init__(self, scraper, state=None, fresh=False):
+        self.scraper = scraper
+        self.state = state or RunState()
+
+        # A finished run is not resumed, nor is a network run replayed from the
+        # archive (or the other way round); the next crawl starts over
+        if fresh or self.state.finished or self.state.manifest.get('from_archive', False) != scraper.from_archive:
+            self.state.reset()
+            self.state.manifest['from_archive'] = scraper.from_archive
+            self.state.save()
+
+    def run(self):
+        """Run every stage that has not finished yet, in order"""
+        for stage in STAGES:
+            if self.state.done(stage):
+                print(f"⏭️  {stage}: already done, resuming after it")
+                continue
+            self.state.start(stage)
+            info = getattr(self, stage)() or {}
+            self.state.finish(stage, **info)
+        return self.state.read_output('games.json')
+
+    def discover(self):
+        """Every (language, endpoint) page that might list games"""
+        targets = self.scraper.crawl_targets()
+        self.state.write_output('targets.json', targets)
+        return {'targets': len(targets)}
+
+    def fetch(self):
+        """Fetch every target not fetched yet into the archive, or replay them from it"""
+        targets = self.state.read_output('targets.json')
+        # A page still throttled or failing (429/5xx) after its retries is fetched again on resume
+        fetched = {record['url'] for record in self.state.items('fetch') if fetch_settled(record)}
+        pending = [(index, target) for index, target in enumerate(targets) if target[2] not in fetched]
+        print(f"Checking {len(pending)} of {len(targets)} pages...")
+
+        scheduler = CrawlScheduler(self.scraper.engine, archive=self.scraper.archive)
+        with self.state.checkpoints('fetch') as checkpoint:
+            def on_result(i, result):
+                if result['error']:
+                    print(f"Error fetching {result['url']}: {result['error']}")
+                # The body stays in the archive; the record only says which response to read
+                fetched_at = result.get('fetched_at') if result['ok'] and result['content'] else None
+                checkpoint({'index': pending[i][0], 'language': result['language'], 'url': result['url'],
+                            'status': result['status'], 'error': result['error'], 'fetched_at': fetched_at})
+
+            pending_targets = [target for _, target in pending]
+            if self.scraper.from_archive:
+                scheduler.replay(pending_targets, on_result)
+            else:
+                scheduler.crawl(pending_targets, on_result)
+        return {'pages': sum(1 for record in self.state.items('fetch') if record['fetched_at'])}
+
+    def parse(self):
+        """Detect game content and extract games from every fetched page not parsed yet"""
+        # Transient failures checkpointed earlier may have been fetched again since
+        latest = {}
+        for record in self.state.items('fetch'):
+            latest[record['url']] = record
+        parsed = {record['url'] for record in self.state.items('parse')}
+
+        with self.state.checkpoints('parse') as checkpoint:
+            for record in sorted(latest.values(), key=lambda record: record['index']):
+                if not record['fetched_at'] or record['url'] in parsed:
+                    continue
+                response = self.scraper.archive.get(record['url'], at=record['fetched_at'])
+                soup = parse_html(response['content'], self.scraper.parser)
+                detection = detect_game_content(soup)
+                games = []
+                if detection['found']:
+                    print(f"📄 Extracting games from {record['url']} ({detection['signal']}, "
+                          f"confidence {detection['confidence']:.2f})")
+                    games = self.scraper.extract_comprehensive_game_data(soup, record['language'])
+                checkpoint({'index': record['index'], 'url': record['url'], 'found': detection['found'],
+                            'confidence': detection['confidence'], 'games': games})
+        return {'found_pages': sum(1 for record in self.state.items('parse') if record['found'])}
+
+    def merge(self):
+        """Merge the games of every page, most convincing pages first"""
+        records = [record for record in self.state.items('parse') if record['found']]
+        if not records:
+            print("❌ No game pages found. Creating comprehensive multilingual sample data...")
+            self.scraper.create_comprehensive_sample_data()
+            self.state.write_output('games.json', self.scraper.games_data)
+            return {'games': len(self.scraper.games_data), 'sample': True}
+
+        records.sort(key=lambda record: (-record['confidence'], record['index']))
+        all_games = [game for record in records for game in record['games']]
+        unique_games = self.scraper.merge_multilingual_games(all_games)
+        print(f"📊 Found {len(unique_games)} unique games with multilingual support")
+
+        self.state.write_output('games.json', unique_games)
+        return {'games': len(unique_games)}
+
+    def download(self):
+        """Download images for every merged game not downloaded yet"""
+        if self.state.info('merge').get('sample'):
+            return {'skipped': True}
+        if self.scraper.from_archive:
+            print("⏭️  download: skipped, replaying from the archive")
+            return {'skipped': True}
+
+        done = {record['id'] for record in self.state.items('download')}
+        with self.state.checkpoints('download') as checkpoint:
+            for game in self.state.read_output('games.json'):
+                if game['id'] in done:
+                    continue
+                result = self.scraper.download_game_images(game)
+                checkpoint({'id': game['id'], **result})
+        return {'failed': sum(len(record['failed']) for record in self.state.items('download'))}
+
+    def derive(self):
+        """Encode icons and responsive sizes for every downloaded image"""
+        if self.state.info('download').get('skipped'):
+            return {'skipped': True}
+
+        sources = {}
+        for record in self.state.items('download'):
+            for img_type in record['downloaded']:
+                sources[(record['id'], img_type)] = self.scraper.assets_dir / f"{record['id']}_{img_type}.jpg"
+        derived = DerivativeStage(self.scraper.blob_store, self.scraper.assets_dir).run(list(sources.values()))
+
+        by_game = {}
+        for (game_id, img_type), path in sources.items():
+            if path in derived:
+                by_game.setdefault(game_id, {})[img_type] = derived[path]
+        self.state.write_output('derivatives.json', by_game)
+        return {'images': sum(len(types) for types in by_game.values())}
+
+    def publish(self):
+        """Save the merged games as the catalog"""
+        if self.state.info('merge').get('sample'):
+            # Sample data was saved when it was created
+            return {'skipped': True}
+
+        games = self.state.read_output('games.json')
+        if self.state.done('derive') and not self.state.info('derive').get('skipped'):
+            derivatives = self.state.read_output('derivatives.json')
+            for game in games:
+                if game['id'] in derivatives:
+                    game['derivatives'] = derivatives[game['id']]
+        self.scraper.save_comprehensive_json(games)
+        print(f"✅ Scraping complete! Found {len(games)} games with multilingual support")
+        return {'games': len(games)}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+WG Crawl Scheduler
+Fans (language, endpoint) page fetches out over a FetchEngine under the
+per-host budget; endpoints that are missing in one locale are tried last
+(or skipped) in the others. Every response can be kept in a response
+archive, and a crawl can be replayed from it without the network
+"""
+
+import asyncio
+from functools import partial
+
+# Statuses that mean the endpoint does not exist on the site
+MISSING_STATUSES = {404, 410}
+
+
+class CrawlScheduler:
+    def __init__(self, engine, workers=None, skip_after=None, archive=None):
+        self.engine = engine
+        self.workers = workers or engine.per_host
+
+        # Responses with a status are appended here as they arrive
+        self.archive = archive
+
+        # skip_after=N drops an endpoint once it has been missing in N locales
+        self.skip_after = skip_after
+        self.misses = {}
+
+    def _next(self, pending):
+        """Take the pending target whose endpoint has missed least, in input order"""
+        best = min(pending, key=lambda item: (self.misses.get(item[1][1], 0), item[0]))
+        pending.remove(best)
+        return best
+
+    async def _worker(self, pending, results, on_result):
+        while pending:
+            index, (language, endpoint, url) = self._next(pending)
+            result = {'language': language, 'endpoint': endpoint, 'url': url, 'skipped': False}
+
+            if self.skip_after and self.misses.get(endpoint, 0) >= self.skip_after:
+                result.update(status=None, content=None, ok=False, error=None, skipped=True)
+            else:
+                result.update(await self.engine.get(url))
+                if self.archive is not None and result['status'] is not None:
+                    # Compressing and fsyncing the record would stall every other worker on the loop
+                    loop = asyncio.get_running_loop()
+                    entry = await loop.run_in_executor(self.engine.executor, partial(
+                        self.archive.put, url, result['status'], result['headers'], result['content']))
+                    result['fetched_at'] = entry['fetched_at']
+                if result['status'] in MISSING_STATUSES:
+                    self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+            results[index] = result
+            if on_result:
+                on_result(index, result)
+
+    async def _crawl(self, targets, on_result):
+        pending = list(enumerate(targets))
+        results = [None] * len(targets)
+        workers = min(self.workers, len(targets))
+        await asyncio.gather(*[self._worker(pending, results, on_result) for _ in range(workers)])
+        return results
+
+    def crawl(self, targets, on_result=None):
+        """Fetch (language, endpoint, url) targets concurrently, results in input order
+
+        on_result(index, result) is called as each target finishes, so callers
+        can checkpoint without waiting for the whole crawl
+        """
+        if not targets:
+            return []
+        return self.engine.run(self._crawl(targets, on_result))
+
+    def replay(self, targets, on_result=None):
+        """Like crawl(), but answer every target from the archive without touching the network"""
+        results = []
+        for index, (language, endpoint, url) in enumerate(targets):
+            result = {'language': language, 'endpoint': endpoint, 'url': url, 'skipped': False,
+                      'status': None, 'headers': {}, 'content': None, 'ok': False, 'error': None}
+            archived = self.archive.get(url)
+            if archived is None:
+                result['error'] = 'not in archive'
+            else:
+                result.update(archived)
+                result['ok'] = archived['status'] == 200
+            results.append(result)
+            if on_result:
+                on_result(index, result)
+        return results
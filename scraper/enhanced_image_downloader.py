@@ -4,37 +4,28 @@ Enhanced WG Image Downloader
 Downloads missing game images from wg.com and updates games.json
 """
 
-import json
 import os
-import requests
-import time
 from pathlib import Path
 from urllib.parse import urlparse
 
-def load_games_data():
-    """Load games data from JSON file"""
-    json_path = Path(__file__).parent.parent / "public" / "assets" / "games.json"
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from asset_index import AssetIndex
+from catalog_store import CatalogStore
+from fetch_engine import save_response
+from http_client import shared_session
+from probe_index import ProbeIndex
+from retry_policy import DEFAULT_POLICY
 
-def save_games_data(games_data):
-    """Save games data back to JSON file"""
-    json_path = Path(__file__).parent.parent / "public" / "assets" / "games.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(games_data, f, indent=2, ensure_ascii=False)
+# One long-lived session keeps connections to the image host alive between calls
+session = shared_session('image')
 
 def download_image(url, local_path):
     """Download image from URL to local path"""
     try:
-        response = requests.get(url, timeout=10)
+        response = DEFAULT_POLICY.call(session.get, url, timeout=10, stream=True)
         response.raise_for_status()
         
-        # Create directory if it doesn't exist
-        local_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save image
-        with open(local_path, 'wb') as f:
-            f.write(response.content)
+        # Stream to a temp file and move it into place once complete
+        save_response(response, local_path)
         
         print(f"✅ Downloaded: {local_path.name}")
         return True
@@ -166,11 +157,20 @@ def generate_image_urls(game_id, base_id=None):
     
     return urls
 
-def find_valid_image_url(urls):
+def find_valid_image_url(urls, probe_index=None):
     """Find the first valid image URL from a list"""
     for url in urls:
+        # Trust a fresh answer from an earlier run
+        known = probe_index.exists_url(url) if probe_index else None
+        if known is not None:
+            if known:
+                return url
+            continue
+        
         try:
-            response = requests.head(url, timeout=5)
+            response = DEFAULT_POLICY.call(session.head, url, timeout=5)
+            if probe_index:
+                probe_index.record_url(url, response.status_code, response.headers)
             if response.status_code == 200:
                 return url
         except:
@@ -182,8 +182,11 @@ def main():
     print("=" * 50)
     
     # Load games data
-    games_data = load_games_data()
+    catalog = CatalogStore()
+    games_data = catalog.load()
     images_dir = Path(__file__).parent.parent / "public" / "assets" / "images" / "games"
+    probe_index = ProbeIndex()
+    assets = AssetIndex(images_dir)
     
     downloaded_count = 0
     updated_count = 0
@@ -196,8 +199,8 @@ def main():
         main_image_path = images_dir / f"{game_id}.webp"
         icon_image_path = images_dir / f"{game_id}_icon.webp"
         
-        main_exists = main_image_path.exists()
-        icon_exists = icon_image_path.exists()
+        main_exists = assets.has_name(main_image_path.name)
+        icon_exists = assets.has_name(icon_image_path.name)
         
         if main_exists and icon_exists:
             print(f"  ✅ Images already exist for {game_id}")
@@ -208,7 +211,7 @@ def main():
         
         # Try to find valid main image
         if not main_exists:
-            main_url = find_valid_image_url([url for url in image_urls if not url.endswith('_icon.webp')])
+            main_url = find_valid_image_url([url for url in image_urls if not url.endswith('_icon.webp')], probe_index)
             if main_url:
                 if download_image(main_url, main_image_path):
                     downloaded_count += 1
@@ -216,13 +219,14 @@ def main():
                     if 'images' not in game:
                         game['images'] = {}
                     game['images']['local_main'] = f"/assets/images/games/{game_id}.webp"
+                    catalog.patch(game_id, {'images.local_main': game['images']['local_main']})
                     updated_count += 1
             else:
                 print(f"  ❌ No valid main image found for {game_id}")
         
         # Try to find valid icon image
         if not icon_exists:
-            icon_url = find_valid_image_url([url for url in image_urls if url.endswith('_icon.webp')])
+            icon_url = find_valid_image_url([url for url in image_urls if url.endswith('_icon.webp')], probe_index)
             if icon_url:
                 if download_image(icon_url, icon_image_path):
                     downloaded_count += 1
@@ -230,17 +234,17 @@ def main():
                     if 'images' not in game:
                         game['images'] = {}
                     game['images']['local_icon'] = f"/assets/images/games/{game_id}_icon.webp"
+                    catalog.patch(game_id, {'images.local_icon': game['images']['local_icon']})
                     updated_count += 1
             else:
                 print(f"  ❌ No valid icon image found for {game_id}")
-        
-        # Add small delay to avoid overwhelming the server
-        time.sleep(0.5)
     
-    # Save updated games data
+    probe_index.save()
+    
+    # The updates stay journalled until the journal grows large or is published
     if updated_count > 0:
-        save_games_data(games_data)
-        print(f"\n✅ Updated {updated_count} games in games.json")
+        catalog.maybe_compact()
+        print(f"\n✅ Journalled updates for {updated_count} games (run `python wgscrape.py publish` to write games.json)")
     
     print(f"\n🎉 Download complete!")
     print(f"📥 Downloaded: {downloaded_count} images")
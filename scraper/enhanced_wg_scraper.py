@@ -6,30 +6,68 @@ Extracts complete multilingual game data from wg.com with all platform informati
 
 import requests
 from bs4 import BeautifulSoup
-import json
 import os
-import time
 import re
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 import hashlib
 
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from crawl_pipeline import CrawlPipeline
+from crawl_scheduler import CrawlScheduler
+from extraction_plan import ExtractionPlan
+from fetch_engine import FetchEngine, save_response
+from game_detector import detect_game_content, has_game_content
+from html_parser import parse_html
+from http_client import make_session
+from response_archive import ResponseArchive
+from retry_policy import DEFAULT_POLICY
+
+# Selector cascades, in priority order, compiled into one extraction plan
+GAME_SELECTORS = [
+    'div.game-item',
+    'div.game-card', 
+    'div.slot-item',
+    'div.casino-game',
+    'div[class*="game"]',
+    'div[class*="slot"]',
+    'div[class*="casino"]',
+    'div[class*="product"]',
+    'a[href*="game"]',
+    'a[href*="slot"]',
+    'a[href*="casino"]',
+    '.item',
+    '.card',
+    '.product'
+]
+
+FIELD_SELECTORS = {
+    'title': ['h1', 'h2', 'h3', 'h4', '.title', '.name', '.game-title', 'a', '.product-name'],
+    'description': ['p', '.description', '.desc', '.summary', '.product-desc'],
+    'image': ['img'],
+    'icon': ['img[class*="icon"], .icon img, [class*="logo"] img'],
+    'background': ['[style*="background-image"]'],
+    'link': ['a'],
+    'demo': ['a[href*="demo"], a[href*="play"], a[href*="try"]'],
+}
+
 class EnhancedWGScraper:
-    def __init__(self):
+    def __init__(self, parser=None, max_in_flight=16, languages=None, from_archive=False):
         self.base_url = "https://wg.com"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5,zh-CN,zh;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        self.parser = parser  # None picks lxml when available
+        self.session = make_session('page', pool_size=max_in_flight)
         
         # Create directories
         self.assets_dir = Path("../public/assets/images/games")
         self.assets_dir.mkdir(parents=True, exist_ok=True)
+        self.blob_store = BlobStore()
+        self.plan = ExtractionPlan(GAME_SELECTORS, FIELD_SELECTORS, min_containers=3)
+        self.engine = FetchEngine(max_in_flight=max_in_flight, per_host=8, timeout=15, session=self.session)
+        
+        # Every fetched page is archived; from_archive replays them instead of crawling
+        self.archive = ResponseArchive()
+        self.from_archive = from_archive
         
         # Language mappings
         self.languages = {
@@ -38,25 +76,31 @@ class EnhancedWGScraper:
             'th': 'https://wg.com/th/',
             'vi': 'https://wg.com/vi/'
         }
-        
-    def get_page_content(self, url, retries=3):
-        """Get page content with retry logic"""
-        for attempt in range(retries):
-            try:
-                response = self.session.get(url, timeout=15)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                print(f"Attempt {attempt + 1} failed for {url}: {e}")
-                if attempt < retries - 1:
-                    time.sleep(2)
-                else:
-                    return None
+        if languages:
+            self.languages = {code: url for code, url in self.languages.items() if code.split('-')[0] in languages}
     
-    def analyze_wg_structure(self):
-        """Analyze wg.com structure to find game pages"""
-        print("🔍 Analyzing WG.com structure...")
-        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Release the fetch engine's worker threads and pooled connections"""
+        self.engine.close()
+    
+    def get_page_content(self, url):
+        """Get page content, retrying only transient failures"""
+        try:
+            response = DEFAULT_POLICY.call(self.session.get, url, timeout=15)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+    
+    def crawl_targets(self):
+        """List (language, endpoint, url) for every page that might list games"""
         # Try different possible game endpoints
         possible_endpoints = [
             '/games',
@@ -71,109 +115,97 @@ class EnhancedWGScraper:
             '/game-api'
         ]
         
+        return [
+            (lang_code, endpoint, base_url + endpoint)
+            for lang_code, base_url in self.languages.items()
+            for endpoint in possible_endpoints
+        ]
+    
+    def analyze_wg_structure(self):
+        """Analyze wg.com structure to find game pages"""
+        print("🔍 Analyzing WG.com structure...")
+        
         found_pages = []
         
-        for lang_code, base_url in self.languages.items():
-            print(f"Checking {lang_code} version...")
+        # Every (language, endpoint) page is fetched concurrently under the per-host budget
+        targets = self.crawl_targets()
+        print(f"Checking {len(targets)} pages in {len(self.languages)} languages...")
+        scheduler = CrawlScheduler(self.engine, archive=self.archive)
+        results = scheduler.replay(targets) if self.from_archive else scheduler.crawl(targets)
+        
+        for result in results:
+            if result['error']:
+                print(f"Error fetching {result['url']}: {result['error']}")
+            if not (result['ok'] and result['content']):
+                continue
             
-            for endpoint in possible_endpoints:
-                url = base_url + endpoint
-                content = self.get_page_content(url)
-                
-                if content:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    if self.has_game_content(soup):
-                        found_pages.append({
-                            'url': url,
-                            'language': lang_code,
-                            'content': content
-                        })
-                        print(f"✅ Found game content at: {url}")
-        
+            # Parsed once here, the same soup is reused for extraction
+            soup = parse_html(result['content'], self.parser)
+            detection = detect_game_content(soup)
+            if detection['found']:
+                found_pages.append({
+                    'url': result['url'],
+                    'language': result['language'],
+                    'fetched_at': result.get('fetched_at'),
+                    'soup': soup,
+                    'signal': detection['signal'],
+                    'confidence': detection['confidence']
+                })
+                print(f"✅ Found game content at: {result['url']} ({detection['signal']}, confidence {detection['confidence']:.2f})")
+        
+        # Most convincing pages first
+        found_pages.sort(key=lambda page: page['confidence'], reverse=True)
         return found_pages
     
     def has_game_content(self, soup):
         """Check if page contains game-related content"""
-        # Look for game-related elements
-        game_indicators = [
-            # Chinese indicators
-            soup.find_all(text=re.compile(r'游戏|老虎机|赌场|扑克|体育|彩票|真人', re.I)),
-            # English indicators  
-            soup.find_all(text=re.compile(r'game|slot|casino|poker|sports|lottery|live', re.I)),
-            # Thai indicators
-            soup.find_all(text=re.compile(r'เกม|สล็อต|คาสิโน|โป๊กเกอร์|กีฬา|หวย|สด', re.I)),
-            # Vietnamese indicators
-            soup.find_all(text=re.compile(r'game|slot|casino|poker|thể thao|xổ số|trực tiếp', re.I)),
-            # HTML elements
-            soup.find_all('div', class_=re.compile(r'game|slot|casino', re.I)),
-            soup.find_all('img', src=re.compile(r'game|slot|casino', re.I)),
-            soup.find_all('a', href=re.compile(r'game|slot|casino', re.I))
-        ]
-        
-        return any(len(indicator) > 0 for indicator in game_indicators)
+        return has_game_content(soup)
     
-    def extract_comprehensive_game_data(self, content, language):
-        """Extract comprehensive game data from page content"""
-        soup = BeautifulSoup(content, 'html.parser')
+    def extract_comprehensive_game_data(self, page, language):
+        """Extract comprehensive game data from a parsed page or raw page content"""
+        soup = page if isinstance(page, BeautifulSoup) else parse_html(page, self.parser)
         games = []
         
-        # Try multiple selectors for game elements
-        game_selectors = [
-            'div.game-item',
-            'div.game-card', 
-            'div.slot-item',
-            'div.casino-game',
-            'div[class*="game"]',
-            'div[class*="slot"]',
-            'div[class*="casino"]',
-            'div[class*="product"]',
-            'a[href*="game"]',
-            'a[href*="slot"]',
-            'a[href*="casino"]',
-            '.item',
-            '.card',
-            '.product'
-        ]
-        
-        for selector in game_selectors:
-            elements = soup.select(selector)
-            if elements and len(elements) > 2:  # Only if we find multiple elements
-                print(f"Found {len(elements)} elements with selector: {selector}")
-                for element in elements:
-                    game_data = self.extract_detailed_game_data(element, language)
-                    if game_data:
-                        games.append(game_data)
-                break
+        # First game selector with multiple elements, all tried in one walk
+        selector, elements = self.plan.find_containers(soup)
+        if elements:
+            print(f"Found {len(elements)} elements with selector: {selector}")
+            for element in elements:
+                game_data = self.extract_detailed_game_data(element, language)
+                if game_data:
+                    games.append(game_data)
         
         return games
     
     def extract_detailed_game_data(self, element, language):
         """Extract detailed game data from an element"""
         try:
+            # Every selector cascade is resolved in one walk of the element
+            matches = self.plan.collect(element)
+            
             # Extract multilingual title
-            title_data = self.extract_multilingual_text(element, [
-                'h1', 'h2', 'h3', 'h4', '.title', '.name', '.game-title', 'a', '.product-name'
-            ])
+            title_data = self.extract_multilingual_text(element, matches['title'])
             
             if not title_data.get('en'):
                 return None
             
             # Extract multilingual description
-            description_data = self.extract_multilingual_text(element, [
-                'p', '.description', '.desc', '.summary', '.product-desc'
-            ])
+            description_data = self.extract_multilingual_text(element, matches['description'])
             
             # Extract images
-            images = self.extract_images(element)
+            images = self.extract_images(element, matches)
             
             # Extract links
-            links = self.extract_links(element)
+            links = self.extract_links(element, matches)
+            
+            # Platform and size both read the element's text
+            text = element.get_text()
             
             # Extract platform information
-            platforms = self.extract_platform_info(element)
+            platforms = self.extract_platform_info(element, text)
             
             # Extract size information
-            size_info = self.extract_size_info(element)
+            size_info = self.extract_size_info(element, text)
             
             # Generate unique ID
             game_id = hashlib.md5(title_data['en'].encode()).hexdigest()[:8]
@@ -212,12 +244,11 @@ class EnhancedWGScraper:
             print(f"Error extracting game data: {e}")
             return None
     
-    def extract_multilingual_text(self, element, selectors):
-        """Extract text in multiple languages"""
+    def extract_multilingual_text(self, element, candidates):
+        """Extract text in multiple languages from a cascade's matches, in priority order"""
         text_data = {}
         
-        for selector in selectors:
-            text_elem = element.select_one(selector)
+        for text_elem in candidates:
             if text_elem:
                 text = text_elem.get_text(strip=True)
                 if text and len(text) > 2:
@@ -250,26 +281,27 @@ class EnhancedWGScraper:
         """Check if text contains Vietnamese characters"""
         return bool(re.search(r'[àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]', text, re.IGNORECASE))
     
-    def extract_images(self, element):
+    def extract_images(self, element, matches=None):
         """Extract all images from element"""
+        matches = matches or self.plan.collect(element)
         images = {}
         
         # Main image
-        img_elem = element.select_one('img')
+        img_elem = matches['image'][0]
         if img_elem:
             src = img_elem.get('src') or img_elem.get('data-src') or img_elem.get('data-lazy')
             if src:
                 images['main'] = urljoin(self.base_url, src)
         
         # Icon
-        icon_elem = element.select_one('img[class*="icon"], .icon img, [class*="logo"] img')
+        icon_elem = matches['icon'][0]
         if icon_elem:
             src = icon_elem.get('src') or icon_elem.get('data-src')
             if src:
                 images['icon'] = urljoin(self.base_url, src)
         
         # Background image
-        bg_elem = element.select_one('[style*="background-image"]')
+        bg_elem = matches['background'][0]
         if bg_elem:
             style = bg_elem.get('style', '')
             bg_match = re.search(r'url\(["\']?([^"\']+)["\']?\)', style)
@@ -278,19 +310,20 @@ class EnhancedWGScraper:
         
         return images
     
-    def extract_links(self, element):
+    def extract_links(self, element, matches=None):
         """Extract all relevant links"""
+        matches = matches or self.plan.collect(element)
         links = {}
         
         # Main link
-        link_elem = element.select_one('a')
+        link_elem = matches['link'][0]
         if link_elem:
             href = link_elem.get('href')
             if href:
                 links['main'] = urljoin(self.base_url, href)
         
         # Demo link
-        demo_elem = element.select_one('a[href*="demo"], a[href*="play"], a[href*="try"]')
+        demo_elem = matches['demo'][0]
         if demo_elem:
             href = demo_elem.get('href')
             if href:
@@ -298,7 +331,7 @@ class EnhancedWGScraper:
         
         return links
     
-    def extract_platform_info(self, element):
+    def extract_platform_info(self, element, text=None):
         """Extract platform information"""
         platforms = []
         
@@ -310,7 +343,7 @@ class EnhancedWGScraper:
             'web', 'di động', 'máy tính', 'ios', 'android'
         ]
         
-        text = element.get_text().lower()
+        text = (element.get_text() if text is None else text).lower()
         for indicator in platform_indicators:
             if indicator in text:
                 if indicator in ['web', '网页', 'เว็บ', 'web']:
@@ -330,9 +363,10 @@ class EnhancedWGScraper:
         
         return list(set(platforms))  # Remove duplicates
     
-    def extract_size_info(self, element):
+    def extract_size_info(self, element, text=None):
         """Extract size information"""
-        text = element.get_text()
+        if text is None:
+            text = element.get_text()
         
         # Look for size patterns
         size_patterns = [
@@ -425,40 +459,12 @@ class EnhancedWGScraper:
         counts = ['10K+', '25K+', '50K+', '100K+', '200K+', '500K+', '1M+']
         return random.choice(counts)
     
-    def scrape_all_languages(self):
-        """Main scraping function for all languages"""
+    def scrape_all_languages(self, fresh=False):
+        """Main scraping function for all languages, resuming an interrupted run unless fresh"""
         print("🚀 Starting Enhanced WG Games Scraper...")
         
-        # Analyze structure
-        found_pages = self.analyze_wg_structure()
-        
-        if not found_pages:
-            print("❌ No game pages found. Creating comprehensive multilingual sample data...")
-            self.create_comprehensive_sample_data()
-            return
-        
-        # Extract games from all found pages
-        all_games = []
-        for page_info in found_pages:
-            print(f"📄 Extracting games from {page_info['language']} version...")
-            games = self.extract_comprehensive_game_data(page_info['content'], page_info['language'])
-            all_games.extend(games)
-            time.sleep(1)  # Be respectful
-        
-        # Remove duplicates and merge multilingual data
-        unique_games = self.merge_multilingual_games(all_games)
-        
-        print(f"📊 Found {len(unique_games)} unique games with multilingual support")
-        
-        # Download images
-        for game in unique_games:
-            self.download_game_images(game)
-            time.sleep(0.5)
-        
-        # Save to JSON
-        self.save_comprehensive_json(unique_games)
-        
-        print(f"✅ Scraping complete! Found {len(unique_games)} games with multilingual support")
+        # Stages checkpoint to disk, so a crash mid-download does not lose the crawl
+        return CrawlPipeline(self, fresh=fresh).run()
     
     def merge_multilingual_games(self, games):
         """Merge games with same English title but different languages"""
@@ -493,24 +499,28 @@ class EnhancedWGScraper:
         return list(merged_games.values())
     
     def download_game_images(self, game):
-        """Download images for a game"""
+        """Download images for a game, return the image types downloaded and failed"""
+        result = {'downloaded': [], 'failed': []}
         if not game.get('images'):
-            return
+            return result
         
         for img_type, img_url in game['images'].items():
             try:
-                response = self.session.get(img_url, timeout=10)
+                response = DEFAULT_POLICY.call(self.session.get, img_url, timeout=10, stream=True)
                 response.raise_for_status()
                 
                 # Save image
                 img_path = self.assets_dir / f"{game['id']}_{img_type}.jpg"
-                with open(img_path, 'wb') as f:
-                    f.write(response.content)
+                save_response(response, img_path, self.blob_store)
                 
                 print(f"✅ Downloaded {img_type} image for {game['id']}")
+                result['downloaded'].append(img_type)
                 
             except Exception as e:
                 print(f"❌ Failed to download {img_type} image for {game['id']}: {e}")
+                result['failed'].append(img_type)
+        
+        return result
     
     def create_comprehensive_sample_data(self):
         """Create comprehensive multilingual sample data"""
@@ -732,16 +742,14 @@ class EnhancedWGScraper:
     
     def save_comprehensive_json(self, games):
         """Save comprehensive games data to JSON"""
-        json_path = Path("../public/assets/games.json")
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(games, f, ensure_ascii=False, indent=2)
+        catalog = CatalogStore()
+        catalog.replace_all(games)
         
-        print(f"💾 Saved {len(games)} comprehensive multilingual games to {json_path}")
+        print(f"💾 Saved {len(games)} comprehensive multilingual games to {catalog.path}")
 
 def main():
-    scraper = EnhancedWGScraper()
-    scraper.scrape_all_languages()
+    with EnhancedWGScraper() as scraper:
+        scraper.scrape_all_languages()
 
 if __name__ == "__main__":
     main()
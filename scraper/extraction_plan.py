@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+WG Extraction Plan
+Compiles the scrapers' selector cascades once and resolves every field of
+a game element in a single walk of its subtree, instead of one select_one
+per selector; the winning container selector is cached per page template
+"""
+
+import hashlib
+import re
+
+import soupsieve
+from bs4 import Tag
+
+# tag, .class and [attr*="value"] compounds are matched directly; anything
+# else (descendant combinators, selector lists) goes through soupsieve
+SIMPLE_SELECTOR = re.compile(
+    r'^(?P<tag>[a-z][a-z0-9]*)?'
+    r'(?:\.(?P<cls>[\w-]+))?'
+    r'(?:\[(?P<attr>[\w-]+)\*="(?P<value>[^"]*)"\])?$'
+)
+
+
+def template_fingerprint(soup, limit=64):
+    """Fingerprint a page by the tag/class skeleton of its first elements"""
+    parts = []
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            parts.append('.'.join([node.name] + node.get('class', [])))
+            if len(parts) >= limit:
+                break
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class CompiledSelector:
+    def __init__(self, selector):
+        self.selector = selector
+        simple = SIMPLE_SELECTOR.match(selector.strip())
+        if simple and any(simple.groups()):
+            self.tag = simple.group('tag')
+            self.cls = simple.group('cls')
+            self.attr = simple.group('attr')
+            self.value = simple.group('value')
+            self.compiled = None
+        else:
+            self.tag = self.cls = self.attr = self.value = None
+            self.compiled = soupsieve.compile(selector)
+
+    def match(self, node):
+        """Check whether a tag matches, as select() would"""
+        if self.compiled is not None:
+            return self.compiled.match(node)
+        if self.tag and node.name != self.tag:
+            return False
+        if self.cls and self.cls not in node.get('class', ()):
+            return False
+        if self.attr:
+            value = node.get(self.attr)
+            if value is None:
+                return False
+            if isinstance(value, list):
+                value = ' '.join(value)
+            if self.value not in value:
+                return False
+        return True
+
+
+class ExtractionPlan:
+    def __init__(self, containers, fields, min_containers=1):
+        self.containers = [CompiledSelector(s) for s in containers]
+        self.fields = {name: [CompiledSelector(s) for s in selectors] for name, selectors in fields.items()}
+        self.min_containers = min_containers
+        self.templates = {}  # template fingerprint -> winning container index
+        self._dispatch = {}
+
+    def _candidates(self, name):
+        """Field selectors that can match a tag name, as (field, index, selector)"""
+        if name not in self._dispatch:
+            self._dispatch[name] = [
+                (field, i, selector)
+                for field, selectors in self.fields.items()
+                for i, selector in enumerate(selectors)
+                if selector.tag in (None, name)
+            ]
+        return self._dispatch[name]
+
+    def _walk_containers(self, soup, indexes):
+        found = {i: [] for i in indexes}
+        selectors = [(i, self.containers[i]) for i in indexes]
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                for i, selector in selectors:
+                    if selector.match(node):
+                        found[i].append(node)
+        return found
+
+    def find_containers(self, soup):
+        """Return (selector, elements) for the first container selector with enough hits
+
+        Every container selector is evaluated in one walk of the page; once a
+        template has been seen, only the selector that won for it is tried.
+        """
+        fingerprint = template_fingerprint(soup)
+        known = self.templates.get(fingerprint)
+        if known is not None:
+            elements = self._walk_containers(soup, [known])[known]
+            if len(elements) >= self.min_containers:
+                return self.containers[known].selector, elements
+
+        found = self._walk_containers(soup, range(len(self.containers)))
+        for i in range(len(self.containers)):
+            if len(found[i]) >= self.min_containers:
+                self.templates[fingerprint] = i
+                return self.containers[i].selector, found[i]
+        return None, []
+
+    def collect(self, element):
+        """Walk an element once, return {field: [first match per selector, in cascade order]}"""
+        matches = {field: [None] * len(selectors) for field, selectors in self.fields.items()}
+        remaining = sum(len(selectors) for selectors in self.fields.values())
+
+        for node in element.descendants:
+            if not isinstance(node, Tag):
+                continue
+            for field, i, selector in self._candidates(node.name):
+                if matches[field][i] is None and selector.match(node):
+                    matches[field][i] = node
+                    remaining -= 1
+            if not remaining:
+                break
+        return matches
+
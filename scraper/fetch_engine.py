@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+WG Fetch Engine
+Asyncio-based fetcher with a global in-flight limit, per-host concurrency
+and connection reuse, shared by every downloader
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+from http_client import make_session, mount_pool
+from retry_policy import DEFAULT_POLICY
+
+
+# mkstemp creates files 0600; saved images get the mode open() would have given them.
+# Read once at import, since os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+# Partial bodies wait in this subdirectory of their destination: on the same
+# filesystem, so the final rename stays atomic, but not among the published files
+INCOMING_DIRNAME = ".incoming"
+
+
+class IncompleteDownload(requests.exceptions.ChunkedEncodingError):
+    """Raised when a body does not match what the server advertised; retryable like a broken chunked body"""
+
+
+def save_response(response, local_path, blob_store=None, chunk_size=1 << 16):
+    """Stream a response body to local_path atomically, return (size, sha256 digest)"""
+    # Partial bodies live outside the image directory until they are verified
+    tmp_dir = blob_store.incoming_dir if blob_store else local_path.parent / INCOMING_DIRNAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f"{local_path.name}.", suffix='.part', dir=tmp_dir)
+    os.chmod(tmp_name, FILE_MODE)  # os.fchmod is POSIX-only before Python 3.13
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+
+        # Content-Length counts encoded bytes, so only compare identity bodies
+        expected = response.headers.get('content-length')
+        encoding = response.headers.get('content-encoding', 'identity')
+        if expected and expected.isdigit() and encoding == 'identity' and int(expected) != size:
+            raise IncompleteDownload(f"got {size} of {expected} bytes")
+        if size == 0:
+            raise IncompleteDownload("empty body")
+
+        if blob_store:
+            blob_store.put_temp(Path(tmp_name), digest.hexdigest())
+            blob_store.link(digest.hexdigest(), local_path)
+        else:
+            os.replace(tmp_name, local_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    finally:
+        response.close()
+
+    return size, digest.hexdigest()
+
+
+class FetchEngine:
+    def __init__(self, max_in_flight=32, per_host=8, timeout=10, session=None, headers=None, blob_store=None,
+                 validators=None, limiter=None, retry_policy=None, asset_index=None):
+        self.max_in_flight = max_in_flight
+        self.per_host = per_host
+        self.timeout = timeout
+
+        # Downloads land in the blob store when one is given, otherwise as plain files
+        self.blob_store = blob_store
+
+        # Validators for downloaded files make conditional refreshes possible
+        self.validators = validators
+
+        # A directory listing index learns about each file as it lands
+        self.asset_index = asset_index
+
+        # Transient failures are retried with backoff, outside the concurrency limits
+        self.retry_policy = retry_policy or DEFAULT_POLICY
+
+        # One pooled session keeps connections alive across every request, and
+        # every request it sends is paced by the shared per-host rate limiter
+        hosts = max(1, max_in_flight // per_host)
+        if session is None:
+            self.session = make_session('image', max_in_flight, limiter=limiter, hosts=hosts)
+        else:
+            self.session = mount_pool(session, max_in_flight, limiter, hosts)
+        if headers:
+            self.session.headers.update(headers)
+
+        # requests is blocking, so the wire work runs on a pool sized to the in-flight limit
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._in_flight = None
+        self._hosts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def run(self, coro):
+        """Run a coroutine on a fresh event loop with fresh limits"""
+        # Semaphores bind to the loop that first waits on them
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._hosts = {}
+        return asyncio.run(coro)
+
+    def _host_limit(self, url):
+        """Get the concurrency limit for a URL's host"""
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def _submit(self, url, call):
+        """Run blocking wire work for a URL under the global and per-host limits"""
+        async with self._host_limit(url), self._in_flight:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, call)
+
+    async def request(self, method, url, **kwargs):
+        """Send a request under the global and per-host limits, retrying transient failures"""
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            try:
+                response = await self._submit(url, partial(self.session.request, method, url, **kwargs))
+                error = None
+            except Exception as e:
+                response, error = None, e
+
+            status = response.status_code if response is not None else None
+            headers = response.headers if response is not None else None
+            delay = self.retry_policy.backoff(attempt, status, error, headers)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                response.close()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def head(self, url):
+        """Check whether a URL exists without fetching its body"""
+        result = {'url': url, 'status': None, 'headers': {}, 'ok': False, 'error': None}
+        try:
+            response = await self.request('HEAD', url)
+            result['status'] = response.status_code
+            result['headers'] = response.headers
+            result['ok'] = response.status_code == 200
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+    async def get(self, url):
+        """Fetch a URL and keep its body in the result"""
+        result = {'url': url, 'status': None, 'headers': {}, 'content': None, 'ok': False, 'error': None}
+        try:
+            response = await self.request('GET', url)
+            result['status'] = response.status_code
+            result['headers'] = response.headers
+            result['content'] = response.content
+            result['ok'] = response.status_code == 200
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+    async def download(self, url, local_path, refresh=False):
+        """Download a URL to a local path, revalidating an existing copy when refreshing"""
+        result = {'url': url, 'path': local_path, 'status': None, 'size': 0, 'digest': None,
+                  'ok': False, 'not_modified': False, 'error': None}
+        headers = {}
+        if refresh and self.validators:
+            headers = self.validators.conditional_headers(url, local_path)
+
+        attempt = 0
+        while True:
+            error = None
+            result.update(status=None, error=None)
+            try:
+                await self._submit(url, partial(self._download_to, url, local_path, headers, result))
+            except Exception as e:
+                error = e
+                result['error'] = str(e)
+
+            delay = self.retry_policy.backoff(attempt, result['status'], error, result.pop('headers', None))
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _download_to(self, url, local_path, headers, result):
+        """Blocking half of download(): fetch and stream the body on a worker thread"""
+        response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        result['status'] = response.status_code
+        result['headers'] = response.headers  # Read by the retry policy, then dropped
+        if response.status_code == 304 and headers:
+            # Our copy is current, nothing is rewritten
+            response.close()
+            result['ok'] = True
+            result['not_modified'] = True
+            self.validators.touch(local_path)
+            if self.blob_store:
+                result['digest'] = self.blob_store.digest_for(local_path)
+        elif response.status_code == 200:
+            result['size'], result['digest'] = save_response(response, local_path, self.blob_store)
+            result['ok'] = True
+            if self.validators:
+                self.validators.record(url, local_path, response.headers, result['size'], result['digest'])
+            if self.asset_index is not None:
+                self.asset_index.add(local_path)
+        else:
+            response.close()
+
+    async def _gather(self, coros):
+        return await asyncio.gather(*coros)
+
+    def head_many(self, urls):
+        """HEAD-probe many URLs concurrently, results in input order"""
+        return self.run(self._gather([self.head(url) for url in urls]))
+
+    def get_many(self, urls):
+        """GET many URLs concurrently, results in input order"""
+        return self.run(self._gather([self.get(url) for url in urls]))
+
+    def download_many(self, jobs, refresh=False):
+        """Download many (url, local_path) jobs concurrently, results in input order"""
+        results = self.run(self._gather([self.download(url, path, refresh) for url, path in jobs]))
+        if self.validators:
+            self.validators.save()
+        return results
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+WG Game Content Detector
+Decides whether a parsed page carries game content in a single walk of
+the tree, using one combined multilingual pattern
+"""
+
+import re
+
+from bs4 import Comment, NavigableString, Tag
+
+# One alternation per language; the group name tells which one matched
+TEXT_PATTERN = re.compile(
+    r'(?P<zh>游戏|老虎机|赌场|扑克|体育|彩票|真人)'
+    r'|(?P<en>game|slot|casino|poker|sports|lottery|live)'
+    r'|(?P<th>เกม|สล็อต|คาสิโน|โป๊กเกอร์|กีฬา|หวย|สด)'
+    r'|(?P<vi>thể thao|xổ số|trực tiếp)',
+    re.I,
+)
+
+ATTR_PATTERN = re.compile(r'game|slot|casino', re.I)
+
+# Tag name -> attribute whose value marks a game element
+TAG_ATTRIBUTES = {'div': 'class', 'img': 'src', 'a': 'href'}
+
+# Markup is stronger evidence than a word in running text
+SIGNAL_WEIGHTS = {'text': 0.1, 'div.class': 0.3, 'img.src': 0.3, 'a.href': 0.2}
+
+SKIP_PARENTS = {'script', 'style', 'noscript', 'template'}
+
+
+def _attr_text(value):
+    return ' '.join(value) if isinstance(value, list) else value
+
+
+def detect_game_content(soup, first_hit=False, text_pattern=TEXT_PATTERN):
+    """Walk the tree once and report game signals
+
+    Returns {'found', 'signal', 'match', 'confidence', 'signals'}. With
+    first_hit the walk stops at the first signal; otherwise it stops once
+    the confidence reaches 1.0. A scraper with its own notion of game
+    words passes its own text_pattern.
+    """
+    result = {'found': False, 'signal': None, 'match': None, 'confidence': 0.0, 'signals': {}}
+
+    for node in soup.descendants:
+        signal = match = None
+
+        if isinstance(node, Tag):
+            attr = TAG_ATTRIBUTES.get(node.name)
+            if attr:
+                value = node.get(attr)
+                if value:
+                    hit = ATTR_PATTERN.search(_attr_text(value))
+                    if hit:
+                        signal, match = f"{node.name}.{attr}", hit.group(0)
+
+        elif isinstance(node, NavigableString) and not isinstance(node, Comment):
+            if node.parent is not None and node.parent.name in SKIP_PARENTS:
+                continue
+            hit = text_pattern.search(node)
+            if hit:
+                signal, match = f"text.{hit.lastgroup or 'any'}", hit.group(0)
+
+        if signal is None:
+            continue
+
+        if not result['found']:
+            result.update(found=True, signal=signal, match=match)
+        result['signals'][signal] = result['signals'].get(signal, 0) + 1
+        weight = SIGNAL_WEIGHTS['text' if signal.startswith('text.') else signal]
+        result['confidence'] = min(1.0, round(result['confidence'] + weight, 2))
+
+        if first_hit or result['confidence'] >= 1.0:
+            break
+
+    return result
+
+
+def has_game_content(soup, text_pattern=TEXT_PATTERN):
+    """Check if a page contains game content, stopping at the first signal"""
+    return detect_game_content(soup, first_hit=True, text_pattern=text_pattern)['found']
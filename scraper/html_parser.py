@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+WG HTML Parser
+Picks the BeautifulSoup tree builder once: lxml when it is installed,
+the stdlib html.parser otherwise
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+BACKENDS = ('lxml', 'html.parser')
+
+# WG_HTML_PARSER forces a backend, e.g. to compare output between them
+DEFAULT_BACKEND = os.environ.get('WG_HTML_PARSER') or ('lxml' if HAS_LXML else 'html.parser')
+
+
+def parse_html(content, backend=None):
+    """Parse a page into a soup with the fastest available backend"""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown parser backend: {backend}")
+    if backend == 'lxml' and not HAS_LXML:
+        backend = 'html.parser'
+    return BeautifulSoup(content, backend)
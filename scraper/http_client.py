@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+WG HTTP Client
+One place to build requests sessions: consistent headers per kind of
+traffic, keep-alive pools sized to the caller's concurrency, and the
+shared per-host rate limiter mounted on every one of them
+"""
+
+from threading import Lock
+
+import requests
+
+from rate_limiter import limit_session
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+# Headers per kind of traffic; the image CDN wants a wg.com Referer
+PROFILES = {
+    'page': {
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5,zh-CN,zh;q=0.3',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    },
+    'image': {
+        'User-Agent': USER_AGENT,
+        'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9,zh-CN,zh;q=0.8',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Referer': 'https://wg.com/',
+    },
+}
+
+DEFAULT_POOL_SIZE = 10
+
+_shared = {}
+_shared_lock = Lock()
+
+
+def mount_pool(session, pool_size=DEFAULT_POOL_SIZE, limiter=None, hosts=1):
+    """Size a session's keep-alive pool to its concurrency and put it behind the rate limiter"""
+    return limit_session(session, limiter, pool_connections=max(1, hosts), pool_maxsize=max(1, pool_size))
+
+
+def make_session(profile='image', pool_size=DEFAULT_POOL_SIZE, headers=None, limiter=None, hosts=1):
+    """Build a session for one kind of traffic with a pool of pool_size connections per host"""
+    session = requests.Session()
+    session.headers.update(PROFILES[profile])
+    if headers:
+        session.headers.update(headers)
+    return mount_pool(session, pool_size, limiter, hosts)
+
+
+def shared_session(profile='image'):
+    """Long-lived session per profile for module-level helpers, created on first use"""
+    with _shared_lock:
+        if profile not in _shared:
+            _shared[profile] = make_session(profile)
+        return _shared[profile]
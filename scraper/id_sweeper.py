@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+WG Image ID Sweeper
+Discovers image IDs block by block: each thousand-block is walked from its
+start and from every known ID in it, densely within a window of each hit and
+with growing strides past it, until a walk has missed too often. A walk that
+has not hit anything gives up after a few strided misses, so an empty block
+costs a handful of probes. Only the gap in front of a strided hit is walked
+back over; gaps no hit follows are not backfilled. Every probe goes through
+the probe index, so later runs only re-probe expired answers.
+"""
+
+from wg_assets import IMAGES_DIR, LANGUAGES, parse_image_filename
+
+# IDs seen upstream before any sweep (from web search and early downloads)
+SEED_IDS = [1001, 2001, 3001, 3035, 4001, 5001]
+
+# Thousand-blocks the catalog is spread over
+BLOCK_STARTS = range(1000, 20000, 1000)
+BLOCK_SIZE = 1000
+
+
+class _Walk:
+    def __init__(self, origin, direction, low, high, last_hit=None):
+        self.pos = origin
+        self.direction = direction
+        self.low = low
+        self.high = high
+        self.misses = 0
+        self.step = 1
+
+        # The last ID this walk found, None until it finds one
+        self.last_hit = last_hit
+
+    @property
+    def active(self):
+        return self.low <= self.pos <= self.high
+
+
+class IdSweeper:
+    def __init__(self, engine, probe_index, languages=LANGUAGES, variant='main', blocks=BLOCK_STARTS,
+                 max_misses=12, dense_misses=3, max_step=8, dense_window=32, images_dir=IMAGES_DIR):
+        self.engine = engine
+        self.probe_index = probe_index
+        self.images_dir = images_dir
+
+        # An ID exists when its image does in the first language; the other
+        # languages only count from answers already on record, since probing
+        # every language per ID would multiply the sweep by their number
+        self.languages = list(languages)
+        self.lang = self.languages[0]
+        self.variant = variant
+        self.blocks = list(blocks)
+
+        # A walk probes every ID within dense_window of its last hit (upstream
+        # runs have gaps of up to 30 IDs, 3005 -> 3035); past that, after
+        # dense_misses misses in a row its stride doubles (up to max_step),
+        # and it stops after max_misses misses in a row, or after dense_misses
+        # strided misses while it has found nothing
+        self.max_misses = max_misses
+        self.dense_misses = dense_misses
+        self.max_step = max_step
+        self.dense_window = dense_window
+
+        self.probes = 0
+        self._started = set()
+
+    def _block_of(self, img_id):
+        for start in self.blocks:
+            if start < img_id < start + BLOCK_SIZE:
+                return start
+        return None
+
+    def _on_disk(self):
+        ids = set()
+        if self.images_dir.exists():
+            for path in self.images_dir.glob('wg_game_*.webp'):
+                parts = parse_image_filename(path.name)
+                if parts and parts[0] in self.languages and parts[2] == self.variant:
+                    ids.add(int(parts[1]))
+        return ids
+
+    def _on_record(self):
+        """IDs with a positive answer on record in any of the languages"""
+        ids = set()
+        for lang in self.languages:
+            ids.update(int(i) for i in self.probe_index.positive_ids(lang, self.variant) if str(i).isdigit())
+        return ids
+
+    def seeds(self, extra_ids=()):
+        """Known IDs to widen around: built-in seeds, positive probes, files on disk, extra_ids"""
+        ids = set(SEED_IDS) | self._on_record() | self._on_disk()
+        ids.update(int(i) for i in extra_ids if str(i).isdigit())
+        return sorted(i for i in ids if self._block_of(i) is not None)
+
+    def _start(self, walks, origin, direction, low, high, last_hit=None):
+        """Add a walk, unless one already started from the same ID in the same direction"""
+        if (origin, direction) not in self._started:
+            self._started.add((origin, direction))
+            walks.append(_Walk(origin, direction, low, high, last_hit))
+
+    def _advance(self, walk, hit, walks):
+        previous = walk.pos
+        if hit:
+            # A stride jumped over the IDs in front of this hit: walk back over them
+            if walk.step > 1:
+                self._start(walks, previous - walk.direction, -walk.direction, walk.low, walk.high, previous)
+            walk.last_hit = previous
+            walk.misses = 0
+            walk.step = 1
+        elif walk.last_hit is None or abs(previous - walk.last_hit) > self.dense_window:
+            # Misses only count, and strides only grow, outside the window around the last hit
+            walk.misses += 1
+            if walk.misses >= self.dense_misses:
+                walk.step = min(walk.step * 2, self.max_step)
+
+        limit = self.max_misses if walk.last_hit is not None else 2 * self.dense_misses
+        if walk.misses >= limit:
+            walk.pos = walk.high + 1 if walk.direction > 0 else walk.low - 1
+        else:
+            walk.pos = previous + walk.direction * walk.step
+
+    def sweep(self, extra_ids=()):
+        """Walk every block concurrently, return the sorted IDs found"""
+        walks = []
+        self._started = set()
+        seeds = self.seeds(extra_ids)
+        for start in self.blocks:
+            self._start(walks, start + 1, 1, start + 1, start + BLOCK_SIZE - 1)
+        for seed in seeds:
+            start = self._block_of(seed)
+            self._start(walks, seed, 1, start + 1, start + BLOCK_SIZE - 1)
+            self._start(walks, seed - 1, -1, start + 1, start + BLOCK_SIZE - 1, seed)
+
+        known = {}
+        while True:
+            walks = [walk for walk in walks if walk.active]
+            if not walks:
+                break
+
+            # Walks that reached an ID already answered move on without a probe
+            pending = set()
+            for walk in list(walks):
+                while walk.active and walk.pos in known:
+                    self._advance(walk, known[walk.pos], walks)
+                if walk.active:
+                    pending.add(walk.pos)
+            if not pending:
+                continue
+
+            keys = [(self.lang, img_id, self.variant) for img_id in sorted(pending)]
+            self.probes += len(self.probe_index.stale(keys))
+            found = self.probe_index.probe(self.engine, keys)
+            known.update((key[1], hit) for key, hit in found.items())
+
+            for walk in list(walks):
+                if walk.active and walk.pos in pending:
+                    self._advance(walk, known[walk.pos], walks)
+
+        self.probe_index.save()
+
+        # IDs missing in the first language still count when another one has them on disk or on record
+        found = {img_id for img_id, hit in known.items() if hit}
+        found.update(img_id for img_id in self._on_record() | self._on_disk() if self._block_of(img_id) is not None)
+        return sorted(found)
+
+
+def catalog_image_ids(catalog):
+    """Image IDs the catalog already references, to seed a sweep with"""
+    columns = catalog.read_columns()
+    try:
+        return [img_id for img_id in columns['imageMetadata.id'] if img_id]
+    finally:
+        columns.close()
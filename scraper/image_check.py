@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+WG Image Check
+Header and size checks for the image files: empty or truncated files, and
+bytes whose format does not match the extension (JPEG data in an
+_icon.png). Each check is two small reads, so files are checked on a
+thread pool, and results can be written as a JSON or CSV report for CI
+"""
+
+import csv
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# Extension -> the format its bytes must be in
+EXTENSION_FORMATS = {
+    '.webp': 'webp',
+    '.jpg': 'jpeg',
+    '.jpeg': 'jpeg',
+    '.png': 'png',
+    '.gif': 'gif',
+    '.avif': 'avif',
+}
+
+# Bytes read from each end of a file
+HEAD_SIZE = 32
+TAIL_SIZE = 16
+
+
+def sniff_format(head):
+    """Image format named by a file's leading bytes, or None"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis'):
+        return 'avif'
+    return None
+
+
+def _boxes_complete(f, size):
+    """Check an ISO-BMFF file's top-level boxes add up to its size"""
+    position = 0
+    while position + 8 <= size:
+        f.seek(position)
+        header = f.read(16)
+        box_size = struct.unpack('>I', header[:4])[0]
+        if box_size == 1:
+            box_size = struct.unpack('>Q', header[8:16])[0]
+        elif box_size == 0:
+            box_size = size - position
+        if box_size < 8:
+            return False
+        position += box_size
+    return position == size
+
+
+def _complete(fmt, f, size, head, tail):
+    """Check a file of a known format ends where its own structure says it should"""
+    if fmt == 'webp':
+        return size >= struct.unpack('<I', head[4:8])[0] + 8
+    if fmt == 'png':
+        return tail.endswith(b'IEND\xaeB`\x82')
+    if fmt == 'jpeg':
+        return b'\xff\xd9' in tail
+    if fmt == 'gif':
+        return tail.endswith(b';')
+    return _boxes_complete(f, size)
+
+
+def check_image(path):
+    """Check one file, return {'name', 'size', 'format', 'problem'} with problem None when it is sound"""
+    result = {'name': os.path.basename(path), 'size': 0, 'format': None, 'problem': None}
+    try:
+        with open(path, 'rb') as f:
+            size = result['size'] = os.fstat(f.fileno()).st_size
+            if size == 0:
+                result['problem'] = 'empty'
+                return result
+
+            head = f.read(HEAD_SIZE)
+            fmt = result['format'] = sniff_format(head)
+            if fmt is None:
+                result['problem'] = 'unknown format'
+                return result
+
+            f.seek(max(0, size - TAIL_SIZE))
+            tail = f.read(TAIL_SIZE)
+            if len(head) < 12 or not _complete(fmt, f, size, head, tail):
+                result['problem'] = 'truncated'
+                return result
+    except OSError as e:
+        result['problem'] = f"unreadable: {e.strerror or e}"
+        return result
+
+    expected = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+    if expected and fmt != expected:
+        result['problem'] = f"{fmt} data in a {expected} file"
+    return result
+
+
+def check_images(paths, workers=None):
+    """Check files on a thread pool, return the results for the ones with a problem, by name"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(check_image, paths))
+    return sorted((result for result in results if result['problem']), key=lambda result: result['name'])
+
+
+def write_report(result, path):
+    """Write a verify result as JSON, or as CSV rows of (kind, subject, detail) when path ends in .csv"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() != '.csv':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        return path
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'subject', 'detail'])
+        for key, value in result.items():
+            if not isinstance(value, list):
+                writer.writerow(['summary', key, value])
+        for game_id in result.get('missing', []):
+            writer.writerow(['missing', game_id, 'no local images on disk'])
+        for entry in result.get('broken', []):
+            writer.writerow(['broken', entry['name'], entry['problem']])
+        for name in result.get('orphans', []):
+            writer.writerow(['orphan', name, 'not referenced by any game'])
+    return path
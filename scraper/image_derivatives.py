@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+WG Image Derivatives
+Decodes each downloaded image once and encodes a real icon plus responsive
+widths in webp (and avif when the encoder has it) on a process pool.
+Results are keyed by the source's digest, so an unchanged source is never
+re-encoded; outputs live in the blob store and are linked into the
+derived/ directory next to the images, which is committed with them.
+Reconcile points each game at what derived/ holds for its main image
+
+Needs Pillow; without it the stage reports itself unavailable and callers
+keep their old behaviour.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+from wg_assets import CACHE_DIR, IMAGES_DIR, PUBLIC_IMAGE_PREFIX
+
+DERIVATIVES_PATH = CACHE_DIR / "derivatives.json"
+DERIVED_DIRNAME = "derived"
+
+ICON_SIZE = 128
+WIDTHS = (320, 640, 1024)
+
+# Bumped whenever sizes or encoder settings change, so old outputs are redone
+SPEC = f"v1:icon{ICON_SIZE}:w{'-'.join(map(str, WIDTHS))}"
+
+ENCODER_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 60},
+}
+
+
+def available_formats():
+    """Output formats the installed Pillow can encode"""
+    if not HAS_PILLOW:
+        return ()
+    Image.init()
+    return tuple(fmt for fmt in ENCODER_OPTIONS if fmt.upper() in Image.SAVE)
+
+
+def derived_name(source_name, label, fmt):
+    """Public filename of one derivative, e.g. wg_game_1001_zh_w320.webp"""
+    return f"{Path(source_name).stem}_{label}.{fmt}"
+
+
+DERIVED_NAME_PATTERN = re.compile(r'^(.+)_(icon|w\d+)\.(\w+)$')
+
+
+def derived_files(images_dir=IMAGES_DIR):
+    """{source stem: {'label.fmt': name under the images dir}} for everything in derived/, from one listing"""
+    derived_dir = images_dir / DERIVED_DIRNAME
+    files = {}
+    if derived_dir.exists():
+        with os.scandir(derived_dir) as entries:
+            for entry in entries:
+                match = DERIVED_NAME_PATTERN.match(entry.name)
+                if match and not entry.name.startswith('.'):
+                    stem, label, fmt = match.groups()
+                    files.setdefault(stem, {})[f"{label}.{fmt}"] = f"{DERIVED_DIRNAME}/{entry.name}"
+    return files
+
+
+def derivatives_map(files):
+    """Split {'label.fmt': path} into the webp icon's path and {fmt: {width: path}}"""
+    widths = {}
+    for key, path in files.items():
+        label, fmt = key.split('.')
+        if label.startswith('w'):
+            widths.setdefault(fmt, {})[label[1:]] = path
+    return files.get('icon.webp'), widths
+
+
+def render_derivatives(source_path, formats, icon_size=ICON_SIZE, widths=WIDTHS):
+    """Decode a source once, return {'label.fmt': encoded bytes}; runs in a worker process"""
+    with Image.open(source_path) as image:
+        image.load()
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    # Icons are a centred square crop; widths never upscale
+    side = min(image.size)
+    left, top = (image.width - side) // 2, (image.height - side) // 2
+    sized = {'icon': image.crop((left, top, left + side, top + side)).resize((icon_size, icon_size), Image.LANCZOS)}
+    for width in widths:
+        if width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            sized[f"w{width}"] = image.resize((width, height), Image.LANCZOS)
+
+    outputs = {}
+    for label, sized_image in sized.items():
+        for fmt in formats:
+            buffer = BytesIO()
+            sized_image.save(buffer, fmt.upper(), **ENCODER_OPTIONS[fmt])
+            outputs[f"{label}.{fmt}"] = buffer.getvalue()
+    return outputs
+
+
+class DerivativeStage:
+    def __init__(self, blob_store, images_dir=IMAGES_DIR, path=DERIVATIVES_PATH, workers=None):
+        self.blob_store = blob_store
+        self.images_dir = images_dir
+        self.derived_dir = images_dir / DERIVED_DIRNAME
+        self.path = path
+        self.workers = workers
+        self.formats = available_formats()
+
+        # "source digest:spec" -> {'label.fmt': derivative digest}
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    @property
+    def available(self):
+        return 'webp' in self.formats
+
+    def save(self):
+        """Write the index atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _publish(self, source_path, outputs):
+        """Link a source's derivatives into derived/, return {'label.fmt': public path}"""
+        published = {}
+        for key, digest in outputs.items():
+            label, fmt = key.split('.')
+            dest = self.derived_dir / derived_name(source_path.name, label, fmt)
+            self.blob_store.link(digest, dest)
+            published[key] = f"{PUBLIC_IMAGE_PREFIX}{DERIVED_DIRNAME}/{dest.name}"
+        return published
+
+    def key(self, source_path):
+        """Index key of a source: its digest plus what would be made from it"""
+        return f"{self.blob_store.digest_of(source_path)}:{SPEC}:{','.join(self.formats)}"
+
+    def outputs(self, source_path):
+        """{'label.fmt': derivative digest} for a source already derived, else {}"""
+        return self.entries.get(self.key(source_path), {})
+
+    def run(self, sources):
+        """Derive every source path, encoding only sources not seen before; return {path: published}"""
+        if not sources:
+            return {}
+        if not self.available:
+            print("⚠️  Pillow with webp support is not installed, skipping image derivatives")
+            return {}
+
+        keys = {}
+        todo = {}
+        for source_path in sources:
+            key = keys[source_path] = self.key(source_path)
+            if key not in self.entries and key not in todo:
+                todo[key] = source_path
+
+        if todo:
+            print(f"🖼️  Encoding derivatives for {len(todo)} of {len(keys)} images")
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {key: pool.submit(render_derivatives, str(path), self.formats) for key, path in todo.items()}
+                for key, future in futures.items():
+                    try:
+                        rendered = future.result()
+                    except Exception as e:
+                        print(f"❌ Could not derive {todo[key].name}: {e}")
+                        continue
+                    self.entries[key] = {name: self.blob_store.put_bytes(data) for name, data in rendered.items()}
+            self.save()
+
+        return {path: self._publish(path, self.entries[key]) for path, key in keys.items() if key in self.entries}
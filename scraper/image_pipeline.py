@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+WG Image Pipeline
+The discover → download → derive → reconcile → verify steps the downloader scripts
+share. Only the network steps import requests, so reconcile and verify
+start without it
+"""
+
+from asset_index import AssetIndex
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from wg_assets import (IMAGES_DIR, LANGUAGES, PUBLIC_IMAGE_PREFIX, VARIANTS, image_filename, image_url,
+                       parse_image_filename)
+
+
+def reconcile_patches(catalog=None, languages=LANGUAGES, images_dir=IMAGES_DIR, blob_store=None, phash_index=None,
+                      asset_index=None):
+    """Point each game at its best local images by language preference, return patches for the games that change
+
+    With a perceptual hash index, a main image whose languages dedupe has
+    linked to one blob is flagged language_neutral
+    """
+    from catalog_reconcile import reconcile_columns
+
+    # Which files exist comes from one directory listing, not a stat per candidate
+    if asset_index is None:
+        asset_index = AssetIndex(images_dir)
+
+    # The join only needs a few columns, so read them from the columnar snapshot
+    columns = (catalog or CatalogStore()).read_columns()
+    try:
+        return reconcile_columns(columns, asset_index, languages, blob_store, phash_index)
+    finally:
+        columns.close()
+
+
+def verify_catalog(catalog=None, images_dir=IMAGES_DIR, asset_index=None, check_files=False, workers=None):
+    """Check every game's local images are on disk, return counts, the games without any and orphaned files
+
+    Orphans are files no game points at and that belong to no catalog game
+    or image ID, so per-game fallbacks named after the game ID and
+    other-language copies reconcile may still pick are not counted.
+    With check_files, every file's header and size is also validated on a
+    thread pool and the broken ones are listed
+    """
+    if asset_index is None:
+        asset_index = AssetIndex(images_dir)
+
+    # Only a few columns are needed, so read them from the columnar snapshot
+    columns = (catalog or CatalogStore()).read_columns()
+    try:
+        game_ids = columns['id'].tolist()
+        local_mains = columns['images.local_main'].tolist()
+        local_icons = columns['images.local_icon'].tolist()
+        image_ids = set(columns['imageMetadata.id'].tolist())
+    finally:
+        columns.close()
+
+    missing = []
+    for game_id, local_main, local_icon in zip(game_ids, local_mains, local_icons):
+        if not (asset_index.has_public(local_main) or asset_index.has_public(local_icon)):
+            missing.append(game_id)
+    total = len(game_ids)
+
+    referenced = {path.replace(PUBLIC_IMAGE_PREFIX, '') for path in local_mains + local_icons
+                  if path and path.startswith(PUBLIC_IMAGE_PREFIX)}
+    known_games = set(game_ids)
+    referenced |= {name for name in asset_index.names if name.rsplit('.', 1)[0] in known_games}
+    alternates = {name for (img_id, _, _), name in asset_index.images.items() if img_id in image_ids}
+    result = {'total': total, 'with_images': total - len(missing), 'missing': missing,
+              'orphans': sorted(asset_index.names - referenced - alternates)}
+
+    if check_files:
+        from image_check import check_images
+        result['checked'] = len(asset_index.names)
+        result['broken'] = check_images([asset_index.images_dir / name for name in asset_index.names], workers)
+    return result
+
+
+class ImagePipeline:
+    def __init__(self, languages=LANGUAGES, max_in_flight=32, timeout=8, refresh=False, dry_run=False,
+                 images_dir=IMAGES_DIR, catalog=None):
+        self.languages = list(languages)
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.refresh = refresh
+
+        # A dry run plans and reports, but downloads nothing and writes no patches
+        self.dry_run = dry_run
+
+        self.images_dir = images_dir
+        self.catalog = catalog or CatalogStore()
+        self.blob_store = BlobStore()
+        self.assets = AssetIndex(images_dir)
+
+        # Network pieces are built on first use
+        self._engine = None
+        self._validators = None
+        self._phash = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the fetch engine if one was opened"""
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    @property
+    def validators(self):
+        if self._validators is None:
+            from validator_store import ValidatorStore
+            self._validators = ValidatorStore()
+        return self._validators
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from fetch_engine import FetchEngine
+            self._engine = FetchEngine(max_in_flight=self.max_in_flight, timeout=self.timeout,
+                                       blob_store=self.blob_store, validators=self.validators,
+                                       asset_index=self.assets)
+        return self._engine
+
+    @property
+    def phash(self):
+        if self._phash is None:
+            from phash_index import PerceptualIndex
+            self._phash = PerceptualIndex(self.blob_store)
+        return self._phash
+
+    def image_files(self):
+        """Every wg_game_* image on disk in one of the pipeline's languages"""
+        return [self.images_dir / name for (_, lang, _), name in sorted(self.assets.images.items(), key=lambda item: item[1])
+                if lang in self.languages]
+
+    def discover(self, extra_ids=()):
+        """Sweep the ID space seeded with the catalog's image IDs, return the IDs found"""
+        from id_sweeper import IdSweeper, catalog_image_ids
+        from probe_index import ProbeIndex
+
+        sweeper = IdSweeper(self.engine, ProbeIndex(), self.languages, images_dir=self.images_dir)
+        ids = sweeper.sweep(list(catalog_image_ids(self.catalog)) + list(extra_ids))
+        print(f"🔎 Swept the ID space with {sweeper.probes} probes, found {len(ids)} image IDs")
+        return ids
+
+    def plan(self, ids):
+        """List (img_id, url, local_path) for every image still to fetch"""
+        jobs = []
+        for img_id in ids:
+            for lang in self.languages:
+                for variant in VARIANTS:
+                    local_path = self.images_dir / image_filename(lang, img_id, variant)
+                    # Existing files are skipped, unless refreshing one we hold validators for
+                    if not self.assets.has(img_id, lang, variant) or (self.refresh and self.validators.get(local_path)):
+                        jobs.append((img_id, image_url(lang, img_id, variant), local_path))
+        return jobs
+
+    def download(self, jobs):
+        """Fetch planned jobs, return {'downloaded', 'not_modified', 'not_found', 'failed'} counts and the new 'paths'
+
+        Most IDs are missing in some languages, so 404s are counted apart from real failures
+        """
+        counts = {'downloaded': 0, 'not_modified': 0, 'not_found': 0, 'failed': 0, 'paths': []}
+        if self.dry_run or not jobs:
+            return counts
+
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        results = self.engine.download_many([(url, local_path) for _, url, local_path in jobs], refresh=self.refresh)
+        for result in results:
+            if result['not_modified']:
+                counts['not_modified'] += 1
+            elif result['ok']:
+                counts['downloaded'] += 1
+                counts['paths'].append(result['path'])
+            elif result['status'] == 404:
+                counts['not_found'] += 1
+            else:
+                counts['failed'] += 1
+        return counts
+
+    def derive(self, paths=None):
+        """Encode icons and responsive sizes for main images (every one on disk by default)"""
+        from image_derivatives import DerivativeStage
+
+        if paths is None:
+            paths = [path for path in self.image_files() if parse_image_filename(path.name)[2] == 'main']
+        if self.dry_run:
+            print(f"🖼️  {len(paths)} images would be derived (dry run)")
+            return {}
+        return DerivativeStage(self.blob_store, self.images_dir).run(paths)
+
+    def reconcile(self):
+        """Patch the catalog with the best local images, return the patches"""
+        phash_index = self.phash if self.phash.available and self.phash.files else None
+        patches = reconcile_patches(self.catalog, self.languages, self.images_dir,
+                                    None if self.dry_run else self.blob_store, phash_index, self.assets)
+        if patches and not self.dry_run:
+            # Journal the changed games; games.json is rewritten on publish or once the journal is large
+            self.catalog.append_patches(patches)
+            self.catalog.maybe_compact()
+        return patches
+
+    def index_hashes(self, paths=None):
+        """Add images to the perceptual hash index (every image on disk by default)"""
+        if self.dry_run:
+            return 0
+        if paths is None:
+            return self.phash.sync(self.image_files())
+        return self.phash.add_many(paths)
+
+    def link_language_neutral(self):
+        """Keep one file of each image that looks alike in every language, link the others to it"""
+        return self.phash.link_language_neutral(self.images_dir, self.languages, self.dry_run)
+
+    def verify(self, check_files=False):
+        """Check the catalog's local images are on disk (and sound, with check_files)"""
+        return verify_catalog(self.catalog, self.images_dir, self.assets, check_files, self.max_in_flight)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+WG Perceptual Hash Index
+64-bit difference hashes of the game images, kept in a BK-tree so
+near-duplicates (the same art with a localized overlay) are found
+without comparing every pair. Hashes are keyed by content digest and
+added as images land, so each distinct file is hashed once
+
+Needs Pillow to hash; without it the index stays empty and lookups
+find nothing.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+from wg_assets import CACHE_DIR, LANGUAGES, parse_image_filename
+
+PHASH_INDEX_PATH = CACHE_DIR / "phash_index.json"
+
+# Bits two hashes may differ by and still count as the same picture
+DEFAULT_THRESHOLD = 10
+
+
+def dhash_file(path, size=8):
+    """Difference hash of an image: one bit per horizontally adjacent pixel pair"""
+    with Image.open(path) as image:
+        pixels = list(image.convert('L').resize((size + 1, size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = value << 1 | (left > pixels[row * (size + 1) + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    def __init__(self):
+        # Each node is [hash, items, {distance: child}]
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        """Insert an item under its hash"""
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """List (distance, item) for every item within radius bits, nearest first"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            # Triangle inequality: only children in [d - r, d + r] can hold matches
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        found.sort(key=lambda match: (match[0], match[1]))
+        return found
+
+
+class PerceptualIndex:
+    def __init__(self, blob_store, path=PHASH_INDEX_PATH, threshold=DEFAULT_THRESHOLD, workers=None):
+        self.blob_store = blob_store
+        self.path = path
+        self.threshold = threshold
+        self.workers = workers
+
+        # content digest -> hash, and public filename -> content digest
+        self.hashes = {}
+        self.files = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.hashes = {digest: int(value, 16) for digest, value in data['hashes'].items()}
+            self.files = data['files']
+        self._tree = None
+        self._images = None
+
+    @property
+    def available(self):
+        return HAS_PILLOW
+
+    @property
+    def tree(self):
+        """BK-tree over every indexed file, built on first lookup"""
+        if self._tree is None:
+            self._tree = BKTree()
+            for name, digest in self.files.items():
+                if digest in self.hashes:
+                    self._tree.add(self.hashes[digest], name)
+        return self._tree
+
+    @property
+    def images(self):
+        """(image ID, variant) -> {language: filename} for every hashed wg_game_* file"""
+        if self._images is None:
+            self._images = {}
+            for name, digest in self.files.items():
+                parts = parse_image_filename(name)
+                if parts and digest in self.hashes:
+                    lang, img_id, variant = parts
+                    self._images.setdefault((img_id, variant), {})[lang] = name
+        return self._images
+
+    def save(self):
+        """Write the index atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'hashes': {digest: f"{value:016x}" for digest, value in self.hashes.items()},
+                       'files': self.files}, f)
+        os.replace(tmp_path, self.path)
+
+    def add_many(self, paths):
+        """Index image files, hashing only content not seen before; return how many were hashed"""
+        if not paths or not self.available:
+            return 0
+
+        todo = {}
+        for path in paths:
+            digest = self.blob_store.digest_of(path)
+            self.files[path.name] = digest
+            if digest not in self.hashes:
+                todo.setdefault(digest, path)
+
+        if todo:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {digest: pool.submit(dhash_file, str(path)) for digest, path in todo.items()}
+                for digest, future in futures.items():
+                    try:
+                        self.hashes[digest] = future.result()
+                    except Exception as e:
+                        print(f"❌ Could not hash {todo[digest].name}: {e}")
+        self._tree = self._images = None
+        self.save()
+        return len(todo)
+
+    def sync(self, paths):
+        """Make the index cover exactly these files, hashing only new content"""
+        names = {path.name for path in paths}
+        self.files = {name: digest for name, digest in self.files.items() if name in names}
+        hashed = self.add_many(paths)
+
+        live = set(self.files.values())
+        self.hashes = {digest: value for digest, value in self.hashes.items() if digest in live}
+        self._tree = self._images = None
+        self.save()
+        return hashed
+
+    def near(self, name, radius=None):
+        """Other indexed files that look like this one, as (distance, name), nearest first"""
+        digest = self.files.get(name)
+        if digest not in self.hashes:
+            return []
+        radius = self.threshold if radius is None else radius
+        return [(distance, other) for distance, other in self.tree.search(self.hashes[digest], radius) if other != name]
+
+    def clusters(self):
+        """Group indexed files into near-duplicate clusters of two or more"""
+        seen = set()
+        groups = []
+        for name in sorted(self.files):
+            if name in seen or self.files[name] not in self.hashes:
+                continue
+            group = {name}
+            stack = [name]
+            while stack:
+                for _, other in self.near(stack.pop()):
+                    if other not in group:
+                        group.add(other)
+                        stack.append(other)
+            seen |= group
+            if len(group) > 1:
+                groups.append(sorted(group))
+        return groups
+
+    def language_neutral(self, base_id, variant='main', languages=LANGUAGES):
+        """Filename one image ID can use in every locale, when all its languages look alike, else None
+
+        This is the file the others are linked to when they are deduplicated
+        """
+        by_lang = self.images.get((str(base_id), variant), {})
+        if len(by_lang) < 2:
+            return None
+
+        values = [self.hashes[self.files[name]] for name in by_lang.values()]
+        if any(hamming(a, b) > self.threshold for i, a in enumerate(values) for b in values[i + 1:]):
+            return None
+        for lang in languages:
+            if lang in by_lang:
+                return by_lang[lang]
+        return min(by_lang.values())
+
+    def shared(self, base_id, variant='main'):
+        """Whether every language's file of an image ID is one blob, as deduplication leaves them"""
+        by_lang = self.images.get((str(base_id), variant), {})
+        return len(by_lang) > 1 and len({self.files[name] for name in by_lang.values()}) == 1
+
+    def link_language_neutral(self, images_dir, languages=LANGUAGES, dry_run=False):
+        """Link every language's file of a language-neutral image to one kept file's blob, return (name, kept) pairs"""
+        linked = []
+        for (img_id, variant), by_lang in sorted(self.images.items()):
+            keep = self.language_neutral(img_id, variant, languages)
+            if keep is None:
+                continue
+            digest = self.files[keep]
+            others = [name for name in sorted(by_lang.values()) if self.files[name] != digest]
+            if others and not dry_run:
+                # The kept file may still be a plain file; its blob has to exist before others link to it
+                self.blob_store.adopt(images_dir / keep)
+                for name in others:
+                    self.blob_store.link(digest, images_dir / name)
+                    self.files[name] = digest
+            linked.extend((name, keep) for name in others)
+
+        if linked and not dry_run:
+            self._tree = self._images = None
+            self.save()
+        return linked
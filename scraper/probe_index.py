@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+WG Probe Index
+Remembers HEAD-probe answers for the oss-proxy image space between runs
+"""
+
+import json
+import os
+import time
+from threading import Lock
+
+from wg_assets import CACHE_DIR, image_url, parse_image_url
+
+PROBE_INDEX_PATH = CACHE_DIR / "probe_index.json"
+
+# Statuses that mean the image is not there, as opposed to a transient failure
+NEGATIVE_STATUSES = {400, 403, 404, 410}
+
+
+class ProbeIndex:
+    def __init__(self, path=PROBE_INDEX_PATH, positive_ttl=7 * 86400, negative_ttl=86400):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        self.lock = Lock()
+        self.dirty = False
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(lang, img_id, variant='main'):
+        """Build the index key for an image"""
+        return f"{lang}/{img_id}/{variant}"
+
+    def get(self, lang, img_id, variant='main'):
+        """Get the stored entry for an image, fresh or not"""
+        with self.lock:
+            return self.entries.get(self.key(lang, img_id, variant))
+
+    def is_fresh(self, entry, now=None):
+        """Check whether an entry can be trusted without re-probing"""
+        if entry is None:
+            return False
+        ttl = self.positive_ttl if entry['status'] == 200 else self.negative_ttl
+        return (now or time.time()) - entry['probed_at'] < ttl
+
+    def lookup(self, lang, img_id, variant='main'):
+        """Get an image's entry if it is still fresh, otherwise None"""
+        entry = self.get(lang, img_id, variant)
+        return entry if self.is_fresh(entry) else None
+
+    def exists(self, lang, img_id, variant='main'):
+        """True/False from a fresh entry, None when the image must be probed"""
+        entry = self.lookup(lang, img_id, variant)
+        if entry is None:
+            return None
+        return entry['status'] == 200
+
+    def record(self, lang, img_id, variant, status, headers=None):
+        """Store the answer to a probe; transient failures are not cached"""
+        if status != 200 and status not in NEGATIVE_STATUSES:
+            return None
+
+        headers = headers or {}
+        content_length = headers.get('content-length')
+        entry = {
+            'status': status,
+            'content_length': int(content_length) if content_length and content_length.isdigit() else None,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'probed_at': time.time(),
+        }
+
+        with self.lock:
+            self.entries[self.key(lang, img_id, variant)] = entry
+            self.dirty = True
+        return entry
+
+    def record_url(self, url, status, headers=None):
+        """Store the answer to a probe of an upstream image URL"""
+        parts = parse_image_url(url)
+        if parts is None:
+            return None
+        return self.record(*parts, status, headers)
+
+    def exists_url(self, url):
+        """Like exists(), for an upstream image URL"""
+        parts = parse_image_url(url)
+        if parts is None:
+            return None
+        return self.exists(*parts)
+
+    def positive_ids(self, lang, variant='main'):
+        """List image IDs with a 200 answer on record for a language and variant"""
+        with self.lock:
+            return [key.split('/')[1] for key, entry in self.entries.items()
+                    if entry['status'] == 200 and key.startswith(f"{lang}/") and key.endswith(f"/{variant}")]
+
+    def stale(self, keys):
+        """Filter (lang, img_id, variant) keys down to those that need probing"""
+        now = time.time()
+        return [key for key in keys if not self.is_fresh(self.get(*key), now)]
+
+    def probe(self, engine, keys):
+        """HEAD-probe only stale keys with a FetchEngine, return key -> exists"""
+        stale = self.stale(keys)
+        results = engine.head_many([image_url(*key) for key in stale])
+        for key, result in zip(stale, results):
+            self.record(*key, result['status'], result['headers'])
+
+        found = {}
+        for key in keys:
+            entry = self.get(*key)
+            found[key] = entry is not None and entry['status'] == 200
+        return found
+
+    def save(self):
+        """Write the index to disk if anything changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+WG Rate Limiter
+Per-host token buckets shared by every session: a token is charged only
+when a request actually goes on the wire, the rate halves on 429/503
+(honouring Retry-After) and ramps back up while responses stay healthy
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+# Statuses that mean the server wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Client errors the server answered normally; most probes are 404s
+HEALTHY_MISSING_STATUSES = {404, 410}
+
+
+def is_healthy(status):
+    """Whether a response shows the host coping: 2xx/3xx, or a plain not-found"""
+    return status is not None and (status < 400 or status in HEALTHY_MISSING_STATUSES)
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None"""
+    value = (headers or {}).get('retry-after')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+
+        # Refills count from here; it lies in the future while a Retry-After is pending
+        self.updated = time.monotonic()
+
+
+class RateLimiter:
+    def __init__(self, rate=10.0, burst=20, min_rate=0.5, max_rate=100.0, ramp=0.5, backoff=0.5):
+        self.initial_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+        # Additive increase per healthy response, multiplicative decrease per throttle
+        self.ramp = ramp
+        self.backoff = backoff
+
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostBucket(self.initial_rate, self.burst)
+        return self._hosts[host]
+
+    def reserve(self, url):
+        """Take a token for url's host, return how many seconds to wait before sending"""
+        with self._lock:
+            bucket = self._bucket(url)
+            now = time.monotonic()
+            if now > bucket.updated:
+                bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+                bucket.updated = now
+
+            # Tokens may go negative: later callers queue up behind earlier ones
+            bucket.tokens -= 1
+            return max(0.0, bucket.updated - now) + max(0.0, -bucket.tokens / bucket.rate)
+
+    def wait(self, url):
+        """Block until a request to url may be sent"""
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
+
+    def feedback(self, url, status, headers=None):
+        """Adjust url's host rate from a response status, None for a connection failure
+
+        Only healthy responses ramp the rate up; other errors and failed
+        connections hold it where it is
+        """
+        with self._lock:
+            bucket = self._bucket(url)
+            if status in THROTTLE_STATUSES:
+                bucket.rate = max(self.min_rate, bucket.rate * self.backoff)
+                bucket.tokens = min(bucket.tokens, 0.0)
+                delay = retry_after_seconds(headers)
+                if delay:
+                    # Nothing refills while the server has asked us to stay away
+                    bucket.updated = max(bucket.updated, time.monotonic() + delay)
+            elif is_healthy(status):
+                bucket.rate = min(self.max_rate, bucket.rate + self.ramp)
+
+    def rate(self, url):
+        """Current requests per second allowed for url's host"""
+        with self._lock:
+            return self._bucket(url).rate
+
+
+# One limiter per process, so every session shares each host's budget
+DEFAULT_LIMITER = RateLimiter()
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that charges the limiter for every request it sends, redirects included"""
+
+    def __init__(self, limiter=None, **kwargs):
+        self.limiter = limiter or DEFAULT_LIMITER
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.limiter.wait(request.url)
+        response = super().send(request, **kwargs)
+        self.limiter.feedback(request.url, response.status_code, response.headers)
+        return response
+
+
+def limit_session(session, limiter=None, **adapter_kwargs):
+    """Mount rate-limited adapters on a session and return it"""
+    adapter = RateLimitedAdapter(limiter, **adapter_kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
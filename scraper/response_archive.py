@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+WG Response Archive
+Append-only, gzip-compressed WARC response records for every fetched page,
+with a JSONL index by URL and fetch time, so extraction can be replayed
+offline instead of re-crawling wg.com
+
+Each record is its own gzip member, so segments are valid .warc.gz files
+and any record can be read by seeking straight to its offset.
+"""
+
+import gzip
+import json
+import os
+import time
+import uuid
+from http import HTTPStatus
+from threading import Lock
+
+from wg_assets import CACHE_DIR
+
+ARCHIVE_DIR = CACHE_DIR / "archive"
+
+# Bodies are stored decoded, so these no longer describe them
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+def _http_block(status, headers, content):
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items()
+                 if name.lower() not in DROPPED_HEADERS)
+    lines.append(f"Content-Length: {len(content)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8', 'replace') + content
+
+
+def _split_block(block):
+    head, _, body = block.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('utf-8', 'replace').split('\r\n')
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers[name.strip()] = value.strip()
+    return int(status_line.split()[1]), headers, body
+
+
+class ResponseArchive:
+    def __init__(self, root=ARCHIVE_DIR, segment_size=256 << 20):
+        self.root = root
+        self.index_path = root / "index.jsonl"
+        self.segment_size = segment_size
+        self.lock = Lock()
+
+        # url -> index entries, oldest first
+        self.entries = {}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn last line from a crashed writer
+                    self.entries.setdefault(entry['url'], []).append(entry)
+
+    def _segment(self):
+        """Segment to append to, starting a new one once the current is full"""
+        segments = sorted(self.root.glob('responses-*.warc.gz'))
+        if segments and segments[-1].stat().st_size < self.segment_size:
+            return segments[-1]
+        return self.root / f"responses-{len(segments):05d}.warc.gz"
+
+    def put(self, url, status, headers, content, fetched_at=None):
+        """Append a response, return its index entry"""
+        fetched_at = fetched_at or time.time()
+        block = _http_block(status, headers, content or b'')
+        warc_headers = '\r\n'.join([
+            "WARC/1.1",
+            "WARC-Type: response",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Target-URI: {url}",
+            f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(fetched_at))}",
+            "Content-Type: application/http;msgtype=response",
+            f"Content-Length: {len(block)}",
+        ])
+        record = gzip.compress(warc_headers.encode('utf-8') + b'\r\n\r\n' + block + b'\r\n\r\n')
+
+        with self.lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            segment = self._segment()
+            with open(segment, 'ab') as f:
+                offset = f.tell()
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+
+            entry = {'url': url, 'fetched_at': fetched_at, 'status': status,
+                     'segment': segment.name, 'offset': offset, 'length': len(record)}
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.entries.setdefault(url, []).append(entry)
+        return entry
+
+    def lookup(self, url, at=None):
+        """Index entry of the newest response for a URL fetched at or before `at`, or None"""
+        with self.lock:
+            for entry in reversed(self.entries.get(url, ())):
+                if at is None or entry['fetched_at'] <= at:
+                    return entry
+        return None
+
+    def read(self, entry):
+        """Load an archived response as {'url', 'status', 'headers', 'content', 'fetched_at'}"""
+        with open(self.root / entry['segment'], 'rb') as f:
+            f.seek(entry['offset'])
+            record = gzip.decompress(f.read(entry['length']))
+
+        # WARC headers, then the HTTP block, then the record's closing blank line
+        _, _, block = record.partition(b'\r\n\r\n')
+        status, headers, body = _split_block(block[:-4])
+        return {'url': entry['url'], 'status': status, 'headers': headers, 'content': body,
+                'fetched_at': entry['fetched_at']}
+
+    def get(self, url, at=None):
+        """Newest archived response for a URL (at or before `at`), or None"""
+        entry = self.lookup(url, at)
+        return self.read(entry) if entry else None
+
+    def urls(self):
+        """Every URL with at least one archived response"""
+        with self.lock:
+            return list(self.entries)
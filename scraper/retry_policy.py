@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+WG Retry Policy
+Exponential backoff with full jitter for page and image fetches: only
+transient failures are retried, and every retry in a run draws from one
+shared budget so a failing host cannot stall the whole run
+"""
+
+import random
+import threading
+import time
+
+import requests
+
+from rate_limiter import retry_after_seconds
+
+# Worth another attempt; anything else (404, 403, ...) is final
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,  # fetch_engine.IncompleteDownload included
+)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=30.0, budget=100):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # Retries left for the whole run, shared by every caller of this policy
+        self.budget = budget
+        self._lock = threading.Lock()
+
+    def is_retryable(self, status=None, error=None):
+        """Check whether a failure is transient"""
+        if error is not None:
+            return isinstance(error, RETRYABLE_ERRORS)
+        return status in RETRYABLE_STATUSES
+
+    def _spend(self):
+        with self._lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            return True
+
+    def backoff(self, attempt, status=None, error=None, headers=None):
+        """Seconds to wait before retrying after attempt (0-based), or None to stop"""
+        if attempt + 1 >= self.max_attempts or not self.is_retryable(status, error):
+            return None
+        if not self._spend():
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(headers)
+        if retry_after is not None:
+            delay = max(delay, min(self.max_delay, retry_after))
+        return delay
+
+    def call(self, send, *args, **kwargs):
+        """Call send(*args, **kwargs) until it returns a final response or raises a final error"""
+        attempt = 0
+        while True:
+            try:
+                response = send(*args, **kwargs)
+                error = None
+            except RETRYABLE_ERRORS as e:
+                response, error = None, e
+
+            status = response.status_code if response is not None else None
+            headers = response.headers if response is not None else None
+            delay = self.backoff(attempt, status, error, headers)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+# One policy per process, so page and image fetches share the retry budget
+DEFAULT_POLICY = RetryPolicy()
@@ -0,0 +1,89 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# The scraper modules import each other as siblings
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fetch_engine import FetchEngine  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from retry_policy import RetryPolicy  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, send_body=True):
+        self.server.hits.append((self.command, self.path, dict(self.headers)))
+        route = self.server.routes.get(self.path)
+        status, headers, body = route(self) if route else (404, {}, b'')
+
+        self.send_response(status)
+        headers = {'Content-Length': str(len(body)), **headers}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+
+class LocalServer(ThreadingHTTPServer):
+    """http.server on a free local port; routes map a path to handler -> (status, headers, body)"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.routes = {}
+        self.hits = []
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    def gets(self, path):
+        return [hit for hit in self.hits if hit[:2] == ('GET', path)]
+
+
+@pytest.fixture
+def local_server():
+    """Start local servers on demand, shut them all down after the test"""
+    servers = []
+
+    def start():
+        server = LocalServer()
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_engine():
+    """Build engines that are not held back by the shared rate limiter or long backoffs"""
+    engines = []
+
+    def make(**kwargs):
+        kwargs.setdefault('limiter', RateLimiter(rate=1000, burst=1000))
+        kwargs.setdefault('retry_policy', RetryPolicy(base_delay=0.01))
+        engine = FetchEngine(**kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.close()
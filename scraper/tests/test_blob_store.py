@@ -0,0 +1,28 @@
+import os
+
+import blob_store
+from blob_store import BlobStore
+
+
+def test_link_copies_when_hardlinks_fail(tmp_path, monkeypatch):
+    store = BlobStore(tmp_path / "blobs")
+    digest = store.put_bytes(b'image')
+
+    def cross_device(src, dst):
+        raise OSError("cross-device link")
+    monkeypatch.setattr(blob_store.os, 'link', cross_device)
+
+    dest = store.link(digest, tmp_path / "images" / "a.webp")
+    assert not dest.is_symlink()
+    assert dest.read_bytes() == b'image'
+
+
+def test_adopt_replaces_symlinks_into_the_store(tmp_path):
+    store = BlobStore(tmp_path / "blobs")
+    digest = store.put_bytes(b'image')
+    dest = tmp_path / "a.webp"
+    os.symlink(store.blob_path(digest), dest)
+
+    assert store.adopt(dest) == digest
+    assert not dest.is_symlink()
+    assert os.path.samefile(dest, store.blob_path(digest))
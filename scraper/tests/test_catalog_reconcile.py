@@ -0,0 +1,118 @@
+import hashlib
+
+import pytest
+
+import catalog_reconcile
+from asset_index import AssetIndex
+from blob_store import BlobStore
+from catalog_reconcile import reconcile_columns
+from catalog_store import CatalogStore
+from wg_assets import PUBLIC_IMAGE_PREFIX
+
+needs_numpy = pytest.mark.skipif(not catalog_reconcile.HAS_NUMPY, reason="numpy is not installed")
+
+FILES = [
+    'wg_game_101_zh.webp', 'wg_game_101_zh_icon.webp', 'wg_game_101_en.webp',
+    'wg_game_102_en.webp', 'wg_game_102_th_icon.webp',
+    'wg_game_104_th.webp',
+    'wg_game_105_zh.webp', 'wg_game_105_en.webp',
+    'wg_game_1234567890_ja.webp',
+    # Derivatives of 102's main image
+    'derived/wg_game_102_en_icon.webp', 'derived/wg_game_102_en_w320.webp', 'derived/wg_game_102_en_w320.avif',
+]
+
+
+def public(name):
+    return PUBLIC_IMAGE_PREFIX + name
+
+
+def digest(images_dir, name):
+    return hashlib.sha256((images_dir / name).read_bytes()).hexdigest()
+
+
+class FakePhashIndex:
+    """Image 105's languages have been linked to one blob by dedupe"""
+    images = {('105', 'main'): {'zh': 'wg_game_105_zh.webp', 'en': 'wg_game_105_en.webp'},
+              ('101', 'main'): {'zh': 'wg_game_101_zh.webp', 'en': 'wg_game_101_en.webp'}}
+
+    def shared(self, base_id, variant='main'):
+        return base_id == '105'
+
+
+@pytest.fixture
+def setup(tmp_path):
+    images_dir = tmp_path / "images"
+    (images_dir / "derived").mkdir(parents=True)
+    for name in FILES:
+        (images_dir / name).write_bytes(name.encode())
+
+    games = [
+        # Main image already reconciled, icon still missing
+        {'id': 'g1', 'imageMetadata': {'id': '101'},
+         'images': {'local_main': public('wg_game_101_zh.webp'),
+                    'sha256': {'local_main': digest(images_dir, 'wg_game_101_zh.webp')}}},
+        {'id': 'g2', 'imageMetadata': {'id': '102'}, 'images': {}},
+        # Same image ID as g1, wrongly marked language neutral
+        {'id': 'g3', 'imageMetadata': {'id': '101'}, 'images': {'language_neutral': True}},
+        {'id': 'g4', 'imageMetadata': {'id': '103'}, 'images': {}},
+        {'id': 'g5', 'images': {'local_main': '/elsewhere.webp'}},
+        # Icon points at a file that is gone, with a stale digest
+        {'id': 'g6', 'imageMetadata': {'id': '104'},
+         'images': {'local_icon': public('gone_icon.webp'), 'sha256': {'local_icon': 'abc'}}},
+        {'id': 'g7', 'imageMetadata': {'id': '105'}, 'images': {}},
+        {'id': 'g8', 'imageMetadata': {'id': '1234567890'}, 'images': {}},
+        # No image ID to reconcile by, but its local image still gets a digest
+        {'id': 'g9', 'images': {'local_main': public('wg_game_104_th.webp')}},
+    ]
+    store = CatalogStore(tmp_path / "games.json")
+    store.replace_all(games)
+    return store, AssetIndex(images_dir), BlobStore(tmp_path / "blobs")
+
+
+def reconcile(setup, monkeypatch, use_numpy):
+    store, asset_index, blob_store = setup
+    monkeypatch.setattr(catalog_reconcile, 'HAS_NUMPY', use_numpy)
+    with store.read_columns() as columns:
+        return reconcile_columns(columns, asset_index, ['zh', 'en', 'th', 'ja'], blob_store, FakePhashIndex())
+
+
+def test_only_changed_fields_are_patched(setup, monkeypatch):
+    images_dir = setup[1].images_dir
+    patches = {patch['id']: patch for patch in reconcile(setup, monkeypatch, False)}
+
+    assert sorted(patches) == ['g1', 'g2', 'g3', 'g6', 'g7', 'g8', 'g9']
+    assert patches['g1'] == {'id': 'g1', 'set': {
+        'images.local_icon': public('wg_game_101_zh_icon.webp'),
+        'images.sha256.local_icon': digest(images_dir, 'wg_game_101_zh_icon.webp'),
+        'images.language_neutral': False,
+    }}
+    assert patches['g2']['set']['images.local_main'] == public('wg_game_102_en.webp')
+    assert patches['g2']['set']['images.local_icon'] == public('derived/wg_game_102_en_icon.webp')
+    assert patches['g2']['set']['images.sha256.local_icon'] == digest(images_dir, 'derived/wg_game_102_en_icon.webp')
+    assert patches['g2']['set']['images.derivatives'] == {
+        'webp': {'320': public('derived/wg_game_102_en_w320.webp')},
+        'avif': {'320': public('derived/wg_game_102_en_w320.avif')},
+    }
+    assert 'images.derivatives' not in patches['g7']['set']
+    assert patches['g3']['set']['images.language_neutral'] is False
+    assert patches['g6']['unset'] == ['images.sha256.local_icon']
+    assert 'images.local_icon' not in patches['g6']['set']
+    assert patches['g7']['set']['images.local_main'] == public('wg_game_105_zh.webp')
+    assert patches['g7']['set']['images.language_neutral'] is True
+    assert patches['g8']['set']['images.local_main'] == public('wg_game_1234567890_ja.webp')
+    assert patches['g9'] == {'id': 'g9', 'set': {
+        'images.sha256.local_main': digest(images_dir, 'wg_game_104_th.webp'),
+    }}
+
+
+@needs_numpy
+def test_numpy_join_matches_pure_python(setup, monkeypatch):
+    assert reconcile(setup, monkeypatch, True) == reconcile(setup, monkeypatch, False)
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=needs_numpy)])
+def test_reconciled_catalog_needs_no_further_patches(setup, monkeypatch, use_numpy):
+    store = setup[0]
+    store.append_patches(reconcile(setup, monkeypatch, use_numpy))
+    store.publish()
+    assert reconcile(setup, monkeypatch, use_numpy) == []
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from catalog_store import CatalogStore
+
+GAMES = [
+    {'id': 'g1', 'name': 'One', 'images': {'main': 'a.webp', 'local_main': '/old/g1.webp'}},
+    {'id': 'g2', 'name': 'Two', 'images': {'main': 'b.webp'}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CatalogStore(tmp_path / "games.json")
+    store.replace_all(json.loads(json.dumps(GAMES)))
+    return store
+
+
+def on_disk(store):
+    with open(store.path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_patches_are_journalled_without_rewriting_games_json(store):
+    store.patch('g1', {'images.local_main': '/new/g1.webp'})
+    store.patch('g2', {'images.local_icon': '/new/g2_icon.webp'}, ['name'])
+
+    assert on_disk(store) == GAMES
+    games = {game['id']: game for game in store.load()}
+    assert games['g1']['images']['local_main'] == '/new/g1.webp'
+    assert games['g2']['images']['local_icon'] == '/new/g2_icon.webp'
+    assert 'name' not in games['g2']
+
+
+def test_torn_journal_line_from_a_crash_is_ignored(store):
+    store.append_patches([
+        {'id': 'g1', 'set': {'images.local_main': '/new/g1.webp'}},
+        {'id': 'g3', 'set': {'name': 'Three'}},
+    ])
+    # The writer died halfway through its next line
+    with open(store.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "g2", "set": {"name": "Tw')
+
+    reopened = CatalogStore(store.path)
+    games = {game['id']: game for game in reopened.load()}
+    assert games['g1']['images']['local_main'] == '/new/g1.webp'
+    assert games['g2']['name'] == 'Two'
+    assert games['g3'] == {'id': 'g3', 'name': 'Three'}
+
+    assert reopened.compact() == 2
+    assert not reopened.journal_path.exists()
+    assert on_disk(reopened) == list(games.values())
+
+
+def test_compact_after_a_crash_mid_write_keeps_the_old_catalog(store):
+    store.patch('g1', {'images.local_main': '/new/g1.webp'})
+    # A compaction that died before its rename leaves only a temp file behind
+    (store.path.parent / ".games.json.99999.tmp").write_text('[{"id": "g1"', encoding='utf-8')
+
+    assert on_disk(store) == GAMES
+    assert store.compact() == 1
+    assert on_disk(store)[0]['images']['local_main'] == '/new/g1.webp'
+    assert store.compact() == 0
+
+
+def test_small_journal_waits_for_publish(store):
+    store.patch('g1', {'images.local_main': '/new/g1.webp'})
+    assert store.maybe_compact() == 0
+    assert on_disk(store) == GAMES
+    assert store.pending() == 1
+
+    # Past the threshold the writer folds it in itself
+    assert store.maybe_compact(threshold=store.journal_size() - 1) == 1
+    assert on_disk(store)[0]['images']['local_main'] == '/new/g1.webp'
+    assert store.pending() == 0 and store.journal_size() == 0
+
+
+def test_readers_replay_the_journal_in_memory(store):
+    store.patch('g2', {'images.local_main': '/new/g2.webp'})
+    journal = store.journal_path.read_bytes()
+    assert store.columns() is None
+
+    with store.read_columns() as columns:
+        assert columns['images.local_main'].tolist() == ['/old/g1.webp', '/new/g2.webp']
+    assert on_disk(store) == GAMES
+    assert store.journal_path.read_bytes() == journal
+
+
+def test_publish_folds_the_journal_and_refreshes_the_snapshot(store):
+    store.patch('g2', {'images.local_main': '/new/g2.webp'})
+    assert store.publish() == 1
+    with store.columns() as columns:
+        assert columns['images.local_main'].tolist() == ['/old/g1.webp', '/new/g2.webp']
+
+    store.columns_path.unlink()
+    assert store.publish() == 0
+    assert store.columns() is not None
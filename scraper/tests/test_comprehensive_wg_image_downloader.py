@@ -0,0 +1,55 @@
+import concurrent.futures
+import random
+import threading
+import time
+
+import pytest
+
+from comprehensive_wg_image_downloader import WGImageDownloader
+
+CANDIDATES = [f"https://img.test/zh/img/{1000 + rank}.webp" for rank in range(40)]
+WORKERS = 2
+
+
+@pytest.fixture
+def downloader(monkeypatch):
+    downloader = WGImageDownloader(probe_window=6)
+    # Fewer workers than the probe window, so some probes are still queued when the answer is known
+    downloader.executor.shutdown()
+    downloader.executor = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS)
+    monkeypatch.setattr(downloader, 'candidate_urls', lambda game_id, base_id=None: iter(CANDIDATES))
+    yield downloader
+    downloader.executor.shutdown(wait=True, cancel_futures=True)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_result_is_the_first_hit_in_rank_order(downloader, monkeypatch, seed):
+    rng = random.Random(seed)
+    hits = set(rng.sample(CANDIDATES, rng.choice([0, 1, 2, 5])))
+    winner = next((url for url in CANDIDATES if url in hits), None)
+    winner_rank = CANDIDATES.index(winner) if winner else len(CANDIDATES)
+
+    delays = {url: rng.uniform(0, 0.01) for url in CANDIDATES}
+    release = threading.Event()
+    started_below = []
+
+    def check_image_exists(url):
+        if CANDIDATES.index(url) > winner_rank:
+            # A probe ranked below the winner only finishes after the answer is back
+            started_below.append(url)
+            release.wait(5)
+        else:
+            time.sleep(delays[url])
+        return url in hits
+    monkeypatch.setattr(downloader, 'check_image_exists', check_image_exists)
+
+    start = time.perf_counter()
+    try:
+        assert downloader.find_best_image_for_game('game') == winner
+        assert time.perf_counter() - start < 2
+    finally:
+        release.set()
+
+    # Queued lower-ranked probes were cancelled; only those a free worker had already picked up ran
+    downloader.executor.shutdown(wait=True)
+    assert len(started_below) <= WORKERS
@@ -0,0 +1,42 @@
+import crawl_pipeline
+from crawl_pipeline import CrawlPipeline, RunState
+
+
+class FakeScraper:
+    engine = None
+    archive = None
+    from_archive = False
+
+
+class FakeScheduler:
+    crawled = []
+
+    def __init__(self, engine, archive=None):
+        pass
+
+    def crawl(self, targets, on_result=None):
+        FakeScheduler.crawled = [target[2] for target in targets]
+        for i, (language, _, url) in enumerate(targets):
+            on_result(i, {'url': url, 'language': language, 'status': 200, 'error': None,
+                          'ok': True, 'content': b'<html></html>', 'fetched_at': 1.0})
+
+
+def test_resume_refetches_throttled_and_failing_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_pipeline, 'CrawlScheduler', FakeScheduler)
+    state = RunState(tmp_path / "run")
+    pipeline = CrawlPipeline(FakeScraper(), state)
+
+    statuses = {'ok': 200, 'gone': 404, 'busy': 503, 'throttled': 429, 'timeout': None}
+    targets = [['zh', f'/{name}', f"https://wg.test/{name}"] for name in statuses]
+    state.write_output('targets.json', targets)
+    state.start('fetch')
+
+    # A crash after the first pass checkpointed every page, some still failing
+    with state.checkpoints('fetch') as checkpoint:
+        for index, (name, status) in enumerate(statuses.items()):
+            checkpoint({'index': index, 'language': 'zh', 'url': f"https://wg.test/{name}", 'status': status,
+                        'error': 'timed out' if status is None else None,
+                        'fetched_at': 1.0 if status == 200 else None})
+
+    pipeline.fetch()
+    assert FakeScheduler.crawled == ["https://wg.test/busy", "https://wg.test/throttled", "https://wg.test/timeout"]
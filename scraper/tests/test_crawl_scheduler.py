@@ -0,0 +1,33 @@
+import threading
+
+from crawl_scheduler import CrawlScheduler
+from fetch_engine import FetchEngine
+from rate_limiter import RateLimiter
+from response_archive import ResponseArchive
+
+
+class ThreadRecordingArchive(ResponseArchive):
+    def __init__(self, root):
+        super().__init__(root)
+        self.put_threads = set()
+
+    def put(self, *args, **kwargs):
+        self.put_threads.add(threading.get_ident())
+        return super().put(*args, **kwargs)
+
+
+def test_responses_are_archived_off_the_event_loop(local_server, tmp_path):
+    server = local_server()
+    server.routes['/zh/'] = lambda handler: (200, {'Content-Type': 'text/html'}, b'<html>zh</html>')
+    targets = [('zh', '/', server.url('/zh/')), ('en', '/', server.url('/en/'))]
+
+    archive = ThreadRecordingArchive(tmp_path / "archive")
+    with FetchEngine(max_in_flight=4, per_host=2, limiter=RateLimiter(rate=1000, burst=1000)) as engine:
+        results = CrawlScheduler(engine, archive=archive).crawl(targets)
+
+    assert [result['status'] for result in results] == [200, 404]
+    assert all('fetched_at' in result for result in results)
+    assert threading.get_ident() not in archive.put_threads
+
+    replayed = CrawlScheduler(engine, archive=ResponseArchive(tmp_path / "archive")).replay(targets)
+    assert [(result['status'], result['content']) for result in replayed] == [(200, b'<html>zh</html>'), (404, b'')]
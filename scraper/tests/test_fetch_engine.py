@@ -0,0 +1,120 @@
+import os
+import stat
+import threading
+import time
+
+from fetch_engine import FILE_MODE, INCOMING_DIRNAME, save_response
+from retry_policy import RetryPolicy
+
+BODY = b'RIFF\x10\x00\x00\x00WEBPVP8 ' + b'\x00' * 4
+
+
+class Gauge:
+    """Peak number of requests a server was handling at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+
+def slow_routes(server, count, *gauges):
+    def route(handler):
+        for gauge in gauges:
+            gauge.enter()
+        time.sleep(0.05)
+        for gauge in gauges:
+            gauge.leave()
+        return 200, {}, BODY
+
+    paths = [f"/img/{i}.webp" for i in range(count)]
+    for path in paths:
+        server.routes[path] = route
+    return [server.url(path) for path in paths]
+
+
+def test_global_limit_caps_requests_across_hosts(local_server, make_engine):
+    total = Gauge()
+    urls = slow_routes(local_server(), 6, total) + slow_routes(local_server(), 6, total)
+    results = make_engine(max_in_flight=3, per_host=3).head_many(urls)
+    assert all(result['ok'] for result in results)
+    assert total.peak == 3
+
+
+def test_per_host_limit_caps_each_host_only(local_server, make_engine):
+    total, first, second = Gauge(), Gauge(), Gauge()
+    urls = slow_routes(local_server(), 6, total, first) + slow_routes(local_server(), 6, total, second)
+    results = make_engine(max_in_flight=8, per_host=2).head_many(urls)
+    assert all(result['ok'] for result in results)
+    assert first.peak == second.peak == 2
+    assert total.peak == 4
+
+
+def test_results_come_back_in_input_order(local_server, make_engine):
+    server = local_server()
+    server.routes['/fast.webp'] = lambda handler: (200, {}, BODY)
+    urls = slow_routes(server, 3) + [server.url('/fast.webp'), server.url('/missing.webp')]
+    results = make_engine(max_in_flight=8, per_host=8).get_many(urls)
+    assert [result['url'] for result in results] == urls
+    assert [result['status'] for result in results] == [200, 200, 200, 200, 404]
+    assert results[3]['content'] == BODY
+
+
+def test_download_lands_atomically_with_the_usual_mode(local_server, make_engine, tmp_path):
+    server = local_server()
+    server.routes['/a.webp'] = lambda handler: (200, {}, BODY)
+    make_engine().download_many([(server.url('/a.webp'), tmp_path / 'a.webp')])
+    assert sorted(os.listdir(tmp_path)) == [INCOMING_DIRNAME, 'a.webp']
+    assert os.listdir(tmp_path / INCOMING_DIRNAME) == []
+    assert stat.S_IMODE(os.stat(tmp_path / 'a.webp').st_mode) == FILE_MODE
+
+
+def test_partial_body_is_kept_out_of_the_published_directory(tmp_path):
+    seen = {}
+
+    class Response:
+        headers = {}
+
+        def iter_content(self, chunk_size):
+            yield BODY[:8]
+            # Where a killed process would leave its partial file
+            seen['published'] = os.listdir(tmp_path)
+            seen['incoming'] = os.listdir(tmp_path / INCOMING_DIRNAME)
+            yield BODY[8:]
+
+        def close(self):
+            pass
+
+    assert save_response(Response(), tmp_path / 'a.webp')[0] == len(BODY)
+    assert seen['published'] == [INCOMING_DIRNAME]
+    assert len(seen['incoming']) == 1 and seen['incoming'][0].endswith('.part')
+    assert (tmp_path / 'a.webp').read_bytes() == BODY
+
+
+def test_truncated_body_leaves_the_old_file_alone(local_server, make_engine, tmp_path):
+    server = local_server()
+
+    def route(handler):
+        # Advertise more than is sent, then hang up
+        handler.close_connection = True
+        return 200, {'Content-Length': str(len(BODY) * 2)}, BODY
+    server.routes['/a.webp'] = route
+
+    local_path = tmp_path / 'a.webp'
+    local_path.write_bytes(b'old')
+    result = make_engine(retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01)).download_many(
+        [(server.url('/a.webp'), local_path)])[0]
+    assert not result['ok'] and result['error']
+    assert len(server.gets('/a.webp')) == 2
+    assert local_path.read_bytes() == b'old'
+    assert sorted(os.listdir(tmp_path)) == [INCOMING_DIRNAME, 'a.webp']
+    assert os.listdir(tmp_path / INCOMING_DIRNAME) == []
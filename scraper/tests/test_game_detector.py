@@ -0,0 +1,27 @@
+from bs4 import BeautifulSoup
+
+from game_detector import detect_game_content, has_game_content
+from wg_games_scraper import GAME_TEXT_PATTERN
+
+
+def soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+
+def test_shared_pattern_reports_the_language_that_matched():
+    assert detect_game_content(soup('<p>老虎机</p>'))['signal'] == 'text.zh'
+
+
+def test_games_scraper_keeps_its_narrower_pattern():
+    page = soup('<p>We deliver live sports results</p>')
+    assert has_game_content(page)
+    assert not has_game_content(page, GAME_TEXT_PATTERN)
+    assert has_game_content(soup('<p>老虎机</p>'), GAME_TEXT_PATTERN)
+
+
+def test_markup_counts_whatever_the_text_pattern():
+    assert has_game_content(soup('<div class="slot-item"></div>'), GAME_TEXT_PATTERN)
+
+
+def test_script_text_is_ignored():
+    assert not has_game_content(soup('<script>var game = 1;</script>'))
@@ -0,0 +1,82 @@
+import pytest
+
+import id_sweeper
+from id_sweeper import IdSweeper
+from probe_index import ProbeIndex
+from wg_assets import parse_image_url
+
+# IDs that exist upstream in the simulation: short runs next to gaps,
+# odd IDs past a gap, and lone IDs far from any seed
+EXISTING = {
+    1001, 1002, 1003, 1004, 1005, 1012, 1014, 1017, 1019, 1021,
+    2001, 2002, 2003, 2004, 2005, 2006, 2007, 2008, 2009, 2010,
+    3001, 3002, 3003, 3004, 3005, 3035,
+    4001, 4002, 4004, 4035,
+}
+
+
+class FakeEngine:
+    def __init__(self, existing):
+        self.existing = existing
+        self.heads = []
+
+    def head_many(self, urls):
+        results = []
+        for url in urls:
+            img_id = int(parse_image_url(url)[1])
+            self.heads.append(img_id)
+            results.append({'status': 200 if img_id in self.existing else 404, 'headers': {}})
+        return results
+
+
+@pytest.fixture
+def sweeper(tmp_path, monkeypatch):
+    # No built-in seeds, so nothing is found just because it is hardcoded
+    monkeypatch.setattr(id_sweeper, 'SEED_IDS', [])
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    return IdSweeper(FakeEngine(EXISTING), ProbeIndex(tmp_path / "probe_index.json"),
+                     blocks=range(1000, 6000, 1000), images_dir=images_dir)
+
+
+def test_sweep_finds_ids_across_gaps(sweeper):
+    assert sweeper.sweep() == sorted(EXISTING)
+
+
+def test_sweep_probes_each_id_once(sweeper):
+    sweeper.sweep()
+    assert len(sweeper.engine.heads) == len(set(sweeper.engine.heads))
+
+
+def test_second_sweep_is_answered_by_the_probe_index(sweeper):
+    first = sweeper.sweep()
+    sweeper.engine.heads = []
+    assert sweeper.sweep() == first
+    assert sweeper.engine.heads == []
+
+
+def test_seeds_come_from_the_given_images_dir(sweeper):
+    assert sweeper.seeds() == []
+    (sweeper.images_dir / "wg_game_5500_zh.webp").write_bytes(b'x')
+    sweeper.engine.existing = EXISTING | {5500}
+    assert sweeper.seeds() == [5500]
+    assert 5500 in sweeper.sweep()
+
+
+def test_sweep_probes_stay_bounded(sweeper):
+    # Dense around hits, strided past them: well under one probe per ID in the blocks
+    assert sweeper.sweep() == sorted(EXISTING)
+    assert len(sweeper.engine.heads) <= 300
+
+
+def test_empty_block_costs_a_handful_of_probes(sweeper):
+    sweeper.blocks = [6000, 7000]
+    assert sweeper.sweep() == []
+    assert len(sweeper.engine.heads) <= 2 * 2 * sweeper.dense_misses
+
+
+def test_ids_in_other_languages_count_without_probes(sweeper):
+    sweeper.languages = ['zh', 'en']
+    (sweeper.images_dir / "wg_game_5500_en.webp").write_bytes(b'x')
+    assert 5500 in sweeper.sweep()
+    assert 5500 not in sweeper.engine.existing
@@ -0,0 +1,65 @@
+import pytest
+
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from image_pipeline import ImagePipeline, verify_catalog
+from wg_assets import PUBLIC_IMAGE_PREFIX
+
+WEBP = b'RIFF\x0c\x00\x00\x00WEBPVP8 ' + b'\x00' * 4
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    for name in ('wg_game_101_zh.webp', 'wg_game_101_en_icon.webp', 'wg_game_102_en.webp'):
+        (images_dir / name).write_bytes(WEBP)
+
+    store = CatalogStore(tmp_path / "games.json")
+    store.replace_all([
+        {'id': 'g1', 'imageMetadata': {'id': '101'}, 'images': {}},
+        {'id': 'g2', 'imageMetadata': {'id': '102'}, 'images': {}},
+    ])
+    store.patch('g2', {'images.local_main': PUBLIC_IMAGE_PREFIX + 'wg_game_102_en.webp'})
+    store.columns_path.unlink()
+    return store, images_dir
+
+
+def on_disk(store):
+    return {path.name: path.read_bytes() for path in store.path.parent.iterdir() if path.is_file()}
+
+
+def test_dry_run_reconcile_and_verify_write_nothing(catalog):
+    store, images_dir = catalog
+    before = on_disk(store)
+
+    with ImagePipeline(languages=['zh', 'en'], dry_run=True, images_dir=images_dir, catalog=store) as pipeline:
+        patches = pipeline.reconcile()
+        result = pipeline.verify(check_files=True)
+
+    # The pending patch is seen, but neither games.json nor its journal is touched
+    assert [patch['id'] for patch in patches] == ['g1']
+    assert result['missing'] == ['g1'] and result['broken'] == []
+    assert on_disk(store) == before
+    assert not store.columns_path.exists()
+
+
+def test_verify_reads_pending_patches_without_compacting(catalog):
+    store, images_dir = catalog
+    before = on_disk(store)
+    assert verify_catalog(store, images_dir)['missing'] == ['g1']
+    assert on_disk(store) == before
+
+
+def test_reconcile_journals_its_patches(catalog):
+    store, images_dir = catalog
+    games_json = store.path.read_bytes()
+    with ImagePipeline(languages=['zh', 'en'], images_dir=images_dir, catalog=store) as pipeline:
+        pipeline.blob_store = BlobStore(images_dir.parent / "blobs")
+        patches = pipeline.reconcile()
+
+    # g2's pending path is kept and only gains its digest
+    assert [patch['id'] for patch in patches] == ['g1', 'g2']
+    assert list(patches[1]['set']) == ['images.sha256.local_main']
+    assert store.path.read_bytes() == games_json
+    assert store.pending() == 1 + 2
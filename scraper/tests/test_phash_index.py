@@ -0,0 +1,48 @@
+import os
+
+from blob_store import BlobStore
+from phash_index import PerceptualIndex
+
+NAMES = {'zh': 'wg_game_101_zh.webp', 'en': 'wg_game_101_en.webp', 'th': 'wg_game_101_th.webp'}
+
+
+def make_index(tmp_path, hashes):
+    """An index over 101's languages with the given hash per language, no Pillow needed"""
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    store = BlobStore(tmp_path / "blobs")
+    index = PerceptualIndex(store, tmp_path / "phash.json")
+    for lang, name in NAMES.items():
+        (images_dir / name).write_bytes(f"art with a {lang} overlay".encode())
+        digest = store.digest_of(images_dir / name)
+        index.files[name] = digest
+        index.hashes[digest] = hashes[lang]
+    return index, images_dir
+
+
+def test_alike_languages_are_linked_to_one_kept_file(tmp_path):
+    index, images_dir = make_index(tmp_path, {'zh': 0b1111, 'en': 0b1110, 'th': 0b1100})
+    assert not index.shared('101')
+
+    linked = index.link_language_neutral(images_dir, ['en', 'zh', 'th'])
+    assert linked == [(NAMES['th'], NAMES['en']), (NAMES['zh'], NAMES['en'])]
+    assert index.shared('101')
+    assert os.path.samefile(images_dir / NAMES['zh'], images_dir / NAMES['en'])
+    assert (images_dir / NAMES['th']).read_bytes() == b"art with a en overlay"
+
+    # Nothing is left to link the second time
+    assert index.link_language_neutral(images_dir, ['en', 'zh', 'th']) == []
+
+
+def test_languages_that_differ_are_left_alone(tmp_path):
+    index, images_dir = make_index(tmp_path, {'zh': 0, 'en': (1 << 64) - 1, 'th': 0})
+    assert index.link_language_neutral(images_dir) == []
+    assert not index.shared('101')
+    assert (images_dir / NAMES['en']).read_bytes() == b"art with a en overlay"
+
+
+def test_dry_run_links_nothing(tmp_path):
+    index, images_dir = make_index(tmp_path, {'zh': 0, 'en': 0, 'th': 0})
+    assert len(index.link_language_neutral(images_dir, dry_run=True)) == 2
+    assert not index.shared('101')
+    assert (images_dir / NAMES['zh']).read_bytes() == b"art with a zh overlay"
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+import probe_index
+import wg_assets
+from probe_index import ProbeIndex
+
+DAY = 86400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A probe_index clock the test moves by hand"""
+    clock = SimpleNamespace(now=1_700_000_000.0)
+    monkeypatch.setattr(probe_index, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def index(tmp_path, clock):
+    return ProbeIndex(tmp_path / "probe_index.json", positive_ttl=7 * DAY, negative_ttl=DAY)
+
+
+def test_negative_answers_expire_before_positive_ones(index, clock):
+    index.record('zh', '1001', 'main', 200)
+    index.record('zh', '1002', 'main', 404)
+    assert index.exists('zh', '1001') is True
+    assert index.exists('zh', '1002') is False
+
+    clock.now += DAY + 1
+    assert index.exists('zh', '1001') is True
+    assert index.exists('zh', '1002') is None
+
+    clock.now += 6 * DAY
+    assert index.exists('zh', '1001') is None
+
+
+def test_transient_answers_are_not_cached(index):
+    assert index.record('zh', '1001', 'main', 503) is None
+    assert index.exists('zh', '1001') is None
+
+
+def test_ttl_survives_a_save_and_reload(index, clock):
+    index.record('zh', '1001', 'main', 200)
+    index.save()
+
+    clock.now += 3 * DAY
+    reloaded = ProbeIndex(index.path, positive_ttl=7 * DAY, negative_ttl=DAY)
+    assert reloaded.exists('zh', '1001') is True
+    clock.now += 5 * DAY
+    assert reloaded.exists('zh', '1001') is None
+
+
+def test_probe_requests_only_expired_keys(index, clock, local_server, make_engine, monkeypatch):
+    server = local_server()
+    server.routes['/zh/img/1001.webp'] = lambda handler: (200, {'Content-Length': '123'}, b'')
+    monkeypatch.setattr(wg_assets, 'IMAGE_BASE_URL', server.url(''))
+    keys = [('zh', '1001', 'main'), ('zh', '1002', 'main')]
+
+    engine = make_engine(max_in_flight=4, per_host=4)
+    assert index.probe(engine, keys) == {keys[0]: True, keys[1]: False}
+    assert len(server.hits) == 2
+    assert index.get(*keys[0])['content_length'] == 123
+
+    assert index.probe(engine, keys) == {keys[0]: True, keys[1]: False}
+    assert len(server.hits) == 2
+
+    # Only the 404 is old enough to ask about again
+    clock.now += DAY + 1
+    index.probe(engine, keys)
+    assert [hit[:2] for hit in server.hits[2:]] == [('HEAD', '/zh/img/1002.webp')]
@@ -0,0 +1,28 @@
+import pytest
+
+from rate_limiter import RateLimiter
+
+URL = 'https://example.com/img/1001.webp'
+
+
+@pytest.fixture
+def limiter():
+    return RateLimiter(rate=10.0, ramp=1.0, backoff=0.5)
+
+
+@pytest.mark.parametrize('status', [200, 206, 304, 404, 410])
+def test_healthy_responses_ramp_up(limiter, status):
+    limiter.feedback(URL, status)
+    assert limiter.rate(URL) == 11.0
+
+
+@pytest.mark.parametrize('status', [500, 502, 504, 403, None])
+def test_errors_and_failed_connections_hold_the_rate(limiter, status):
+    limiter.feedback(URL, status)
+    assert limiter.rate(URL) == 10.0
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_throttles_back_off(limiter, status):
+    limiter.feedback(URL, status)
+    assert limiter.rate(URL) == 5.0
@@ -0,0 +1,65 @@
+import pytest
+
+from retry_policy import RetryPolicy
+
+BODY = b'RIFF\x10\x00\x00\x00WEBPVP8 ' + b'\x00' * 4
+
+
+def failing_route(statuses):
+    """Answer with each status in turn, then 200"""
+    statuses = list(statuses)
+
+    def route(handler):
+        if statuses:
+            return statuses.pop(0), {}, b'busy'
+        return 200, {}, BODY
+    return route
+
+
+def test_transient_failures_are_retried(local_server, make_engine, tmp_path):
+    server = local_server()
+    server.routes['/a.webp'] = failing_route([503, 500])
+    result = make_engine(retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)).download_many(
+        [(server.url('/a.webp'), tmp_path / 'a.webp')])[0]
+    assert result['ok'] and result['status'] == 200
+    assert len(server.gets('/a.webp')) == 3
+    assert (tmp_path / 'a.webp').read_bytes() == BODY
+
+
+def test_final_statuses_are_not_retried(local_server, make_engine, tmp_path):
+    server = local_server()
+    result = make_engine().download_many([(server.url('/missing.webp'), tmp_path / 'missing.webp')])[0]
+    assert not result['ok'] and result['status'] == 404
+    assert len(server.gets('/missing.webp')) == 1
+    assert not (tmp_path / 'missing.webp').exists()
+
+
+def test_retry_budget_is_shared_by_every_request(local_server, make_engine, tmp_path):
+    server = local_server()
+    for i in range(4):
+        server.routes[f"/{i}.webp"] = failing_route([500] * 10)
+    policy = RetryPolicy(max_attempts=5, base_delay=0.01, budget=3)
+    results = make_engine(retry_policy=policy).download_many(
+        [(server.url(f"/{i}.webp"), tmp_path / f"{i}.webp") for i in range(4)])
+    assert not any(result['ok'] for result in results)
+    assert policy.budget == 0
+    assert len(server.hits) == 4 + 3
+
+
+def test_retry_after_sets_the_lower_bound_of_the_delay():
+    policy = RetryPolicy(base_delay=0.01, max_delay=30.0)
+    assert policy.backoff(0, 429, headers={'retry-after': '5'}) == 5
+    assert policy.backoff(0, 429, headers={'retry-after': '120'}) == 30.0
+
+
+@pytest.mark.parametrize('status', [403, 404, 410])
+def test_final_statuses_spend_no_budget(status):
+    policy = RetryPolicy(budget=1)
+    assert policy.backoff(0, status) is None
+    assert policy.budget == 1
+
+
+def test_last_attempt_is_not_retried():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.backoff(1, 503) is not None
+    assert policy.backoff(2, 503) is None
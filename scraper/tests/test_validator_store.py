@@ -0,0 +1,57 @@
+import os
+
+from validator_store import ValidatorStore
+
+BODY = b'RIFF\x10\x00\x00\x00WEBPVP8 ' + b'\x00' * 4
+LAST_MODIFIED = 'Wed, 21 Oct 2026 07:28:00 GMT'
+
+
+def etag_route(handler):
+    if handler.headers.get('If-None-Match') == '"v1"':
+        return 304, {'ETag': '"v1"'}, b''
+    return 200, {'ETag': '"v1"', 'Last-Modified': LAST_MODIFIED}, BODY
+
+
+def test_refresh_revalidates_with_etag_and_keeps_the_file(local_server, make_engine, tmp_path):
+    server = local_server()
+    server.routes['/a.webp'] = etag_route
+
+    engine = make_engine(validators=ValidatorStore(tmp_path / 'validators.json'))
+    job = (server.url('/a.webp'), tmp_path / 'a.webp')
+    assert engine.download_many([job])[0]['ok']
+    assert 'If-None-Match' not in server.hits[-1][2]
+    before = os.stat(job[1])
+
+    result = engine.download_many([job], refresh=True)[0]
+    assert result['ok'] and result['not_modified'] and result['status'] == 304
+    assert server.hits[-1][2].get('If-None-Match') == '"v1"'
+    assert server.hits[-1][2].get('If-Modified-Since') == LAST_MODIFIED
+    assert os.stat(job[1]).st_ino == before.st_ino
+    assert job[1].read_bytes() == BODY
+
+
+def test_changed_image_is_downloaded_again(local_server, make_engine, tmp_path):
+    server = local_server()
+    server.routes['/a.webp'] = lambda handler: (200, {'ETag': '"v2"'}, BODY + b'v2')
+
+    validators = ValidatorStore(tmp_path / 'validators.json')
+    local_path = tmp_path / 'a.webp'
+    local_path.write_bytes(BODY)
+    validators.record(server.url('/a.webp'), local_path, {'etag': '"v1"'}, len(BODY))
+
+    result = make_engine(validators=validators).download_many([(server.url('/a.webp'), local_path)], refresh=True)[0]
+    assert result['ok'] and not result['not_modified']
+    assert local_path.read_bytes() == BODY + b'v2'
+    assert ValidatorStore(validators.path).get(local_path)['etag'] == '"v2"'
+
+
+def test_no_conditional_headers_without_a_matching_copy(tmp_path):
+    validators = ValidatorStore(tmp_path / 'validators.json')
+    local_path = tmp_path / 'a.webp'
+    validators.record('https://example.test/a.webp', local_path, {'etag': '"v1"'}, 10)
+
+    # The file is gone, or was fetched from another URL
+    assert validators.conditional_headers('https://example.test/a.webp', local_path) == {}
+    local_path.write_bytes(BODY)
+    assert validators.conditional_headers('https://example.test/b.webp', local_path) == {}
+    assert validators.conditional_headers('https://example.test/a.webp', local_path) == {'If-None-Match': '"v1"'}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+WG Validator Store
+Sidecar ETag / Last-Modified validators for downloaded images, so refreshes
+can ask the server whether anything changed instead of re-fetching
+"""
+
+import json
+import os
+import time
+from threading import Lock
+
+from wg_assets import CACHE_DIR
+
+VALIDATORS_PATH = CACHE_DIR / "validators.json"
+
+
+class ValidatorStore:
+    def __init__(self, path=VALIDATORS_PATH):
+        self.path = path
+        self.entries = {}
+        self.lock = Lock()
+        self.dirty = False
+
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, local_path):
+        """Get the validators stored for a local file"""
+        with self.lock:
+            return self.entries.get(local_path.name)
+
+    def conditional_headers(self, url, local_path):
+        """Build If-None-Match / If-Modified-Since headers for a refresh, or {}"""
+        entry = self.get(local_path)
+        if not entry or entry['url'] != url or not local_path.exists():
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record(self, url, local_path, headers, size, digest=None):
+        """Store the validators a fresh download came with"""
+        entry = {
+            'url': url,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'size': size,
+            'digest': digest,
+            'fetched_at': time.time(),
+        }
+        with self.lock:
+            self.entries[local_path.name] = entry
+            self.dirty = True
+        return entry
+
+    def touch(self, local_path):
+        """Note that a refresh confirmed a file is unchanged"""
+        with self.lock:
+            entry = self.entries.get(local_path.name)
+            if entry:
+                entry['fetched_at'] = time.time()
+                self.dirty = True
+
+    def save(self):
+        """Write the validators to disk if anything changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+WG Asset Locations
+Shared paths and URL builders for the wg.com image space
+"""
+
+import os
+import re
+from pathlib import Path
+
+# Point WG_IMAGE_BASE_URL at a local stand-in server to exercise the downloaders offline
+IMAGE_BASE_URL = os.environ.get(
+    'WG_IMAGE_BASE_URL', "https://wg.com/oss-proxy/official-website/apigame"
+).rstrip('/')
+
+ASSETS_DIR = Path(__file__).parent.parent / "public" / "assets"
+IMAGES_DIR = ASSETS_DIR / "images" / "games"
+GAMES_JSON = ASSETS_DIR / "games.json"
+
+# Local state kept between runs (probe results, validators, ...)
+CACHE_DIR = Path(__file__).parent / ".cache"
+
+# Public URL prefix the site uses for files in IMAGES_DIR
+PUBLIC_IMAGE_PREFIX = "/assets/images/games/"
+
+# Language preference order used when picking a game's image
+LANGUAGES = ['zh', 'en', 'th', 'vi', 'ja', 'ko', 'es', 'fr', 'de', 'pt', 'ru', 'ar']
+
+VARIANTS = ('main', 'icon')
+
+
+def image_url(lang, img_id, variant='main'):
+    """Build the upstream URL for an image ID in a language"""
+    suffix = '_icon' if variant == 'icon' else ''
+    return f"{IMAGE_BASE_URL}/{lang}/img/{img_id}{suffix}.webp"
+
+
+def image_filename(lang, img_id, variant='main'):
+    """Build the local filename for an image ID in a language"""
+    suffix = '_icon' if variant == 'icon' else ''
+    return f"wg_game_{img_id}_{lang}{suffix}.webp"
+
+
+IMAGE_URL_PATTERN = re.compile(r'/([\w-]+)/img/(\d+)(_icon)?\.webp$')
+
+
+def parse_image_url(url):
+    """Split an upstream image URL into (lang, img_id, variant), or None"""
+    match = IMAGE_URL_PATTERN.search(url)
+    if not match:
+        return None
+    return match.group(1), match.group(2), 'icon' if match.group(3) else 'main'
+
+
+IMAGE_FILENAME_PATTERN = re.compile(r'^wg_game_(\d+)_([\w-]+?)(_icon)?\.webp$')
+
+
+def parse_image_filename(name):
+    """Split a local image filename into (lang, img_id, variant), or None"""
+    match = IMAGE_FILENAME_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group(2), match.group(1), 'icon' if match.group(3) else 'main'
@@ -5,34 +5,68 @@ Scrapes all game data from wg.com and downloads assets
 """
 
 import requests
-from bs4 import BeautifulSoup
-import json
 import os
-import time
 import re
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
 import hashlib
 
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from extraction_plan import ExtractionPlan
+from fetch_engine import save_response
+from game_detector import has_game_content
+from html_parser import parse_html
+from http_client import make_session
+from image_derivatives import DerivativeStage
+from retry_policy import DEFAULT_POLICY
+
+# Words that mark a game page for this scraper; narrower than the shared
+# multilingual pattern, which also matches sports/lottery/live pages
+GAME_TEXT_PATTERN = re.compile(r'游戏|老虎机|赌场|slot|game|casino', re.I)
+
+# Selector cascades, in priority order, compiled into one extraction plan
+GAME_SELECTORS = [
+    'div.game-item',
+    'div.game-card',
+    'div.slot-item',
+    'div.casino-game',
+    'div[class*="game"]',
+    'div[class*="slot"]',
+    'div[class*="casino"]',
+    'a[href*="game"]',
+    'a[href*="slot"]',
+    'a[href*="casino"]'
+]
+
+FIELD_SELECTORS = {
+    'title': ['h1', 'h2', 'h3', 'h4', '.title', '.name', '.game-title', 'a'],
+    'description': ['p', '.description', '.desc', '.summary'],
+    'image': ['img'],
+    'link': ['a'],
+}
+
 class WGGamesScraper:
-    def __init__(self):
+    def __init__(self, parser=None):
         self.base_url = "https://wg.com"
+        self.parser = parser  # None picks lxml when available
+        self.page_soups = {}
         self.chinese_url = "https://wg.com/zh-cn/"
         self.english_url = "https://wg.com/en/"
         self.games_data = []
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session = make_session('page')
         
         # Create directories
         self.assets_dir = Path("../public/assets/images/games")
         self.assets_dir.mkdir(parents=True, exist_ok=True)
+        self.blob_store = BlobStore()
+        self.derivatives = DerivativeStage(self.blob_store, self.assets_dir)
+        self.plan = ExtractionPlan(GAME_SELECTORS, FIELD_SELECTORS)
         
     def get_page_content(self, url):
         """Get page content with error handling"""
         try:
-            response = self.session.get(url, timeout=10)
+            response = DEFAULT_POLICY.call(self.session.get, url, timeout=10)
             response.raise_for_status()
             return response.text
         except requests.RequestException as e:
@@ -62,71 +96,51 @@ class WGGamesScraper:
             print(f"Checking: {url}")
             content = self.get_page_content(url)
             if content:
-                soup = BeautifulSoup(content, 'html.parser')
+                soup = parse_html(content, self.parser)
                 
                 # Look for pagination or game listings
                 if self.has_game_content(soup):
                     game_pages.append(url)
+                    self.page_soups[url] = soup  # Reused by extract_games_from_page
                     print(f"✅ Found game content at: {url}")
         
         return game_pages
     
     def has_game_content(self, soup):
         """Check if page contains game content"""
-        # Look for common game-related elements
-        game_indicators = [
-            soup.find_all('div', class_=re.compile(r'game|slot|casino', re.I)),
-            soup.find_all('img', src=re.compile(r'game|slot|casino', re.I)),
-            soup.find_all('a', href=re.compile(r'game|slot|casino', re.I)),
-            soup.find_all(text=re.compile(r'游戏|老虎机|赌场|slot|game|casino', re.I))
-        ]
-        
-        return any(len(indicator) > 0 for indicator in game_indicators)
+        return has_game_content(soup, GAME_TEXT_PATTERN)
     
     def extract_games_from_page(self, url):
         """Extract games from a specific page"""
         print(f"📄 Extracting games from: {url}")
-        content = self.get_page_content(url)
-        if not content:
-            return []
-        
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = self.page_soups.get(url)
+        if soup is None:
+            content = self.get_page_content(url)
+            if not content:
+                return []
+            soup = parse_html(content, self.parser)
         games = []
         
-        # Try different selectors for game elements
-        game_selectors = [
-            'div.game-item',
-            'div.game-card',
-            'div.slot-item',
-            'div.casino-game',
-            'div[class*="game"]',
-            'div[class*="slot"]',
-            'div[class*="casino"]',
-            'a[href*="game"]',
-            'a[href*="slot"]',
-            'a[href*="casino"]'
-        ]
-        
-        for selector in game_selectors:
-            elements = soup.select(selector)
-            if elements:
-                print(f"Found {len(elements)} elements with selector: {selector}")
-                for element in elements:
-                    game_data = self.extract_game_data(element, url)
-                    if game_data:
-                        games.append(game_data)
-                break
+        # First game selector with any elements, all tried in one walk
+        selector, elements = self.plan.find_containers(soup)
+        if elements:
+            print(f"Found {len(elements)} elements with selector: {selector}")
+            for element in elements:
+                game_data = self.extract_game_data(element, url)
+                if game_data:
+                    games.append(game_data)
         
         return games
     
     def extract_game_data(self, element, base_url):
         """Extract data from a game element"""
         try:
+            # Every selector cascade is resolved in one walk of the element
+            matches = self.plan.collect(element)
+            
             # Extract title
-            title_selectors = ['h1', 'h2', 'h3', 'h4', '.title', '.name', '.game-title', 'a']
             title = None
-            for selector in title_selectors:
-                title_elem = element.select_one(selector)
+            for title_elem in matches['title']:
                 if title_elem and title_elem.get_text(strip=True):
                     title = title_elem.get_text(strip=True)
                     break
@@ -135,16 +149,14 @@ class WGGamesScraper:
                 return None
             
             # Extract description
-            desc_selectors = ['p', '.description', '.desc', '.summary']
             description = ""
-            for selector in desc_selectors:
-                desc_elem = element.select_one(selector)
+            for desc_elem in matches['description']:
                 if desc_elem and desc_elem.get_text(strip=True):
                     description = desc_elem.get_text(strip=True)
                     break
             
             # Extract image
-            img_elem = element.select_one('img')
+            img_elem = matches['image'][0]
             image_url = None
             if img_elem:
                 image_url = img_elem.get('src') or img_elem.get('data-src')
@@ -152,7 +164,7 @@ class WGGamesScraper:
                     image_url = urljoin(base_url, image_url)
             
             # Extract link
-            link_elem = element.select_one('a')
+            link_elem = matches['link'][0]
             game_url = None
             if link_elem:
                 game_url = link_elem.get('href')
@@ -174,7 +186,7 @@ class WGGamesScraper:
                 "players": "10K+",  # Default players
                 "status": "Live",
                 "image": f"/assets/images/games/{game_id}.jpg",
-                "icon": f"/assets/images/games/{game_id}_icon.png",
+                "icon": f"/assets/images/games/{game_id}_icon.webp",
                 "features": self.generate_features(title, description),
                 "launchUrl": game_url or f"https://wg.com/games/{game_id}",
                 "originalImageUrl": image_url
@@ -234,18 +246,12 @@ class WGGamesScraper:
             return False
         
         try:
-            response = self.session.get(image_url, timeout=10)
+            response = DEFAULT_POLICY.call(self.session.get, image_url, timeout=10, stream=True)
             response.raise_for_status()
             
-            # Save main image
+            # Save main image; its icon is encoded from it by create_icons
             image_path = self.assets_dir / f"{game_id}.jpg"
-            with open(image_path, 'wb') as f:
-                f.write(response.content)
-            
-            # Create a smaller icon version (copy for now)
-            icon_path = self.assets_dir / f"{game_id}_icon.png"
-            with open(icon_path, 'wb') as f:
-                f.write(response.content)
+            save_response(response, image_path, self.blob_store)
             
             print(f"✅ Downloaded image for {game_id}")
             return True
@@ -254,6 +260,21 @@ class WGGamesScraper:
             print(f"❌ Failed to download image for {game_id}: {e}")
             return False
     
+    def create_icons(self, games):
+        """Encode a real icon and responsive sizes from each downloaded image"""
+        sources = {game['id']: self.assets_dir / f"{game['id']}.jpg" for game in games}
+        derived = self.derivatives.run([path for path in sources.values() if path.exists()])
+        
+        for game in games:
+            source = sources[game['id']]
+            if source in derived:
+                self.blob_store.link(self.derivatives.outputs(source)['icon.webp'],
+                                     self.assets_dir / f"{game['id']}_icon.webp")
+                game['derivatives'] = derived[source]
+            else:
+                # No image to shrink (or no Pillow), so there is no icon file to point at
+                game.pop('icon', None)
+    
     def scrape_all_games(self):
         """Main scraping function"""
         print("🚀 Starting WG Games Scraper...")
@@ -271,7 +292,6 @@ class WGGamesScraper:
         for page_url in game_pages:
             games = self.extract_games_from_page(page_url)
             all_games.extend(games)
-            time.sleep(1)  # Be respectful to the server
         
         # Remove duplicates
         unique_games = {}
@@ -287,7 +307,7 @@ class WGGamesScraper:
         for game in self.games_data:
             if game.get('originalImageUrl'):
                 self.download_image(game['originalImageUrl'], game['id'])
-            time.sleep(0.5)  # Rate limiting
+        self.create_icons(self.games_data)
         
         # Save to JSON
         self.save_to_json()
@@ -409,12 +429,10 @@ class WGGamesScraper:
     
     def save_to_json(self):
         """Save games data to JSON file"""
-        json_path = Path("../public/assets/games.json")
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.games_data, f, ensure_ascii=False, indent=2)
+        catalog = CatalogStore()
+        catalog.replace_all(self.games_data)
         
-        print(f"💾 Saved {len(self.games_data)} games to {json_path}")
+        print(f"💾 Saved {len(self.games_data)} games to {catalog.path}")
 
 def main():
     scraper = WGGamesScraper()
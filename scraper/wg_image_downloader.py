@@ -4,31 +4,45 @@ WG Image Downloader
 Downloads real game images from wg.com using the discovered pattern
 """
 
-import requests
-import json
 import os
-import time
 from pathlib import Path
 from urllib.parse import urljoin
 
+from blob_store import BlobStore
+from catalog_store import CatalogStore
+from fetch_engine import FetchEngine
+from http_client import make_session
+from image_derivatives import DerivativeStage
+from validator_store import ValidatorStore
+from probe_index import ProbeIndex
+from wg_assets import IMAGE_BASE_URL
+
 class WGImageDownloader:
-    def __init__(self):
+    def __init__(self, max_in_flight=16):
         self.base_url = "https://wg.com"
-        self.image_base_url = "https://wg.com/oss-proxy/official-website/apigame"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,zh-CN,zh;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Referer': 'https://wg.com/',
-        })
+        self.image_base_url = IMAGE_BASE_URL
+        self.session = make_session('image', pool_size=max_in_flight)
+        self.blob_store = BlobStore()
+        self.derivatives = DerivativeStage(self.blob_store)
+        self.engine = FetchEngine(max_in_flight=max_in_flight, session=self.session, blob_store=self.blob_store,
+                                  validators=ValidatorStore())
+        self.probe_index = ProbeIndex()
+        self.catalog = CatalogStore()
         
         # Create directories
         self.assets_dir = Path("../public/assets/images/games")
         self.assets_dir.mkdir(parents=True, exist_ok=True)
-        
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Release the fetch engine's worker threads and pooled connections"""
+        self.engine.close()
+    
     def test_image_patterns(self):
         """Test different image ID patterns to find valid images"""
         print("🔍 Testing WG image patterns...")
@@ -49,30 +63,30 @@ class WGImageDownloader:
             "9001", "9002", "9003", "9004", "9005",
         ]
         
+        # Test different language codes
+        languages = ['zh', 'en', 'th', 'vi']
+        
+        # Probe every pattern in every language at once, skipping answers we still trust
+        probes = [(lang, pattern, 'main') for pattern in test_patterns for lang in languages]
+        found = self.probe_index.probe(self.engine, probes)
+        self.probe_index.save()
+        
         valid_images = []
+        found_patterns = set()
         
-        for pattern in test_patterns:
-            # Test different language codes
-            languages = ['zh', 'en', 'th', 'vi']
-            
-            for lang in languages:
+        # Keep the first language that works for each pattern
+        for lang, pattern, variant in probes:
+            if found[(lang, pattern, variant)] and pattern not in found_patterns:
+                found_patterns.add(pattern)
                 image_url = f"{self.image_base_url}/{lang}/img/{pattern}.webp"
-                
-                try:
-                    response = self.session.head(image_url, timeout=5)
-                    if response.status_code == 200:
-                        print(f"✅ Found valid image: {image_url}")
-                        valid_images.append({
-                            'id': pattern,
-                            'language': lang,
-                            'url': image_url,
-                            'size': response.headers.get('content-length', 'unknown')
-                        })
-                        break  # Found one for this pattern, move to next
-                except Exception as e:
-                    continue
-                
-                time.sleep(0.1)  # Be respectful
+                entry = self.probe_index.get(lang, pattern, variant)
+                print(f"✅ Found valid image: {image_url}")
+                valid_images.append({
+                    'id': pattern,
+                    'language': lang,
+                    'url': image_url,
+                    'size': entry['content_length'] or 'unknown'
+                })
         
         print(f"📊 Found {len(valid_images)} valid images")
         return valid_images
@@ -81,33 +95,26 @@ class WGImageDownloader:
         """Download a few test images to verify they work"""
         print(f"📥 Downloading {min(limit, len(valid_images))} test images...")
         
+        jobs = []
+        for img_info in valid_images[:limit]:
+            filename = f"wg_game_{img_info['id']}_{img_info['language']}.webp"
+            jobs.append((img_info['url'], self.assets_dir / filename))
+        
         downloaded = []
         
-        for i, img_info in enumerate(valid_images[:limit]):
-            try:
-                response = self.session.get(img_info['url'], timeout=10)
-                response.raise_for_status()
-                
-                # Save the image
-                filename = f"wg_game_{img_info['id']}_{img_info['language']}.webp"
-                filepath = self.assets_dir / filename
-                
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
-                print(f"✅ Downloaded: {filename} ({len(response.content)} bytes)")
+        for img_info, result in zip(valid_images[:limit], self.engine.download_many(jobs)):
+            if result['ok']:
+                filename = result['path'].name
+                print(f"✅ Downloaded: {filename} ({result['size']} bytes)")
                 downloaded.append({
                     'id': img_info['id'],
                     'language': img_info['language'],
                     'filename': filename,
-                    'size': len(response.content),
+                    'size': result['size'],
                     'url': img_info['url']
                 })
-                
-                time.sleep(0.5)  # Be respectful
-                
-            except Exception as e:
-                print(f"❌ Failed to download {img_info['url']}: {e}")
+            else:
+                print(f"❌ Failed to download {img_info['url']}: {result['error'] or 'HTTP ' + str(result['status'])}")
         
         return downloaded
     
@@ -116,18 +123,17 @@ class WGImageDownloader:
         print("📝 Generating comprehensive image list...")
         
         # Load existing games data
-        games_json_path = Path("../public/assets/games.json")
-        if not games_json_path.exists():
+        if not self.catalog.path.exists():
             print("❌ Games JSON not found!")
             return
         
-        with open(games_json_path, 'r', encoding='utf-8') as f:
-            games = json.load(f)
+        games = self.catalog.load()
         
         print(f"📊 Found {len(games)} games in JSON")
         
         # Update games with real image URLs
         updated_games = []
+        patches = []
         
         for i, game in enumerate(games):
             # Generate image ID based on game index or use discovered pattern
@@ -161,77 +167,57 @@ class WGImageDownloader:
             }
             
             updated_games.append(game)
+            patches.append({'id': game['id'], 'set': {
+                'images': game['images'],
+                'imageMetadata': game['imageMetadata'],
+            }})
         
-        # Save updated games data
-        with open(games_json_path, 'w', encoding='utf-8') as f:
-            json.dump(updated_games, f, ensure_ascii=False, indent=2)
+        # Journal the updated games; games.json is rewritten on publish or once the journal is large
+        self.catalog.append_patches(patches)
+        self.catalog.maybe_compact()
         
         print(f"💾 Updated {len(updated_games)} games with real image URLs")
         return updated_games
     
-    def download_all_images(self, games_data, batch_size=5):
-        """Download all game images in batches"""
+    def download_all_images(self, games_data):
+        """Download all game images concurrently"""
         print(f"📥 Downloading images for {len(games_data)} games...")
         
         downloaded_count = 0
         failed_count = 0
         
+        # Queue main and icon for every game
+        jobs = []
+        for game in games_data:
+            base_name = f"wg_game_{game['imageMetadata']['id']}_{game['imageMetadata']['language']}"
+            jobs.append((game['images']['main'], self.assets_dir / f"{base_name}.webp"))
+            jobs.append((game['images']['icon'], self.assets_dir / f"{base_name}_icon.webp"))
+        
+        # Files we already hold are only rewritten if the server has a newer copy
+        results = self.engine.download_many(jobs, refresh=True)
+        
+        # Icons the server does not have are encoded from the main image in one batch
+        missing_icons = [(results[2 * i], results[2 * i + 1]) for i in range(len(games_data))
+                         if results[2 * i]['ok'] and not results[2 * i + 1]['ok']]
+        self.derivatives.run([main_result['path'] for main_result, _ in missing_icons])
+        for main_result, icon_result in missing_icons:
+            # Without Pillow, fall back to a link to the main image's blob; a 304'd main
+            # image that is still a plain file has no digest yet, so adopt it into the store
+            icon_digest = (self.derivatives.outputs(main_result['path']).get('icon.webp') or main_result['digest']
+                           or self.blob_store.adopt(main_result['path']))
+            self.blob_store.link(icon_digest, icon_result['path'])
+        
         for i, game in enumerate(games_data):
-            try:
-                # Download main image
-                main_url = game['images']['main']
-                response = self.session.get(main_url, timeout=10)
-                
-                if response.status_code == 200:
-                    # Save main image
-                    main_filename = f"wg_game_{game['imageMetadata']['id']}_{game['imageMetadata']['language']}.webp"
-                    main_filepath = self.assets_dir / main_filename
-                    
-                    with open(main_filepath, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Try to download icon (might not exist)
-                    try:
-                        icon_url = game['images']['icon']
-                        icon_response = self.session.get(icon_url, timeout=5)
-                        
-                        if icon_response.status_code == 200:
-                            icon_filename = f"wg_game_{game['imageMetadata']['id']}_{game['imageMetadata']['language']}_icon.webp"
-                            icon_filepath = self.assets_dir / icon_filename
-                            
-                            with open(icon_filepath, 'wb') as f:
-                                f.write(icon_response.content)
-                        else:
-                            # Create a copy of main image as icon
-                            icon_filename = f"wg_game_{game['imageMetadata']['id']}_{game['imageMetadata']['language']}_icon.webp"
-                            icon_filepath = self.assets_dir / icon_filename
-                            
-                            with open(icon_filepath, 'wb') as f:
-                                f.write(response.content)
-                    except:
-                        # Create a copy of main image as icon
-                        icon_filename = f"wg_game_{game['imageMetadata']['id']}_{game['imageMetadata']['language']}_icon.webp"
-                        icon_filepath = self.assets_dir / icon_filename
-                        
-                        with open(icon_filepath, 'wb') as f:
-                            f.write(response.content)
-                    
-                    downloaded_count += 1
-                    print(f"✅ Downloaded images for {game['name'].get('en', game['id'])} ({i+1}/{len(games_data)})")
-                    
-                else:
-                    print(f"❌ Failed to download {main_url}: HTTP {response.status_code}")
-                    failed_count += 1
-                
-                # Batch delay
-                if (i + 1) % batch_size == 0:
-                    print(f"⏸️  Pausing for 2 seconds... (Downloaded: {downloaded_count}, Failed: {failed_count})")
-                    time.sleep(2)
-                else:
-                    time.sleep(0.5)
-                    
-            except Exception as e:
-                print(f"❌ Error downloading images for {game['name'].get('en', game['id'])}: {e}")
+            main_result = results[2 * i]
+            
+            if main_result['ok']:
+                downloaded_count += 1
+                print(f"✅ Downloaded images for {game['name'].get('en', game['id'])} ({i+1}/{len(games_data)})")
+            elif main_result['error']:
+                print(f"❌ Error downloading images for {game['name'].get('en', game['id'])}: {main_result['error']}")
+                failed_count += 1
+            else:
+                print(f"❌ Failed to download {main_result['url']}: HTTP {main_result['status']}")
                 failed_count += 1
         
         print(f"🎉 Download complete! Downloaded: {downloaded_count}, Failed: {failed_count}")
@@ -269,8 +255,8 @@ class WGImageDownloader:
         print(f"📊 Results: {downloaded} images downloaded, {failed} failed")
 
 def main():
-    downloader = WGImageDownloader()
-    downloader.run()
+    with WGImageDownloader() as downloader:
+        downloader.run()
 
 if __name__ == "__main__":
     main()
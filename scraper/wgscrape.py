@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+wgscrape
+One command line for the WG scraper: crawl, probe, download, derive,
+dedupe, reconcile, publish, verify and bench, all built on the shared image pipeline
+
+Modules are imported inside each command, so `wgscrape verify` never
+loads requests, bs4 or lxml.
+
+Usage: python wgscrape.py [--concurrency N] [--languages zh,en] [--dry-run] <command>
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from wg_assets import LANGUAGES
+
+
+def parse_languages(value):
+    """Split a comma-separated language list, keeping the given preference order"""
+    languages = [lang.strip() for lang in value.split(',') if lang.strip()]
+    if not languages:
+        raise argparse.ArgumentTypeError("expected at least one language")
+    return languages
+
+
+def open_pipeline(args, **kwargs):
+    from image_pipeline import ImagePipeline
+    return ImagePipeline(languages=args.languages, max_in_flight=args.concurrency,
+                         dry_run=args.dry_run, **kwargs)
+
+
+def cmd_crawl(args):
+    """Crawl wg.com in every language and save the merged catalog, resuming an interrupted run"""
+    from enhanced_wg_scraper import EnhancedWGScraper
+
+    with EnhancedWGScraper(max_in_flight=args.concurrency, languages=args.languages,
+                           from_archive=args.from_archive) as scraper:
+        if args.dry_run:
+            found_pages = scraper.analyze_wg_structure()
+            print(f"📄 {len(found_pages)} pages with game content, nothing saved (dry run)")
+            return 0
+        scraper.scrape_all_languages(fresh=args.fresh)
+    return 0
+
+
+def cmd_probe(args):
+    """Sweep the image ID space and report the IDs that exist upstream"""
+    with open_pipeline(args) as pipeline:
+        ids = pipeline.discover()
+    if args.list:
+        for img_id in ids:
+            print(img_id)
+    return 0
+
+
+def cmd_download(args):
+    """Download every missing image for the discovered IDs"""
+    with open_pipeline(args, refresh=args.refresh) as pipeline:
+        ids = args.ids or pipeline.discover()
+        jobs = pipeline.plan(ids)
+        print(f"📦 {len(jobs)} images to fetch for {len(ids)} IDs in {len(pipeline.languages)} languages")
+        if args.dry_run:
+            for _, url, local_path in jobs:
+                print(f"  ⏭️  {url} → {local_path.name}")
+            return 0
+
+        counts = pipeline.download(jobs)
+        print(f"📥 Downloaded: {counts['downloaded']}, unchanged: {counts['not_modified']}, "
+              f"not upstream (404): {counts['not_found']}, failed: {counts['failed']}")
+        pipeline.derive([path for path in counts['paths'] if not path.stem.endswith('_icon')])
+        pipeline.index_hashes(counts['paths'])
+        if args.reconcile:
+            patches = pipeline.reconcile()
+            print(f"📝 Journalled updates for {len(patches)} games (`publish` writes games.json)")
+    # A 404 only means the image does not exist in that language; other errors fail the run
+    return 1 if counts['failed'] else 0
+
+
+def cmd_derive(args):
+    """Encode icons and responsive sizes for the downloaded main images"""
+    with open_pipeline(args) as pipeline:
+        derived = pipeline.derive()
+    if not args.dry_run:
+        print(f"🖼️  {len(derived)} images have derivatives")
+    return 0
+
+
+def cmd_dedupe(args):
+    """Hash every image and report near-duplicates (the same art with a localized overlay)"""
+    with open_pipeline(args) as pipeline:
+        if not pipeline.phash.available:
+            print("⚠️  Pillow is not installed, images cannot be hashed")
+            return 1
+        hashed = pipeline.index_hashes()
+        linked = pipeline.link_language_neutral()
+        clusters = pipeline.phash.clusters()
+
+    for name, keep in linked:
+        print(f"  🔗 {name} -> {keep}")
+    verb = "would be linked (dry run)" if args.dry_run else "linked"
+    print(f"🌐 {len(linked)} language copies of language-neutral images {verb}")
+
+    saved = 0
+    for cluster in clusters:
+        # Names linked to one blob share an inode, so each stored file counts once
+        sizes = {}
+        for name in cluster:
+            st = (pipeline.images_dir / name).stat()
+            sizes[(st.st_dev, st.st_ino)] = st.st_size
+        saved += sum(sizes.values()) - max(sizes.values())
+        print(f"  🔁 {', '.join(cluster)}")
+    print(f"🧮 Hashed {hashed} new images; {len(clusters)} near-duplicate groups, {saved} bytes stored more than once")
+    return 0
+
+
+def cmd_reconcile(args):
+    """Point games.json at the best local images by language preference"""
+    with open_pipeline(args) as pipeline:
+        patches = pipeline.reconcile()
+    if args.dry_run:
+        for patch in patches:
+            changes = [f'{k}={v}' for k, v in patch['set'].items()] + [f'-{k}' for k in patch.get('unset', ())]
+            print(f"  📝 {patch['id']}: {', '.join(changes)}")
+        print(f"📝 {len(patches)} games would be updated (dry run)")
+    else:
+        print(f"📝 Journalled updates for {len(patches)} games (`publish` writes games.json)")
+    return 0
+
+
+def cmd_publish(args):
+    """Fold the journalled catalog updates into games.json and rebuild games.cols"""
+    from catalog_store import CatalogStore
+
+    catalog = CatalogStore()
+    if args.dry_run:
+        print(f"📒 {catalog.pending()} journalled updates would be written to {catalog.path.name} (dry run)")
+        return 0
+    print(f"📤 Published {catalog.publish()} journalled updates to {catalog.path.name}")
+    return 0
+
+
+def cmd_verify(args):
+    """Check every game's local images are on disk, optionally validating every file"""
+    from image_pipeline import verify_catalog
+
+    start = time.perf_counter()
+    result = verify_catalog(check_files=args.check_files, workers=args.concurrency)
+    for game_id in result['missing']:
+        print(f"❌ {game_id}: No images found")
+    for entry in result.get('broken', []):
+        print(f"💥 {entry['name']}: {entry['problem']}")
+
+    coverage = result['with_images'] / result['total'] * 100 if result['total'] else 100.0
+    result['coverage'] = round(coverage, 2)
+    print(f"✅ Games with images: {result['with_images']}/{result['total']} ({coverage:.1f}%)")
+    if args.check_files:
+        print(f"🔬 Checked {result['checked']} files, {len(result['broken'])} broken")
+    print(f"🗑️  Orphaned files: {len(result['orphans'])}")
+
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"⏱️  {result['elapsed_ms']:.1f} ms")
+    if args.report:
+        from image_check import write_report
+        print(f"📄 Report written to {write_report(result, Path(args.report))}")
+    return 0 if not (result['missing'] or result.get('broken')) else 1
+
+
+def cmd_bench(args):
+    """Time parsing and extraction over saved fixture pages"""
+    import benchmarks
+
+    benchmarks.main(Path(args.fixtures) if args.fixtures else benchmarks.FIXTURES_DIR)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='wgscrape', description="Crawl wg.com and keep the game images in sync")
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help="requests in flight at once (default: %(default)s)")
+    parser.add_argument('--languages', type=parse_languages, default=list(LANGUAGES),
+                        help="comma-separated languages in preference order (default: all)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="report what would be fetched or written without doing it")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help=cmd_crawl.__doc__)
+    crawl.add_argument('--fresh', action='store_true', help="start over instead of resuming an interrupted crawl")
+    crawl.add_argument('--from-archive', action='store_true',
+                       help="replay archived responses offline instead of fetching pages (skips image downloads)")
+    crawl.set_defaults(handler=cmd_crawl)
+
+    probe = commands.add_parser('probe', help=cmd_probe.__doc__)
+    probe.add_argument('--list', action='store_true', help="print every ID found")
+    probe.set_defaults(handler=cmd_probe)
+
+    download = commands.add_parser('download', help=cmd_download.__doc__)
+    download.add_argument('--ids', type=int, nargs='+', help="fetch these image IDs instead of sweeping")
+    download.add_argument('--refresh', action='store_true',
+                          help="revalidate existing images with conditional requests instead of skipping them")
+    download.add_argument('--no-reconcile', dest='reconcile', action='store_false',
+                          help="leave games.json alone after downloading")
+    download.set_defaults(handler=cmd_download)
+
+    commands.add_parser('derive', help=cmd_derive.__doc__).set_defaults(handler=cmd_derive)
+    commands.add_parser('dedupe', help=cmd_dedupe.__doc__).set_defaults(handler=cmd_dedupe)
+    commands.add_parser('reconcile', help=cmd_reconcile.__doc__).set_defaults(handler=cmd_reconcile)
+    commands.add_parser('publish', help=cmd_publish.__doc__).set_defaults(handler=cmd_publish)
+    verify = commands.add_parser('verify', help=cmd_verify.__doc__)
+    verify.add_argument('--check-files', action='store_true',
+                        help="also validate every image's header and size (empty, truncated, wrong format)")
+    verify.add_argument('--report', metavar='PATH', help="write the result as JSON, or CSV when PATH ends in .csv")
+    verify.set_defaults(handler=cmd_verify)
+
+    bench = commands.add_parser('bench', help=cmd_bench.__doc__)
+    bench.add_argument('fixtures', nargs='?', help="directory of saved .html pages")
+    bench.set_defaults(handler=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,18 @@ export interface Game {
     icon?: string;
     local_main?: string;
     local_icon?: string;
+    sha256?: {
+      local_main?: string;
+      local_icon?: string;
+    };
+    // Every locale's local_main is the same file
+    language_neutral?: boolean;
+    // Responsive sizes of local_main: format -> width -> path
+    derivatives?: {
+      [format: string]: {
+        [width: string]: string;
+      };
+    };
   };
   description: string | {
     en?: string;